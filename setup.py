@@ -35,11 +35,10 @@ setup(
         "Intended Audience :: Manufacturing",
         "License :: OSI Approved :: MIT License",
         "Operating System :: POSIX",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     extras_require=extras_require,
     tests_require=tests_require,
     test_suite="tests",
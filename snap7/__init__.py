@@ -1,17 +1,40 @@
 """
 The Snap7 Python library.
+
+The submodules are imported on first use, ``import snap7`` itself is cheap.
 """
-import pkg_resources
-
-import snap7.client as client
-import snap7.common as common
-import snap7.error as error
-import snap7.logo as logo
-import snap7.server as server
-import snap7.types as types
-import snap7.util as util
-
-try:
-    __version__ = pkg_resources.require("snap7")[0].version
-except pkg_resources.DistributionNotFound:
-    __version__ = "0.0rc0"
+import importlib
+
+__all__ = ['client', 'common', 'error', 'logo', 'server', 'types', 'util', '__version__']
+
+_submodules = frozenset(('client', 'common', 'error', 'logo', 'server', 'types', 'util'))
+
+
+def _get_version():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:  # Python < 3.8
+        import pkg_resources
+        try:
+            return pkg_resources.require("python-snap7")[0].version
+        except pkg_resources.DistributionNotFound:
+            return "0.0rc0"
+    try:
+        return version("python-snap7")
+    except PackageNotFoundError:
+        return "0.0rc0"
+
+
+def __getattr__(name):
+    if name in _submodules:
+        module = importlib.import_module(f"{__name__}.{name}")
+    elif name == '__version__':
+        module = _get_version()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = module
+    return module
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
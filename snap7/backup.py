@@ -0,0 +1,249 @@
+"""
+Backup and restore of the blocks of PLCs.
+
+A backup is a zip archive with one entry per block, as uploaded by
+:meth:`Client.full_upload`, and a manifest.json which lists the blocks
+with their SHA-256, checksum and code date::
+
+    backup([client_1, client_2], 'plc1.zip', previous='plc1.zip')
+    restore([client_1, client_2], 'plc1.zip')
+
+Several connected clients to the same PLC upload or download blocks
+concurrently, their number bounds the load put on the PLC. Blocks whose
+checksum and code date are the same as in the previous archive are copied
+from it instead of being uploaded. :func:`backup_many` backs up several
+PLCs concurrently.
+"""
+import contextlib
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+manifest_name = 'manifest.json'
+manifest_format = 1
+default_block_types = ('DB', 'FB', 'FC')
+
+
+class _ClientPool:
+    """
+    Hands out the clients of a PLC to one thread at a time.
+    """
+
+    def __init__(self, clients):
+        self.size = len(clients)
+        self._clients = queue.Queue()
+        for client in clients:
+            self._clients.put(client)
+
+    @contextlib.contextmanager
+    def client(self):
+        client = self._clients.get()
+        try:
+            yield client
+        finally:
+            self._clients.put(client)
+
+
+def _clients(clients):
+    # a single client or a list of clients to the same PLC
+    if isinstance(clients, (list, tuple)):
+        return list(clients)
+    return [clients]
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _signature(info):
+    return info.CheckSum, info.CodeDate.decode('ascii', 'replace')
+
+
+def block_file(block_type, number):
+    """
+    Returns the name of the archive entry of a block, e.g. DB12.mc7.
+    """
+    return f"{block_type}{number}.mc7"
+
+
+def read_manifest(path):
+    """
+    Returns the manifest of a backup archive as a dict.
+    """
+    with zipfile.ZipFile(path) as archive:
+        return json.loads(archive.read(manifest_name))
+
+
+def verify(path):
+    """
+    Checks the blocks of a backup archive against their SHA-256.
+
+    :returns: a list of the entries which are missing or corrupt
+    """
+    bad = []
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read(manifest_name))
+        names = set(archive.namelist())
+        for block in manifest['blocks']:
+            if block['file'] not in names or _sha256(archive.read(block['file'])) != block['sha256']:
+                bad.append(block['file'])
+    return bad
+
+
+def backup(clients, path, previous=None, block_types=default_block_types):
+    """
+    Uploads the blocks of a PLC to a compressed archive.
+
+    The archive is written next to path and renamed when it is complete, so
+    path can be the previous archive.
+
+    :param clients: a connected :class:`snap7.client.Client`, or a list of
+        clients connected to the same PLC to upload with
+    :param path: the archive to write
+    :param previous: an earlier archive of the same PLC, the blocks which
+        didn't change since are copied from it
+    :param block_types: the types of the blocks backed up
+    :returns: the manifest of the archive
+    """
+    pool = _ClientPool(_clients(clients))
+    with pool.client() as client:
+        blocks = [(block_type, number) for block_type in block_types
+                  for number in client.list_blocks_of_type(block_type)]
+
+    previous_archive = None
+    previous_blocks = {}
+    if previous and os.path.exists(previous):
+        previous_archive = zipfile.ZipFile(previous)
+        for block in json.loads(previous_archive.read(manifest_name))['blocks']:
+            previous_blocks[(block['type'], block['number'])] = block
+
+    def upload(key):
+        with pool.client() as client:
+            data, size = client.full_upload(*key)
+        return bytes(data[:size])
+
+    def fetch(key):
+        with pool.client() as client:
+            info = client.get_block_info(*key)
+        block = previous_blocks.get(key)
+        if block is not None and (block['checksum'], block['code_date']) == _signature(info):
+            return key, info, None
+        return key, info, upload(key)
+
+    uploaded = reused = 0
+    entries = []
+    temporary = f"{path}.tmp"
+    try:
+        with zipfile.ZipFile(temporary, 'w', compression=zipfile.ZIP_DEFLATED) as archive, \
+                ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="snap7-backup") as executor:
+            for future in as_completed([executor.submit(fetch, key) for key in blocks]):
+                key, info, data = future.result()
+                if data is None:
+                    data = previous_archive.read(previous_blocks[key]['file'])
+                    if _sha256(data) == previous_blocks[key]['sha256']:
+                        reused += 1
+                    else:
+                        logger.warning("%s is corrupt in %s, uploading it", block_file(*key), previous)
+                        data = upload(key)
+                        uploaded += 1
+                else:
+                    uploaded += 1
+                checksum, code_date = _signature(info)
+                name = block_file(*key)
+                archive.writestr(name, data)
+                entries.append({
+                    'type': key[0],
+                    'number': key[1],
+                    'file': name,
+                    'size': len(data),
+                    'sha256': _sha256(data),
+                    'checksum': checksum,
+                    'code_date': code_date,
+                })
+            manifest = {
+                'format': manifest_format,
+                'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'uploaded': uploaded,
+                'reused': reused,
+                'blocks': sorted(entries, key=lambda entry: (entry['type'], entry['number'])),
+            }
+            archive.writestr(manifest_name, json.dumps(manifest, indent=1))
+        if previous_archive is not None:
+            previous_archive.close()
+            previous_archive = None
+        os.replace(temporary, path)
+    finally:
+        if previous_archive is not None:
+            previous_archive.close()
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    logger.info("backup %s: %s blocks uploaded, %s unchanged", path, uploaded, reused)
+    return manifest
+
+
+def restore(clients, path, block_types=None):
+    """
+    Downloads the blocks of a backup archive to a PLC.
+
+    All blocks are checked against their SHA-256 before the first download,
+    nothing is downloaded from a corrupt archive.
+
+    :param clients: a connected :class:`snap7.client.Client`, or a list of
+        clients connected to the same PLC to download with
+    :param path: the archive
+    :param block_types: only restore the blocks of these types, None for all
+    :returns: the list of (block type, number) tuples restored
+    """
+    pool = _ClientPool(_clients(clients))
+    blocks = []
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read(manifest_name))
+        for block in manifest['blocks']:
+            if block_types is None or block['type'] in block_types:
+                data = archive.read(block['file'])
+                if _sha256(data) != block['sha256']:
+                    raise ValueError(f"{block['file']} is corrupt in {path}")
+                blocks.append(((block['type'], block['number']), data))
+
+    def download(item):
+        key, data = item
+        with pool.client() as client:
+            client.download(data, key[1])
+        return key
+
+    with ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="snap7-restore") as executor:
+        restored = list(executor.map(download, blocks))
+    logger.info("restore %s: %s blocks downloaded", path, len(restored))
+    return restored
+
+
+def backup_many(jobs, max_workers=None):
+    """
+    Backs up several PLCs concurrently.
+
+    :param jobs: dicts of keyword arguments of :func:`backup`, one per PLC
+    :param max_workers: maximum number of PLCs backed up at the same time,
+        by default all of them
+    :returns: a list with for every job the manifest, or the exception
+        raised by its backup
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    def run(job):
+        try:
+            return backup(**job)
+        except Exception as e:
+            logger.exception("backup %s failed", job.get('path'))
+            return e
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(jobs), thread_name_prefix="snap7-backups") as executor:
+        return list(executor.map(run, jobs))
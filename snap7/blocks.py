@@ -0,0 +1,174 @@
+"""
+Cache of the block metadata of PLCs.
+
+Inventories of the blocks of a PLC take one :meth:`Client.get_block_info`
+round trip per block. A :class:`BlockCache` keeps the block information of
+a PLC and only reads the blocks which were added, or whose information is
+older than max_age, on a refresh. The refreshes of several PLCs run
+concurrently with :func:`get_all_block_info`::
+
+    caches = [BlockCache(client) for client in clients]
+    for infos in get_all_block_info(caches):
+        ...
+
+A block whose checksum or code date differ from the cached information is
+reported as changed by :meth:`BlockCache.refresh`.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import snap7.types
+
+logger = logging.getLogger(__name__)
+
+
+def signature(info):
+    """
+    Returns what identifies a version of a block: its checksum and code date.
+
+    :param info: a :class:`snap7.types.TS7BlockInfo`
+    """
+    return info.CheckSum, info.CodeDate
+
+
+class BlockCache:
+    """
+    The block information of a single PLC, keyed by block type and number.
+
+    The cache uses the client from the thread calling it, a client isn't
+    thread safe so don't use it from other threads at the same time.
+    """
+
+    def __init__(self, client, max_age=3600.0):
+        """
+        :param client: a connected :class:`snap7.client.Client`
+        :param max_age: seconds the information of a block is used before
+            it is read again on a refresh, None to keep it until the block
+            is removed or invalidated
+        """
+        self.client = client
+        self.max_age = max_age
+        self.reads = 0
+        self._lock = threading.Lock()
+        # (block type, number) -> (time read, TS7BlockInfo)
+        self._infos = {}
+
+    def _expired(self, entry, now):
+        return entry is None or (self.max_age is not None and now - entry[0] >= self.max_age)
+
+    def _read(self, block_type, number):
+        info = self.client.get_block_info(block_type, number)
+        self.reads += 1
+        return info
+
+    def list_blocks(self):
+        """
+        Lists the blocks of the PLC, skipping the types without blocks.
+
+        :returns: a sorted list of (block type, number) tuples
+        """
+        counts = self.client.list_blocks()
+        blocks = []
+        for block_type in snap7.types.block_types:
+            count = getattr(counts, f'{block_type}Count')
+            if count:
+                blocks.extend((block_type, number) for number in self.client.list_blocks_of_type(block_type, count))
+        return sorted(blocks)
+
+    def get_block_info(self, block_type, number):
+        """
+        Returns the information of a block, read from the PLC if it isn't
+        cached or is older than max_age.
+
+        :returns: a :class:`snap7.types.TS7BlockInfo`
+        """
+        key = (block_type, number)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._infos.get(key)
+        if not self._expired(entry, now):
+            return entry[1]
+        info = self._read(block_type, number)
+        with self._lock:
+            self._infos[key] = (now, info)
+        return info
+
+    def refresh(self):
+        """
+        Lists the blocks of the PLC and reads the information of the added
+        blocks and of the blocks older than max_age.
+
+        :returns: a dict with the added, changed and removed (block type,
+            number) tuples
+        """
+        blocks = self.list_blocks()
+        now = time.monotonic()
+        changes = {'added': [], 'changed': [], 'removed': []}
+        with self._lock:
+            removed = set(self._infos).difference(blocks)
+            for key in removed:
+                del self._infos[key]
+            entries = {key: self._infos.get(key) for key in blocks}
+        changes['removed'] = sorted(removed)
+        for key, entry in entries.items():
+            if not self._expired(entry, now):
+                continue
+            info = self._read(*key)
+            if entry is None:
+                changes['added'].append(key)
+            elif signature(info) != signature(entry[1]):
+                changes['changed'].append(key)
+            with self._lock:
+                self._infos[key] = (now, info)
+        if any(changes.values()):
+            logger.info("blocks added: %s changed: %s removed: %s",
+                        len(changes['added']), len(changes['changed']), len(changes['removed']))
+        return changes
+
+    def infos(self):
+        """
+        Returns the cached information as a dict of (block type, number) to
+        :class:`snap7.types.TS7BlockInfo`.
+        """
+        with self._lock:
+            return {key: entry[1] for key, entry in sorted(self._infos.items())}
+
+    def invalidate(self, block_type=None, number=None):
+        """
+        Forgets cached information, it is read again on the next refresh.
+
+        :param block_type: only forget the blocks of this type
+        :param number: only forget the block with this number
+        """
+        with self._lock:
+            for key in list(self._infos):
+                if block_type in (None, key[0]) and number in (None, key[1]):
+                    del self._infos[key]
+
+
+def get_all_block_info(caches, max_workers=None):
+    """
+    Refreshes block caches concurrently, one thread per PLC.
+
+    :param caches: :class:`BlockCache` objects, one per PLC
+    :param max_workers: maximum number of PLCs refreshed at the same time,
+        by default all of them
+    :returns: a list with for every cache the dict returned by
+        :meth:`BlockCache.infos`, or the exception raised by its refresh
+    """
+    caches = list(caches)
+    if not caches:
+        return []
+
+    def refresh(cache):
+        try:
+            cache.refresh()
+        except Exception as e:
+            logger.exception("refreshing the blocks of a PLC failed")
+            return e
+        return cache.infos()
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(caches), thread_name_prefix="snap7-blocks") as executor:
+        return list(executor.map(refresh, caches))
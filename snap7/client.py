@@ -3,11 +3,12 @@ Snap7 client used for connection to a siemens7 server.
 """
 import logging
 import re
+import time
 from ctypes import c_int, c_char_p, byref, sizeof, c_uint16, c_int32, c_byte
-from ctypes import c_void_p
 from datetime import datetime
 
 import snap7
+import snap7.szl
 from snap7.common import check_error, load_library, ipv4
 from snap7.exceptions import Snap7Exception
 from snap7.types import S7Object, buffer_type, buffer_size, BlocksList
@@ -34,6 +35,10 @@ class Client:
     def __init__(self):
         self._read_callback = None
         self._callback = None
+        self._trace_hook = None
+        self._trace_every = 1
+        self._trace_count = 0
+        self._address = None
         self._pointer = None
         self._library = load_library()
         self.create()
@@ -46,7 +51,6 @@ class Client:
         create a SNAP7 client.
         """
         logger.info("creating snap7 client")
-        self._library.Cli_Create.restype = c_void_p
         self._pointer = S7Object(self._library.Cli_Create())
 
     def destroy(self):
@@ -58,6 +62,53 @@ class Client:
             return self._library.Cli_Destroy(byref(self._pointer))
         self._pointer = None
 
+    def set_trace_hook(self, hook, sample_every=1):
+        """
+        Sets a function called after the data calls db_read, db_write,
+        read_area, write_area, ab_read and ab_write, and as_db_read,
+        as_db_write, as_ab_read and as_ab_write of the asyncio client.
+
+        The hook is called as ``hook(event)``, event is a dict with the keys
+        operation, address (of the PLC), area, db_number, start, size, result
+        (the error code), duration (seconds spent in the library) and data
+        (the ctypes buffer written, or read when result is 0).
+
+        :param hook: a callable, or None to remove the hook
+        :param sample_every: only call the hook for one of sample_every calls
+        """
+        self._trace_hook = hook
+        self._trace_every = sample_every
+        self._trace_count = 0
+
+    def _trace_start(self):
+        """
+        Returns the start time if the current call is traced, else 0.
+        """
+        if self._trace_hook is None:
+            return 0
+        self._trace_count += 1
+        if self._trace_count < self._trace_every:
+            return 0
+        self._trace_count = 0
+        return time.perf_counter()
+
+    def _trace(self, operation, started, result, area, db_number, start, size, data=None):
+        duration = time.perf_counter() - started
+        try:
+            self._trace_hook({
+                'operation': operation,
+                'address': self._address,
+                'area': area,
+                'db_number': db_number,
+                'start': start,
+                'size': size,
+                'result': result,
+                'duration': duration,
+                'data': data,
+            })
+        except Exception:
+            logger.exception("trace hook failed")
+
     def plc_stop(self):
         """
         stops a client
@@ -94,7 +145,7 @@ class Client:
         if not status_string:
             raise Snap7Exception(f"The cpu state ({state.value}) is invalid")
 
-        logger.debug(f"CPU state is {status_string}")
+        logger.debug("CPU state is %s", status_string)
         return status_string
 
     def get_cpu_info(self):
@@ -106,6 +157,37 @@ class Client:
         check_error(result, context="client")
         return info
 
+    def read_szl(self, ssl_id, index=0x0000):
+        """
+        Reads a partial list of the system status list (SZL) of the PLC.
+
+        Use a :class:`snap7.szl.SZLCache` for diagnostics which are polled
+        often.
+
+        :param ssl_id: ID of the partial list, e.g. 0x0011 for the module
+            identification
+        :param index: index of the partial list
+        :returns: a :class:`snap7.szl.SZL`, the records of the known partial
+            lists are parsed
+        """
+        logger.debug("read_szl ssl_id:0x%04X index:0x%04X", ssl_id, index)
+        data = snap7.types.S7SZL()
+        size = c_int(sizeof(data))
+        result = self._library.Cli_ReadSZL(self._pointer, ssl_id, index, byref(data), byref(size))
+        check_error(result, context="client")
+        return snap7.szl.parse(ssl_id, index, data, size.value)
+
+    def read_szl_list(self):
+        """
+        Returns the IDs of the partial lists of the system status list
+        available in the PLC.
+        """
+        data = snap7.types.S7SZLList()
+        count = c_int(len(data.List))
+        result = self._library.Cli_ReadSZLList(self._pointer, byref(data), byref(count))
+        check_error(result, context="client")
+        return list(data.List[:count.value])
+
     @error_wrap
     def disconnect(self):
         """
@@ -126,6 +208,7 @@ class Client:
         logger.info(f"connecting to {address}:{tcpport} rack {rack} slot {slot}")
 
         self.set_param(snap7.types.RemotePort, tcpport)
+        self._address = address
         return self._library.Cli_ConnectTo(
             self._pointer, c_char_p(address.encode()),
             c_int(rack), c_int(slot))
@@ -135,13 +218,16 @@ class Client:
 
         :returns: user buffer.
         """
-        logger.debug(f"db_read, db_number:{db_number}, start:{start}, size:{size}")
+        logger.debug("db_read, db_number:%s, start:%s, size:%s", db_number, start, size)
 
         type_ = snap7.types.wordlen_to_ctypes[snap7.types.S7WLByte]
         data = (type_ * size)()
+        started = self._trace_start()
         result = (self._library.Cli_DBRead(
             self._pointer, db_number, start, size,
             byref(data)))
+        if started:
+            self._trace("db_read", started, result, snap7.types.S7AreaDB, db_number, start, size, data)
         check_error(result, context="client")
         return bytearray(data)
 
@@ -157,9 +243,13 @@ class Client:
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         size = len(data)
         cdata = (type_ * size).from_buffer_copy(data)
-        logger.debug(f"db_write db_number:{db_number} start:{start} size:{size} data:{data}")
-        return self._library.Cli_DBWrite(self._pointer, db_number, start, size,
-                                         byref(cdata))
+        logger.debug("db_write db_number:%s start:%s size:%s", db_number, start, size)
+        started = self._trace_start()
+        result = self._library.Cli_DBWrite(self._pointer, db_number, start, size,
+                                           byref(cdata))
+        if started:
+            self._trace("db_write", started, result, snap7.types.S7AreaDB, db_number, start, size, cdata)
+        return result
 
     def delete(self, block_type, block_num):
         """
@@ -196,7 +286,7 @@ class Client:
 
         :param block_num: bytearray
         """
-        logger.debug(f"db_upload block_num: {block_num}")
+        logger.debug("db_upload block_num: %s", block_num)
         block_type = snap7.types.block_types['DB']
         _buffer = buffer_type()
         size = c_int(sizeof(_buffer))
@@ -228,7 +318,7 @@ class Client:
     def db_get(self, db_number):
         """Uploads a DB from AG.
         """
-        logger.debug(f"db_get db_number: {db_number}")
+        logger.debug("db_get db_number: %s", db_number)
         _buffer = buffer_type()
         result = self._library.Cli_DBGet(
             self._pointer, db_number, byref(_buffer),
@@ -252,10 +342,14 @@ class Client:
         else:
             wordlen = snap7.types.S7WLByte
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
-        logger.debug(f"reading area: {area} dbnumber: {dbnumber} start: {start}: amount {size}: wordlen: {wordlen}")
+        logger.debug("reading area: %s dbnumber: %s start: %s: amount %s: wordlen: %s",
+                     area, dbnumber, start, size, wordlen)
         data = (type_ * size)()
+        started = self._trace_start()
         result = self._library.Cli_ReadArea(self._pointer, area, dbnumber, start,
                                             size, wordlen, byref(data))
+        if started:
+            self._trace("read_area", started, result, area, dbnumber, start, size, data)
         check_error(result, context="client")
         return bytearray(data)
 
@@ -278,11 +372,15 @@ class Client:
             wordlen = snap7.types.S7WLByte
         type_ = snap7.types.wordlen_to_ctypes[snap7.types.S7WLByte]
         size = len(data)
-        logger.debug(f"writing area: {area} dbnumber: {dbnumber} start: {start}: size {size}: "
-                     f"wordlen {wordlen} type: {type_}")
+        logger.debug("writing area: %s dbnumber: %s start: %s: size %s: wordlen %s",
+                     area, dbnumber, start, size, wordlen)
         cdata = (type_ * len(data)).from_buffer_copy(data)
-        return self._library.Cli_WriteArea(self._pointer, area, dbnumber, start,
-                                           size, wordlen, byref(cdata))
+        started = self._trace_start()
+        result = self._library.Cli_WriteArea(self._pointer, area, dbnumber, start,
+                                             size, wordlen, byref(cdata))
+        if started:
+            self._trace("write_area", started, result, area, dbnumber, start, size, cdata)
+        return result
 
     def read_multi_vars(self, items):
         """This function read multiple variables from the PLC.
@@ -304,33 +402,43 @@ class Client:
         blocksList = BlocksList()
         result = self._library.Cli_ListBlocks(self._pointer, byref(blocksList))
         check_error(result, context="client")
-        logger.debug(f"blocks: {blocksList}")
+        logger.debug("blocks: %s", blocksList)
         return blocksList
 
-    def list_blocks_of_type(self, blocktype, size):
-        """This function returns the AG list of a specified block type."""
+    def list_blocks_of_type(self, blocktype, size=None):
+        """
+        Returns the numbers of the AG blocks of a type.
 
-        blocktype = snap7.types.block_types.get(blocktype)
+        :param blocktype: the block type, a key of snap7.types.block_types,
+            e.g. 'DB'
+        :param size: maximum number of blocks returned, by default the number
+            of blocks of the type given by :meth:`list_blocks`
+        :returns: a list of block numbers
+        """
+        blocktype_ = snap7.types.block_types.get(blocktype)
 
-        if not blocktype:
+        if not blocktype_:
             raise Snap7Exception("The blocktype parameter was invalid")
 
-        logger.debug(f"listing blocks of type: {blocktype} size: {size}")
+        if size is None:
+            size = getattr(self.list_blocks(), f'{blocktype}Count')
+
+        logger.debug("listing blocks of type: %s size: %s", blocktype, size)
 
         if size == 0:
-            return 0
+            return []
 
         data = (c_uint16 * size)()
         count = c_int(size)
         result = self._library.Cli_ListBlocksOfType(
-            self._pointer, blocktype,
+            self._pointer, blocktype_,
             byref(data),
             byref(count))
 
-        logger.debug(f"number of items found: {count}")
+        logger.debug("number of items found: %s", count.value)
 
         check_error(result, context="client")
-        return data
+        return list(data[:count.value])
 
     def get_block_info(self, blocktype, db_number):
         """Returns the block information for the specified block."""
@@ -339,7 +447,7 @@ class Client:
 
         if not blocktype:
             raise Snap7Exception("The blocktype parameter was invalid")
-        logger.debug(f"retrieving block info for block {db_number} of type {blocktype}")
+        logger.debug("retrieving block info for block %s of type %s", db_number, blocktype)
 
         data = TS7BlockInfo()
 
@@ -371,7 +479,8 @@ class Client:
         :param remote_tsap: Remote TSAP (PLC TSAP)
         """
         assert re.match(ipv4, address), f'{address} is invalid ipv4'
-        result = self._library.Cli_SetConnectionParams(self._pointer, address,
+        self._address = address
+        result = self._library.Cli_SetConnectionParams(self._pointer, address.encode(),
                                                        c_uint16(local_tsap),
                                                        c_uint16(remote_tsap))
         if result != 0:
@@ -407,9 +516,12 @@ class Client:
         wordlen = snap7.types.S7WLByte
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         data = (type_ * size)()
-        logger.debug(f"ab_read: start: {start}: size {size}: ")
+        logger.debug("ab_read: start: %s: size %s", start, size)
+        started = self._trace_start()
         result = self._library.Cli_ABRead(self._pointer, start, size,
                                           byref(data))
+        if started:
+            self._trace("ab_read", started, result, snap7.types.S7AreaPA, 0, start, size, data)
         check_error(result, context="client")
         return bytearray(data)
 
@@ -422,9 +534,13 @@ class Client:
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         size = len(data)
         cdata = (type_ * size).from_buffer_copy(data)
-        logger.debug(f"ab write: start: {start}: size: {size}: ")
-        return self._library.Cli_ABWrite(
+        logger.debug("ab write: start: %s: size: %s", start, size)
+        started = self._trace_start()
+        result = self._library.Cli_ABWrite(
             self._pointer, start, size, byref(cdata))
+        if started:
+            self._trace("ab_write", started, result, snap7.types.S7AreaPA, 0, start, size, cdata)
+        return result
 
     def as_ab_read(self, start, size):
         """
@@ -433,7 +549,7 @@ class Client:
         wordlen = snap7.types.S7WLByte
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         data = (type_ * size)()
-        logger.debug(f"ab_read: start: {start}: size {size}: ")
+        logger.debug("as_ab_read: start: %s: size %s", start, size)
         result = self._library.Cli_AsABRead(self._pointer, start, size,
                                             byref(data))
         check_error(result, context="client")
@@ -447,7 +563,7 @@ class Client:
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         size = len(data)
         cdata = (type_ * size).from_buffer_copy(data)
-        logger.debug(f"ab write: start: {start}: size: {size}: ")
+        logger.debug("as_ab_write: start: %s: size: %s", start, size)
         return self._library.Cli_AsABWrite(
             self._pointer, start, size, byref(cdata))
 
@@ -458,11 +574,13 @@ class Client:
         """
         return self._library.Cli_AsCompress(self._pointer, time)
 
-    def copy_ram_to_rom(self):
+    def copy_ram_to_rom(self, timeout=1):
         """
+        Performs the Copy Ram to Rom action asynchronously.
 
+        :param timeout: Maximum time expected to complete the operation (ms).
         """
-        return self._library.Cli_AsCopyRamToRom(self._pointer)
+        return self._library.Cli_AsCopyRamToRom(self._pointer, timeout)
 
     def as_ct_read(self):
         """
@@ -486,7 +604,7 @@ class Client:
         """
         This is the asynchronous counterpart of Cli_DBGet.
         """
-        logger.debug(f"db_get db_number: {db_number}")
+        logger.debug("db_get db_number: %s", db_number)
         _buffer = buffer_type()
         result = self._library.Cli_AsDBGet(self._pointer, db_number,
                                            byref(_buffer),
@@ -500,7 +618,7 @@ class Client:
 
         :returns: user buffer.
         """
-        logger.debug(f"db_read, db_number:{db_number}, start:{start}, size:{size}")
+        logger.debug("as_db_read, db_number:%s, start:%s, size:%s", db_number, start, size)
 
         type_ = snap7.types.wordlen_to_ctypes[snap7.types.S7WLByte]
         data = (type_ * size)()
@@ -516,7 +634,7 @@ class Client:
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         size = len(data)
         cdata = (type_ * size).from_buffer_copy(data)
-        logger.debug(f"db_write db_number:{db_number} start:{start} size:{size} data:{data}")
+        logger.debug("as_db_write db_number:%s start:%s size:%s", db_number, start, size)
         return self._library.Cli_AsDBWrite(
             self._pointer, db_number, start, size,
             byref(cdata))
@@ -550,7 +668,7 @@ class Client:
     def set_param(self, number, value):
         """Sets an internal Server object parameter.
         """
-        logger.debug(f"setting param number {number} to {value}")
+        logger.debug("setting param number %s to %s", number, value)
         type_ = param_types[number]
         return self._library.Cli_SetParam(self._pointer, number,
                                           byref(type_(value)))
@@ -558,7 +676,7 @@ class Client:
     def get_param(self, number):
         """Reads an internal Client object parameter.
         """
-        logger.debug(f"retreiving param number {number}")
+        logger.debug("retreiving param number %s", number)
         type_ = param_types[number]
         value = type_()
         code = self._library.Cli_GetParam(self._pointer, c_int(number),
@@ -566,6 +684,15 @@ class Client:
         check_error(code)
         return value.value
 
+    def get_exec_time(self):
+        """
+        Returns the execution time of the last job, in milliseconds.
+        """
+        exec_time = c_int32()
+        result = self._library.Cli_GetExecTime(self._pointer, byref(exec_time))
+        check_error(result, context="client")
+        return exec_time.value
+
     def get_pdu_length(self):
         """
         Returns info about the PDU length.
@@ -644,14 +771,6 @@ class Client:
         # Cli_AsReadArea
         raise NotImplementedError
 
-    def asreadszl(self):
-        # Cli_AsReadSZL
-        raise NotImplementedError
-
-    def asreadszllist(self):
-        # Cli_AsReadSZLList
-        raise NotImplementedError
-
     def astmread(self):
         # Cli_AsTMRead
         raise NotImplementedError
@@ -708,10 +827,6 @@ class Client:
         # Cli_GetCpInfo
         raise NotImplementedError
 
-    def getexectime(self):
-        # Cli_GetExecTime
-        raise NotImplementedError
-
     def getlasterror(self):
         # Cli_GetLastError
         raise NotImplementedError
@@ -756,14 +871,6 @@ class Client:
         # Cli_ReadMultiVars
         raise NotImplementedError
 
-    def readszl(self):
-        # Cli_ReadSZL
-        raise NotImplementedError
-
-    def readszllist(self):
-        # Cli_ReadSZLList
-        raise NotImplementedError
-
     def setascallback(self):
         # Cli_SetAsCallback
         raise NotImplementedError
@@ -3,10 +3,12 @@ Snap7 async client used for connection to a siemens7 server.
 """
 import asyncio
 import logging
-from ctypes import c_int, byref, c_byte
+from ctypes import c_int, byref, c_byte, sizeof
 
 import snap7
+import snap7.szl
 from snap7.common import check_error
+from snap7.error import errCliJobTimeout
 from snap7.types import buffer_type, buffer_size
 from .client import Client
 
@@ -62,12 +64,16 @@ class ClientAsync(Client):
         This is the asynchronous counterpart of Cli_DBRead with asyncio features.
         :returns: user buffer.
         """
-        logger.debug(f"db_read, db_number:{db_number}, start:{start}, size:{size}")
+        logger.debug("as_db_read, db_number:%s, start:%s, size:%s", db_number, start, size)
 
         type_ = snap7.types.wordlen_to_ctypes[snap7.types.S7WLByte]
         data = (type_ * size)()
+        started = self._trace_start()
         result = (self._library.Cli_AsDBRead(self._pointer, db_number, start, size, byref(data)))
         request_in_time = await self.as_check_and_wait(timeout)
+        if started:
+            self._trace("as_db_read", started, self._as_result(result, request_in_time), snap7.types.S7AreaDB,
+                        db_number, start, size, data)
         if request_in_time is False:
             return None
         check_error(result, context="client")
@@ -81,9 +87,13 @@ class ClientAsync(Client):
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         size = len(data)
         cdata = (type_ * size).from_buffer_copy(data)
-        logger.debug(f"db_write db_number:{db_number} start:{start} size:{size} data:{data}")
+        logger.debug("as_db_write db_number:%s start:%s size:%s", db_number, start, size)
+        started = self._trace_start()
         check = self._library.Cli_AsDBWrite(self._pointer, db_number, start, size, byref(cdata))
         request_in_time = await self.as_check_and_wait(timeout)
+        if started:
+            self._trace("as_db_write", started, self._as_result(check, request_in_time), snap7.types.S7AreaDB,
+                        db_number, start, size, cdata)
         if request_in_time is False:
             return None
         return check
@@ -96,9 +106,13 @@ class ClientAsync(Client):
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         size = len(data)
         cdata = (type_ * size).from_buffer_copy(data)
-        logger.debug(f"ab write: start: {start}: size: {size}: ")
+        logger.debug("as_ab_write: start: %s: size: %s", start, size)
+        started = self._trace_start()
         check = self._library.Cli_AsABWrite(self._pointer, start, size, byref(cdata))
         request_in_time = await self.as_check_and_wait(timeout)
+        if started:
+            self._trace("as_ab_write", started, self._as_result(check, request_in_time), snap7.types.S7AreaPA,
+                        0, start, size, cdata)
         if request_in_time is False:
             return None
         return check
@@ -110,15 +124,26 @@ class ClientAsync(Client):
         wordlen = snap7.types.S7WLByte
         type_ = snap7.types.wordlen_to_ctypes[wordlen]
         data = (type_ * size)()
-        logger.debug(f"ab_read: start: {start}: size {size}: ")
+        logger.debug("as_ab_read: start: %s: size %s", start, size)
+        started = self._trace_start()
         result = self._library.Cli_AsABRead(self._pointer, start, size,
                                             byref(data))
         request_in_time = await self.as_check_and_wait(timeout)
+        if started:
+            self._trace("as_ab_read", started, self._as_result(result, request_in_time), snap7.types.S7AreaPA,
+                        0, start, size, data)
         if request_in_time is False:
             return None
         check_error(result, context="client")
         return bytearray(data)
 
+    @staticmethod
+    def _as_result(result, request_in_time):
+        # error code of a traced request, a request which didn't complete in time is a job timeout
+        if result == 0 and request_in_time is False:
+            return errCliJobTimeout
+        return result
+
     async def as_check_and_wait(self, timeout):
         """
         This method handles asynchronous asyncio requests, depending on their as_check mode.
@@ -145,7 +170,7 @@ class ClientAsync(Client):
         """
         This is the asynchronous counterpart of Cli_DBGet with asyncio features.
         """
-        logger.debug(f"db_get db_number: {db_number}")
+        logger.debug("as_db_get db_number: %s", db_number)
         _buffer = buffer_type()
         result = self._library.Cli_AsDBGet(self._pointer, db_number, byref(_buffer), byref(c_int(buffer_size)))
         request_in_time = await self.as_check_and_wait(timeout)
@@ -154,6 +179,35 @@ class ClientAsync(Client):
         check_error(result, context="client")
         return bytearray(_buffer)
 
+    async def as_read_szl(self, ssl_id, index=0x0000, timeout=1):
+        """
+        This is the asynchronous counterpart of read_szl with asyncio features.
+
+        :returns: a :class:`snap7.szl.SZL`
+        """
+        logger.debug("as_read_szl ssl_id:0x%04X index:0x%04X", ssl_id, index)
+        data = snap7.types.S7SZL()
+        size = c_int(sizeof(data))
+        result = self._library.Cli_AsReadSZL(self._pointer, ssl_id, index, byref(data), byref(size))
+        request_in_time = await self.as_check_and_wait(timeout)
+        if request_in_time is False:
+            return None
+        check_error(result, context="client")
+        return snap7.szl.parse(ssl_id, index, data, size.value)
+
+    async def as_read_szl_list(self, timeout=1):
+        """
+        This is the asynchronous counterpart of read_szl_list with asyncio features.
+        """
+        data = snap7.types.S7SZLList()
+        count = c_int(len(data.List))
+        result = self._library.Cli_AsReadSZLList(self._pointer, byref(data), byref(count))
+        request_in_time = await self.as_check_and_wait(timeout)
+        if request_in_time is False:
+            return None
+        check_error(result, context="client")
+        return list(data.List[:count.value])
+
     @error_wrap
     async def as_download(self, data, block_num=-1, timeout=1):
         """
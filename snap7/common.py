@@ -1,9 +1,12 @@
+import functools
 import logging
 import platform
-from ctypes import c_char
+import time
+from ctypes import c_char, c_char_p, c_int, c_uint16, c_uint32, c_void_p
 from ctypes.util import find_library
 
-from snap7.exceptions import Snap7Exception
+from snap7.error import context_exceptions
+from snap7.exceptions import Snap7Exception, ConnectionException
 
 if platform.system() == 'Windows':
     from ctypes import windll as cdll  # type: ignore
@@ -24,6 +27,134 @@ class ADict(dict):
     __setattr__ = dict.__setitem__
 
 
+# (restype, argtypes) of the library functions, see snap7.h. S7Object
+# handles, buffers and all other pointers are declared as c_void_p, so
+# byref() arguments of any type are accepted.
+_handle = c_void_p
+_pointer = c_void_p
+_prototypes = {
+    # client
+    'Cli_Create': (_handle, ()),
+    'Cli_Destroy': (None, (_pointer,)),
+    'Cli_ConnectTo': (c_int, (_handle, c_char_p, c_int, c_int)),
+    'Cli_SetConnectionParams': (c_int, (_handle, c_char_p, c_uint16, c_uint16)),
+    'Cli_SetConnectionType': (c_int, (_handle, c_uint16)),
+    'Cli_Connect': (c_int, (_handle,)),
+    'Cli_Disconnect': (c_int, (_handle,)),
+    'Cli_GetParam': (c_int, (_handle, c_int, _pointer)),
+    'Cli_SetParam': (c_int, (_handle, c_int, _pointer)),
+    'Cli_ReadArea': (c_int, (_handle, c_int, c_int, c_int, c_int, c_int, _pointer)),
+    'Cli_WriteArea': (c_int, (_handle, c_int, c_int, c_int, c_int, c_int, _pointer)),
+    'Cli_ReadMultiVars': (c_int, (_handle, _pointer, c_int)),
+    'Cli_WriteMultiVars': (c_int, (_handle, _pointer, c_int)),
+    'Cli_DBRead': (c_int, (_handle, c_int, c_int, c_int, _pointer)),
+    'Cli_DBWrite': (c_int, (_handle, c_int, c_int, c_int, _pointer)),
+    'Cli_ABRead': (c_int, (_handle, c_int, c_int, _pointer)),
+    'Cli_ABWrite': (c_int, (_handle, c_int, c_int, _pointer)),
+    'Cli_ListBlocks': (c_int, (_handle, _pointer)),
+    'Cli_ListBlocksOfType': (c_int, (_handle, c_int, _pointer, _pointer)),
+    'Cli_GetAgBlockInfo': (c_int, (_handle, c_int, c_int, _pointer)),
+    'Cli_Upload': (c_int, (_handle, c_int, c_int, _pointer, _pointer)),
+    'Cli_FullUpload': (c_int, (_handle, c_int, c_int, _pointer, _pointer)),
+    'Cli_Download': (c_int, (_handle, c_int, _pointer, c_int)),
+    'Cli_Delete': (c_int, (_handle, c_int, c_int)),
+    'Cli_DBGet': (c_int, (_handle, c_int, _pointer, _pointer)),
+    'Cli_DBFill': (c_int, (_handle, c_int, c_int)),
+    'Cli_GetPlcDateTime': (c_int, (_handle, _pointer)),
+    'Cli_SetPlcDateTime': (c_int, (_handle, _pointer)),
+    'Cli_GetCpuInfo': (c_int, (_handle, _pointer)),
+    'Cli_ReadSZL': (c_int, (_handle, c_int, c_int, _pointer, _pointer)),
+    'Cli_ReadSZLList': (c_int, (_handle, _pointer, _pointer)),
+    'Cli_PlcHotStart': (c_int, (_handle,)),
+    'Cli_PlcColdStart': (c_int, (_handle,)),
+    'Cli_PlcStop': (c_int, (_handle,)),
+    'Cli_CopyRamToRom': (c_int, (_handle, c_int)),
+    'Cli_Compress': (c_int, (_handle, c_int)),
+    'Cli_GetPlcStatus': (c_int, (_handle, _pointer)),
+    'Cli_SetSessionPassword': (c_int, (_handle, c_char_p)),
+    'Cli_ClearSessionPassword': (c_int, (_handle,)),
+    'Cli_GetConnected': (c_int, (_handle, _pointer)),
+    'Cli_GetPduLength': (c_int, (_handle, _pointer, _pointer)),
+    'Cli_ErrorText': (c_int, (c_int, _pointer, c_int)),
+    'Cli_GetExecTime': (c_int, (_handle, _pointer)),
+    'Cli_CheckAsCompletion': (c_int, (_handle, _pointer)),
+    'Cli_WaitAsCompletion': (c_int, (_handle, c_int)),
+    'Cli_AsABRead': (c_int, (_handle, c_int, c_int, _pointer)),
+    'Cli_AsABWrite': (c_int, (_handle, c_int, c_int, _pointer)),
+    'Cli_AsDBRead': (c_int, (_handle, c_int, c_int, c_int, _pointer)),
+    'Cli_AsDBWrite': (c_int, (_handle, c_int, c_int, c_int, _pointer)),
+    'Cli_AsDBGet': (c_int, (_handle, c_int, _pointer, _pointer)),
+    'Cli_AsDBFill': (c_int, (_handle, c_int, c_int)),
+    'Cli_AsDownload': (c_int, (_handle, c_int, _pointer, c_int)),
+    'Cli_AsCompress': (c_int, (_handle, c_int)),
+    'Cli_AsCopyRamToRom': (c_int, (_handle, c_int)),
+    'Cli_AsCTRead': (c_int, (_handle, c_int, c_int, _pointer)),
+    'Cli_AsCTWrite': (c_int, (_handle, c_int, c_int, _pointer)),
+    'Cli_AsReadSZL': (c_int, (_handle, c_int, c_int, _pointer, _pointer)),
+    'Cli_AsReadSZLList': (c_int, (_handle, _pointer, _pointer)),
+    # server
+    'Srv_Create': (_handle, ()),
+    'Srv_Destroy': (None, (_pointer,)),
+    'Srv_GetParam': (c_int, (_handle, c_int, _pointer)),
+    'Srv_SetParam': (c_int, (_handle, c_int, _pointer)),
+    'Srv_StartTo': (c_int, (_handle, c_char_p)),
+    'Srv_Start': (c_int, (_handle,)),
+    'Srv_Stop': (c_int, (_handle,)),
+    'Srv_RegisterArea': (c_int, (_handle, c_int, c_uint16, _pointer, c_int)),
+    'Srv_UnregisterArea': (c_int, (_handle, c_int, c_uint16)),
+    'Srv_LockArea': (c_int, (_handle, c_int, c_uint16)),
+    'Srv_UnlockArea': (c_int, (_handle, c_int, c_uint16)),
+    'Srv_GetStatus': (c_int, (_handle, _pointer, _pointer, _pointer)),
+    'Srv_SetCpuStatus': (c_int, (_handle, c_int)),
+    'Srv_ClearEvents': (c_int, (_handle,)),
+    'Srv_PickEvent': (c_int, (_handle, _pointer, _pointer)),
+    'Srv_GetMask': (c_int, (_handle, c_int, _pointer)),
+    'Srv_SetMask': (c_int, (_handle, c_int, c_uint32)),
+    'Srv_SetEventsCallback': (c_int, (_handle, _pointer, _pointer)),
+    'Srv_SetReadEventsCallback': (c_int, (_handle, _pointer, _pointer)),
+    'Srv_SetRWAreaCallback': (c_int, (_handle, _pointer, _pointer)),
+    'Srv_EventText': (c_int, (_pointer, _pointer, c_int)),
+    'Srv_ErrorText': (c_int, (c_int, _pointer, c_int)),
+    # partner
+    'Par_Create': (_handle, (c_int,)),
+    'Par_Destroy': (None, (_pointer,)),
+    'Par_GetParam': (c_int, (_handle, c_int, _pointer)),
+    'Par_SetParam': (c_int, (_handle, c_int, _pointer)),
+    'Par_StartTo': (c_int, (_handle, c_char_p, c_char_p, c_uint16, c_uint16)),
+    'Par_Start': (c_int, (_handle,)),
+    'Par_Stop': (c_int, (_handle,)),
+    'Par_SetSendCallback': (c_int, (_handle, _pointer, _pointer)),
+    'Par_SetRecvCallback': (c_int, (_handle, _pointer, _pointer)),
+    'Par_BSend': (c_int, (_handle, c_uint32, _pointer, c_int)),
+    'Par_AsBSend': (c_int, (_handle, c_uint32, _pointer, c_int)),
+    'Par_CheckAsBSendCompletion': (c_int, (_handle, _pointer)),
+    'Par_WaitAsBSendCompletion': (c_int, (_handle, c_uint32)),
+    'Par_BRecv': (c_int, (_handle, _pointer, _pointer, _pointer, c_uint32)),
+    'Par_CheckAsBRecvCompletion': (c_int, (_handle, _pointer, _pointer, _pointer, _pointer)),
+    'Par_GetTimes': (c_int, (_handle, _pointer, _pointer)),
+    'Par_GetStats': (c_int, (_handle, _pointer, _pointer, _pointer, _pointer)),
+    'Par_GetLastError': (c_int, (_handle, _pointer)),
+    'Par_GetStatus': (c_int, (_handle, _pointer)),
+    'Par_ErrorText': (c_int, (c_int, _pointer, c_int)),
+}
+
+
+def _declare_prototypes(library):
+    """
+    Sets restype and argtypes of the library functions, once per process.
+    ctypes converts and checks the arguments with them, instead of guessing
+    the conversion at every call.
+    """
+    for name, (restype, argtypes) in _prototypes.items():
+        try:
+            function = getattr(library, name)
+        except AttributeError:
+            logger.warning(f"{name} not found in the snap7 library")
+            continue
+        function.restype = restype
+        function.argtypes = argtypes
+
+
 class Snap7Library:
     """
     Snap7 loader and encapsulator. We make this a singleton to make
@@ -46,6 +177,7 @@ class Snap7Library:
             msg = "can't find snap7 library. If installed, try running ldconfig"
             raise Snap7Exception(msg)
         self.cdll = cdll.LoadLibrary(self.lib_location)
+        _declare_prototypes(self.cdll)
 
 
 def load_library(lib_location=None):
@@ -55,26 +187,67 @@ def load_library(lib_location=None):
     return Snap7Library(lib_location).cdll
 
 
+# minimum seconds between two log messages of the same error
+error_log_interval = 1.0
+
+# (code, context) -> [time of the last message, errors not logged since]
+_error_log: dict = {}
+
+
 def check_error(code, context="client"):
     """
     check if the error code is set. If so, a Python log message is generated
     and an error is raised.
+
+    The same error is logged at most once per error_log_interval seconds,
+    with the number of times it occurred meanwhile. The exception raised is
+    a subclass of Snap7Exception depending on the code, see
+    :func:`exception_type`.
     """
     if code:
         error = error_text(code, context)
-        logger.error(error)
-        raise Snap7Exception(error)
+        now = time.monotonic()
+        entry = _error_log.get((code, context))
+        if entry is None or now - entry[0] >= error_log_interval:
+            if entry and entry[1]:
+                logger.error(f"{error} (occurred {entry[1]} more times)")
+            else:
+                logger.error(error)
+            _error_log[(code, context)] = [now, 0]
+        else:
+            entry[1] += 1
+        raise exception_type(code, context)(error, code=code, context=context)
+
+
+@functools.lru_cache(maxsize=256)
+def exception_type(code, context="client"):
+    """
+    Returns the exception type raised for an error code.
 
+    :param code: an error integer
+    :param context: server, client or partner
+    :returns: a subclass of Snap7Exception
+    """
+    exception = context_exceptions[context].get(code & 0xFFF00000)
+    if exception is not None:
+        return exception
+    if code & 0x000FFFFF:
+        # ISO TCP or socket error
+        return ConnectionException
+    return Snap7Exception
 
+
+@functools.lru_cache(maxsize=256)
 def error_text(error, context="client"):
     """Returns a textual explanation of a given error number
 
+    The texts are cached, the library is only asked once per error number.
+
     :param error: an error integer
     :param context: server, client or partner
     :returns: the error string
     """
     assert context in ("client", "server", "partner")
-    logger.debug(f"error text for {hex(error)}")
     len_ = 1024
     text_type = c_char * len_
     text = text_type()
@@ -1,10 +1,17 @@
 """
 Snap7 library error codes.
 
-we define all error codes here, but we don't use them (yet/anymore).
-The error code formatting of the snap7 library as already quite good,
-so we are using that now. But maybe we will use this in the future again.
+The error texts are formatted by the snap7 library. The codes are used to
+select the exception type raised for an error, see
+:func:`snap7.common.check_error`.
+
+An error code combines a S7 error (code & 0xFFF00000), an ISO TCP error
+(code & 0x000F0000) and a TCP (socket) error (code & 0x0000FFFF).
 """
+from snap7.exceptions import AccessException, AddressException, ConnectionException, TimeoutException
+
+# a request didn't complete in time
+errCliJobTimeout = 0x02000000
 
 s7_client_errors = {
     0x00100000: 'errNegotiatingPDU',
@@ -38,7 +45,7 @@ s7_client_errors = {
     0x01D00000: 'errCliNeedPassword',
     0x01E00000: 'errCliInvalidPassword',
     0x01F00000: 'errCliNoPasswordToSetOrClear',
-    0x02000000: 'errCliJobTimeout',
+    errCliJobTimeout: 'errCliJobTimeout',
     0x02100000: 'errCliPartialDataRead',
     0x02200000: 'errCliBufferTooSmall',
     0x02300000: 'errCliFunctionRefused',
@@ -102,3 +109,30 @@ client_errors.update(tcp_errors)
 server_errors = s7_server_errors.copy()
 server_errors.update(isotcp_errors)
 server_errors.update(tcp_errors)
+
+# S7 error code to exception type, errors not listed raise Snap7Exception
+client_exceptions = {
+    0x00100000: ConnectionException,  # errNegotiatingPDU
+    0x00500000: AddressException,  # errCliInvalidWordLen
+    0x00700000: AddressException,  # errCliSizeOverPDU
+    0x00900000: AddressException,  # errCliAddressOutOfRange
+    0x00A00000: AddressException,  # errCliInvalidTransportSize
+    0x00B00000: AddressException,  # errCliWriteDataSizeMismatch
+    0x00C00000: AddressException,  # errCliItemNotAvailable
+    0x01700000: AddressException,  # errCliInvalidBlockType
+    0x01800000: AddressException,  # errCliInvalidBlockNumber
+    0x01D00000: AccessException,  # errCliNeedPassword
+    0x01E00000: AccessException,  # errCliInvalidPassword
+    errCliJobTimeout: TimeoutException,
+    0x02300000: AccessException,  # errCliFunctionRefused
+}
+
+server_exceptions = {
+    0x00400000: AddressException,  # errSrvUnknownArea
+}
+
+context_exceptions = {
+    "client": client_exceptions,
+    "server": server_exceptions,
+    "partner": {},
+}
@@ -1,5 +1,37 @@
 class Snap7Exception(Exception):
     """
     A Snap7 specific exception.
+
+    Exceptions raised for an error code of the library have the code and the
+    context ("client", "server" or "partner") as attributes.
+    """
+
+    def __init__(self, *args, code=None, context=None):
+        super().__init__(*args)
+        self.code = code
+        self.context = context
+
+
+class ConnectionException(Snap7Exception):
+    """
+    The connection with the partner failed or was lost, raised for TCP and
+    ISO errors and a failed PDU negotiation.
+    """
+
+
+class TimeoutException(Snap7Exception):
+    """
+    A job didn't complete in time.
+    """
+
+
+class AddressException(Snap7Exception):
+    """
+    An area, DB, address, size or wordlen is invalid or not available.
+    """
+
+
+class AccessException(Snap7Exception):
+    """
+    The PLC refused the function, or it requires a (valid) password.
     """
-    pass
@@ -0,0 +1,485 @@
+"""
+Streaming export of DB snapshots to chunked NumPy ``.npy`` files.
+
+A :class:`DBExporter` reads DBs at a fixed rate, decodes their rows with a
+:class:`RowLayout` and appends them in batches to a ring of ``.npy`` files,
+one ring per DB::
+
+    exporter = DBExporter(client, '/data/line1', interval=0.1)
+    exporter.add(10, layout, row_size=20, size=8, name='motors')
+    exporter.start()
+
+The files are written without numpy. Every file holds an array of records
+with a timestamp, the row number and the fields of the layout::
+
+    motors = numpy.load('/data/line1/motors.000000.npy')
+    motors['speed'][motors['row'] == 3]
+
+The header of a chunk is rewritten after every batch, so the chunk being
+written is a valid file as well. Only batch_rows records are kept in
+memory.
+"""
+import ast
+import calendar
+import datetime
+import glob
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from functools import partial
+
+from snap7.exceptions import Snap7Exception
+from snap7.util import parse_specification
+
+logger = logging.getLogger(__name__)
+
+# numpy's NaT, for S5TIME and DATE_AND_TIME values which can't be decoded
+nat = -2 ** 63
+
+# type: (struct code of the field in the DB, struct code of the column, numpy descr of the column)
+_types = {
+    'BOOL': ('B', '?', '|b1'),
+    'INT': ('h', 'h', '<i2'),
+    'WORD': ('H', 'H', '<u2'),
+    'DINT': ('i', 'i', '<i4'),
+    'DWORD': ('I', 'I', '<u4'),
+    'REAL': ('f', 'f', '<f4'),
+    'USINT': ('B', 'B', '|u1'),
+    'SINT': ('b', 'b', '|i1'),
+    'S5TIME': ('H', 'q', '<m8[ms]'),
+    'DATE_AND_TIME': ('8s', 'q', '<M8[ms]'),
+}
+
+_codes = {descr: column for _, column, descr in _types.values()}
+_codes.update({'<f8': 'd', '<u4': 'I'})
+
+_bcd = [(byte >> 4) * 10 + (byte & 0x0F) for byte in range(256)]
+
+_s5time_bases = (10, 100, 1000, 10000)
+
+
+def _bit(bit, byte):
+    return bool(byte >> bit & 1)
+
+
+def _string(max_size, raw):
+    return raw[2:2 + min(raw[1], max_size)]
+
+
+def _s5time(value):
+    # milliseconds
+    base = value >> 12
+    if base >= len(_s5time_bases):
+        return nat
+    return _s5time_bases[base] * ((value >> 8 & 0x0F) * 100 + _bcd[value & 0xFF])
+
+
+def _date_and_time(raw):
+    # milliseconds since 1970, 1990 - 2089
+    year = _bcd[raw[0]]
+    year += 1900 if year >= 90 else 2000
+    try:
+        moment = datetime.datetime(year, _bcd[raw[1]], _bcd[raw[2]], _bcd[raw[3]], _bcd[raw[4]], _bcd[raw[5]])
+    except ValueError:
+        return nat
+    return calendar.timegm(moment.timetuple()) * 1000 + _bcd[raw[6]] * 10 + (raw[7] >> 4)
+
+
+_converters = {
+    'S5TIME': _s5time,
+    'DATE_AND_TIME': _date_and_time,
+}
+
+
+class RowLayout:
+    """
+    Decodes the rows of a DB to column values, with a single struct unpack
+    per row instead of a lookup per field as :class:`snap7.util.DB_Row`.
+
+    The values are the ones stored in the columns: BOOL as bool, STRING as
+    bytes, S5TIME as milliseconds and DATE_AND_TIME as milliseconds since
+    1970. TIME, DATE and TIME_OF_DAY fields aren't supported.
+    """
+
+    def __init__(self, specification, row_size=None, layout_offset=0):
+        """
+        :param specification: the layout of a row, as for :class:`snap7.util.DB`
+        :param row_size: size of a row in bytes, by default up to the end of
+            the last field
+        :param layout_offset: byte index in the specification where a row
+            starts
+        """
+        self.names = []
+        self.descr = []
+        columns = []
+        # (offset, struct code) -> index of the value in the unpacked row
+        slots = {}
+        fields = []
+        for name, (index, _type) in parse_specification(specification).items():
+            if _type == 'BOOL':
+                byte_index, bool_index = index.split('.')
+                slot = (int(byte_index) - layout_offset, 'B')
+                convert = partial(_bit, int(bool_index))
+                column, descr = _types[_type][1:]
+            elif _type.startswith('STRING'):
+                max_size = int(re.search(r'\d+', _type).group(0))
+                slot = (int(float(index)) - layout_offset, f'{max_size + 2}s')
+                convert = partial(_string, max_size)
+                column, descr = f'{max_size}s', f'|S{max_size}'
+            elif _type in _types:
+                code, column, descr = _types[_type]
+                slot = (int(float(index)) - layout_offset, code)
+                convert = _converters.get(_type)
+            else:
+                raise ValueError(f"{name}: {_type} can't be exported")
+            if slot[0] < 0:
+                raise ValueError(f"{name} is before the layout offset")
+            slots.setdefault(slot, None)
+            fields.append((slot, convert))
+            self.names.append(name)
+            self.descr.append((name, descr))
+            columns.append(column)
+
+        row_format = '>'
+        end = 0
+        for index, (offset, code) in enumerate(sorted(slots)):
+            if offset < end:
+                raise ValueError(f"the field at byte {offset + layout_offset} overlaps another field")
+            slots[(offset, code)] = index
+            row_format += 'x' * (offset - end) + code
+            end = offset + struct.calcsize('>' + code)
+        if row_size is None:
+            row_size = end
+        elif row_size < end:
+            raise ValueError(f"the fields need a row size of {end} bytes")
+        self.row_size = row_size
+        self.format = ''.join(columns)
+        self._struct = struct.Struct(row_format + 'x' * (row_size - end))
+        self._fields = [(slots[slot], convert) for slot, convert in fields]
+
+    def _convert(self, values):
+        return tuple([values[index] if convert is None else convert(values[index])
+                      for index, convert in self._fields])
+
+    def decode(self, data, rows=1):
+        """
+        Decodes consecutive rows.
+
+        :param data: the bytes of the rows
+        :param rows: the number of rows
+        :returns: a list with a tuple of the values of every row, in the order
+            of the specification
+        """
+        size = rows * self.row_size
+        if len(data) < size:
+            raise ValueError(f"{rows} rows need {size} bytes, got {len(data)}")
+        convert = self._convert
+        return [convert(values) for values in self._struct.iter_unpack(memoryview(data)[:size])]
+
+
+def _header(descr, rows, length=0):
+    header = repr({'descr': descr, 'fortran_order': False, 'shape': (rows,)})
+    # the magic string, version, header length and header are aligned to 64
+    # bytes, the header is padded to length to be rewritten in place
+    for version, prefix, length_format in ((1, 10, '<H'), (2, 12, '<I')):
+        size = max(length, -(-(prefix + len(header) + 1) // 64) * 64 - prefix)
+        if size < 256 ** struct.calcsize(length_format):
+            break
+    return (b'\x93NUMPY' + bytes([version, 0]) + struct.pack(length_format, size)
+            + (header.ljust(size - 1) + '\n').encode('latin1'))
+
+
+def read_npy(path):
+    """
+    Reads a file written by :class:`NpyRing` without numpy.
+
+    :returns: the list of (name, descr) tuples of the columns and a list
+        with a tuple of the values of every record
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:6] != b'\x93NUMPY':
+        raise ValueError(f"{path} isn't a .npy file")
+    prefix, length_format = (10, '<H') if data[6] == 1 else (12, '<I')
+    start = prefix + struct.unpack_from(length_format, data, 8)[0]
+    header = ast.literal_eval(data[prefix:start].decode('latin1'))
+    codes = []
+    for _, descr in header['descr']:
+        if descr.startswith('|S'):
+            codes.append(f'{descr[2:]}s')
+        else:
+            codes.append(_codes[descr])
+    record = struct.Struct('<' + ''.join(codes))
+    rows = header['shape'][0]
+    return header['descr'], list(record.iter_unpack(data[start:start + rows * record.size]))
+
+
+class NpyRing:
+    """
+    Appends records to a ring of .npy files named prefix.000000.npy,
+    prefix.000001.npy, ...
+
+    Records are packed to a buffer and written every batch_rows records.
+    A file holds up to chunk_rows records, when chunks is set the oldest
+    files are removed to keep that many.
+    """
+
+    def __init__(self, prefix, descr, record_format, chunk_rows=100000, chunks=None, batch_rows=1000):
+        """
+        :param prefix: path of the files without the number and extension
+        :param descr: list of (name, numpy descr) tuples of the columns
+        :param record_format: struct codes of the columns, little endian
+        :param chunk_rows: maximum number of records in a file
+        :param chunks: number of files kept, None to keep all
+        :param batch_rows: number of records buffered before they are written
+        """
+        self.prefix = prefix
+        self.descr = list(descr)
+        self.chunk_rows = chunk_rows
+        self.chunks = chunks
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self._struct = struct.Struct('<' + record_format)
+        header = _header(self.descr, chunk_rows)
+        self._header_length = len(header) - (10 if header[6] == 1 else 12)
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._file = None
+        self._rows = 0
+        files = self.files()
+        self._index = int(files[-1][len(prefix) + 1:-4]) + 1 if files else 0
+
+    def files(self):
+        """
+        Returns the files of the ring, oldest first.
+        """
+        return sorted(glob.glob(f"{glob.escape(self.prefix)}.{'[0-9]' * 6}.npy"))
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(_header(self.descr, self._rows, self._header_length))
+        self._file.seek(0, os.SEEK_END)
+
+    def _open(self):
+        path = f"{self.prefix}.{self._index:06d}.npy"
+        self._index += 1
+        self._rows = 0
+        self._file = open(path, 'w+b')
+        self._write_header()
+        if self.chunks:
+            for old in self.files()[:-self.chunks]:
+                logger.debug("removing %s", old)
+                os.remove(old)
+
+    def append(self, records):
+        """
+        Appends records, tuples of the values of the columns.
+        """
+        pack = self._struct.pack
+        for record in records:
+            self._buffer += pack(*record)
+        self._buffered += len(records)
+        if self._buffered >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered records.
+        """
+        size = self._struct.size
+        start = 0
+        with memoryview(self._buffer) as view:
+            while self._buffered:
+                if self._file is None:
+                    self._open()
+                rows = min(self._buffered, self.chunk_rows - self._rows)
+                self._file.write(view[start:start + rows * size])
+                start += rows * size
+                self._rows += rows
+                self._buffered -= rows
+                self.rows_written += rows
+                self._write_header()
+                self._file.flush()
+                if self._rows == self.chunk_rows:
+                    self._file.close()
+                    self._file = None
+        del self._buffer[:]
+
+    def close(self):
+        """
+        Writes the buffered records and closes the current file, the next
+        record starts a new file.
+        """
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _Export:
+
+    def __init__(self, name, db_number, db_offset, size, layout, ring):
+        self.name = name
+        self.db_number = db_number
+        self.db_offset = db_offset
+        self.size = size
+        self.layout = layout
+        self.ring = ring
+        self.samples = 0
+        self.errors = 0
+
+
+class DBExporter:
+    """
+    Reads DBs at a fixed rate and appends their rows to a :class:`NpyRing`
+    per DB, with the columns timestamp (seconds since 1970), row and the
+    fields of the layout.
+    """
+
+    def __init__(self, client, directory, interval=0.1, chunk_rows=100000, chunks=None, batch_rows=1000):
+        """
+        :param client: a connected :class:`snap7.client.Client`
+        :param directory: directory of the files
+        :param interval: seconds between two samples
+        :param chunk_rows: maximum number of records in a file
+        :param chunks: number of files kept per DB, None to keep all
+        :param batch_rows: number of records buffered per DB before they are
+            written
+        """
+        self.client = client
+        self.directory = directory
+        self.interval = interval
+        self.chunk_rows = chunk_rows
+        self.chunks = chunks
+        self.batch_rows = batch_rows
+        self.samples = 0
+        self.overruns = 0
+        self._exports = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, db_number, specification, row_size=None, size=1, db_offset=0, layout_offset=0, name=None):
+        """
+        Adds a DB to export.
+
+        :param db_number: number of the DB
+        :param specification: the layout of a row, as for :class:`snap7.util.DB`
+        :param row_size: size of a row in bytes, by default up to the end of
+            the last field
+        :param size: number of rows
+        :param db_offset: byte in the DB where the first row starts
+        :param layout_offset: byte index in the specification where a row
+            starts
+        :param name: prefix of the files, by default db<db_number>
+        """
+        layout = RowLayout(specification, row_size, layout_offset)
+        name = name or f"db{db_number}"
+        ring = NpyRing(os.path.join(self.directory, name),
+                       [('timestamp', '<f8'), ('row', '<u4')] + layout.descr, 'dI' + layout.format,
+                       chunk_rows=self.chunk_rows, chunks=self.chunks, batch_rows=self.batch_rows)
+        with self._lock:
+            if name in self._exports:
+                raise ValueError(f"{name} is already exported")
+            self._exports[name] = _Export(name, db_number, db_offset, size, layout, ring)
+
+    def remove(self, name):
+        """
+        Stops exporting a DB and writes its buffered records.
+        """
+        with self._lock:
+            export = self._exports.pop(name)
+        export.ring.close()
+
+    def poll(self, timestamp=None):
+        """
+        Reads every DB once and appends its rows.
+
+        :param timestamp: timestamp of the records, default is the time of
+            the read
+        """
+        with self._lock:
+            exports = list(self._exports.values())
+        self.samples += 1
+        for export in exports:
+            layout = export.layout
+            try:
+                data = self.client.db_read(export.db_number, export.db_offset, layout.row_size * export.size)
+            except Snap7Exception:
+                export.errors += 1
+                logger.exception("reading DB %s for %s failed", export.db_number, export.name)
+                continue
+            now = time.time() if timestamp is None else timestamp
+            export.ring.append([(now, row) + values for row, values in enumerate(layout.decode(data, export.size))])
+            export.samples += 1
+
+    def flush(self):
+        """
+        Writes the buffered records of all DBs.
+        """
+        with self._lock:
+            exports = list(self._exports.values())
+        for export in exports:
+            export.ring.flush()
+
+    def status(self):
+        """
+        Returns the number of samples and overruns, and per DB the samples,
+        errors and records written.
+        """
+        with self._lock:
+            exports = {name: {'samples': export.samples, 'errors': export.errors,
+                              'rows_written': export.ring.rows_written}
+                       for name, export in self._exports.items()}
+        return {'samples': self.samples, 'overruns': self.overruns, 'exports': exports}
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("exporting failed")
+            next_sample += self.interval
+            now = time.monotonic()
+            if next_sample < now:
+                # skip the samples there was no time for, keeping the rate
+                missed = int((now - next_sample) / self.interval) + 1
+                self.overruns += missed
+                next_sample += missed * self.interval
+            self._stop.wait(next_sample - now)
+
+    def start(self):
+        """
+        Starts exporting in a background thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        logger.info("starting DB exporter")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snap7-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread and writes the buffered records.
+        """
+        logger.info("stopping DB exporter")
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def close(self):
+        """
+        Stops exporting and closes the files.
+        """
+        self.stop()
+        with self._lock:
+            exports = list(self._exports.values())
+        for export in exports:
+            export.ring.close()
@@ -0,0 +1,312 @@
+"""
+Dynamic data for a snap7 server.
+
+A :class:`DataGenerator` updates the memory areas registered on a
+:class:`snap7.server.Server` on a fixed tick, so clients see changing values
+instead of static memory. The variables are described with the same layout
+specification used by :func:`snap7.util.parse_specification`.
+
+example::
+
+    layout = \"\"\"
+    0       temperature     REAL
+    4       level           REAL
+    8.0     pump_running    BOOL
+    10      batch_count     INT
+    \"\"\"
+
+    server = snap7.server.Server()
+    db1 = (ctypes.c_ubyte * 16)()
+    server.register_area(snap7.types.srvAreaDB, 1, db1)
+
+    generator = snap7.generator.DataGenerator(server, interval=0.1)
+    generator.add_area(snap7.types.srvAreaDB, 1, layout, signals={
+        'temperature': snap7.generator.Sine(amplitude=5, period=60, offset=20),
+        'level': snap7.generator.RandomWalk(step=0.5, low=0, high=100),
+    })
+    generator.start()
+
+Variables without an explicit signal get a default one depending on their
+type: a sine for REAL, a toggle for BOOL and a counter for integer types.
+"""
+import ctypes
+import logging
+import math
+import random
+import struct
+import threading
+import time
+
+from snap7.util import parse_specification
+
+logger = logging.getLogger(__name__)
+
+# struct formats and value ranges of the supported numeric types
+type_formats = {
+    'REAL': ('>f', None, None),
+    'INT': ('>h', -2 ** 15, 2 ** 15 - 1),
+    'DINT': ('>i', -2 ** 31, 2 ** 31 - 1),
+    'WORD': ('>H', 0, 2 ** 16 - 1),
+    'DWORD': ('>I', 0, 2 ** 32 - 1),
+    'USINT': ('>B', 0, 2 ** 8 - 1),
+    'SINT': ('>b', -2 ** 7, 2 ** 7 - 1),
+}
+
+
+class Signal:
+    """
+    Base class of the generated signals. A signal returns the next value of
+    a variable given the tick time and the previous value.
+    """
+
+    def value(self, t, previous):
+        raise NotImplementedError
+
+
+class Sine(Signal):
+    """
+    A sine wave.
+    """
+
+    def __init__(self, amplitude=1.0, period=10.0, offset=0.0, phase=0.0):
+        self.amplitude = amplitude
+        self.period = period
+        self.offset = offset
+        self.phase = phase
+
+    def value(self, t, previous):
+        return self.offset + self.amplitude * math.sin(2 * math.pi * t / self.period + self.phase)
+
+
+class Ramp(Signal):
+    """
+    A sawtooth going from low to high every period seconds.
+    """
+
+    def __init__(self, low=0.0, high=100.0, period=10.0):
+        self.low = low
+        self.high = high
+        self.period = period
+
+    def value(self, t, previous):
+        return self.low + (self.high - self.low) * ((t % self.period) / self.period)
+
+
+class RandomWalk(Signal):
+    """
+    A random walk with a maximum step per tick, bounded between low and high.
+    """
+
+    def __init__(self, step=1.0, low=-math.inf, high=math.inf, seed=None):
+        self.step = step
+        self.low = low
+        self.high = high
+        self._random = random.Random(seed)
+
+    def value(self, t, previous):
+        value = previous + self._random.uniform(-self.step, self.step)
+        return min(max(value, self.low), self.high)
+
+
+class Toggle(Signal):
+    """
+    A boolean changing state every period seconds.
+    """
+
+    def __init__(self, period=1.0):
+        self.period = period
+
+    def value(self, t, previous):
+        return int(t // self.period) % 2 == 1
+
+
+class Counter(Signal):
+    """
+    A counter incremented by step on every tick. Integer variables wrap around
+    at the limits of their type.
+    """
+
+    def __init__(self, step=1):
+        self.step = step
+
+    def value(self, t, previous):
+        return previous + self.step
+
+
+def default_signal(_type):
+    """
+    Returns the signal used for a variable of the given type when none
+    is configured.
+    """
+    if _type == 'REAL':
+        return Sine()
+    if _type == 'BOOL':
+        return Toggle()
+    return Counter()
+
+
+class _Variable:
+    """
+    A precomputed variable of a generated area.
+    """
+
+    def __init__(self, name, offset, _type, signal, bit=None):
+        self.name = name
+        self.offset = offset
+        self.type = _type
+        self.signal = signal
+        self.bit = bit
+        if _type == 'BOOL':
+            self.struct = None
+            self.low = self.high = None
+        else:
+            fmt, self.low, self.high = type_formats[_type]
+            self.struct = struct.Struct(fmt)
+        self.value = False if _type == 'BOOL' else 0
+
+    def next_value(self, t):
+        value = self.signal.value(t, self.value)
+        if self.type == 'BOOL':
+            return bool(value)
+        if self.type == 'REAL':
+            return float(value)
+        value = int(round(value))
+        if isinstance(self.signal, Counter):
+            # counters wrap around like the PLC types do
+            span = self.high - self.low + 1
+            return (value - self.low) % span + self.low
+        return min(max(value, self.low), self.high)
+
+
+class _Area:
+    """
+    A registered server area with the variables generated in it.
+    """
+
+    def __init__(self, area_code, index, data, variables):
+        self.area_code = area_code
+        self.index = index
+        self.variables = variables
+        # a byte view on the registered memory, shares the buffer
+        self.view = (ctypes.c_ubyte * ctypes.sizeof(data)).from_buffer(data)
+
+
+class DataGenerator:
+    """
+    Updates registered server areas on a fixed tick.
+
+    Every tick the new values of all variables are computed first, then each
+    area is written while locked with :func:`Server.lock_area`, so clients
+    never see a partially updated area.
+    """
+
+    def __init__(self, server, interval=1.0):
+        """
+        :param server: a snap7.server.Server with the areas registered
+        :param interval: tick interval in seconds
+        """
+        self.server = server
+        self.interval = interval
+        self._areas = []
+        self._thread = None
+        self._stop = threading.Event()
+        self._start_time = time.monotonic()
+
+    def add_area(self, area_code, index, specification, signals=None, layout_offset=0):
+        """
+        Generates data for the variables of a registered area.
+
+        :param area_code: server area code (e.g. snap7.types.srvAreaDB)
+        :param index: area index, the DB number for DB areas
+        :param specification: layout specification, see
+            :func:`snap7.util.parse_specification`
+        :param signals: optional dict mapping variable names to a Signal
+        :param layout_offset: byte index in the specification that maps to
+            the start of the area
+        """
+        data = self.server.get_area(area_code, index)
+        signals = signals or {}
+        size = ctypes.sizeof(data)
+        variables = []
+        for name, (byte_index, _type) in parse_specification(specification).items():
+            if _type != 'BOOL' and _type not in type_formats:
+                if name in signals:
+                    raise ValueError(f"can't generate data for {name} of type {_type}")
+                logger.debug(f"not generating data for {name} of type {_type}")
+                continue
+            signal = signals.get(name) or default_signal(_type)
+            if _type == 'BOOL':
+                byte_index, bit = byte_index.split('.')
+                offset = int(byte_index) - layout_offset
+                variable = _Variable(name, offset, _type, signal, bit=int(bit))
+                end = offset + 1
+            else:
+                offset = int(float(byte_index)) - layout_offset
+                variable = _Variable(name, offset, _type, signal)
+                end = offset + variable.struct.size
+            if offset < 0 or end > size:
+                raise ValueError(f"variable {name} doesn't fit in area of {size} bytes")
+            variables.append(variable)
+        logger.info(f"generating {len(variables)} variables in area {area_code} index {index}")
+        self._areas.append(_Area(area_code, index, data, variables))
+
+    def tick(self, t=None):
+        """
+        Computes and writes the next values of all variables.
+
+        :param t: time in seconds since the generator was created, defaults to
+            the current time
+        """
+        if t is None:
+            t = time.monotonic() - self._start_time
+        for area in self._areas:
+            values = [variable.next_value(t) for variable in area.variables]
+            view = area.view
+            self.server.lock_area(area.area_code, area.index)
+            try:
+                for variable, value in zip(area.variables, values):
+                    if variable.struct:
+                        variable.struct.pack_into(view, variable.offset, value)
+                    elif value:
+                        view[variable.offset] |= 1 << variable.bit
+                    else:
+                        view[variable.offset] &= ~(1 << variable.bit) & 0xff
+                    variable.value = value
+            finally:
+                self.server.unlock_area(area.area_code, area.index)
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("data generator tick failed")
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # we are behind, skip the missed ticks
+                next_tick = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self):
+        """
+        Starts updating the areas in a background thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        logger.info(f"starting data generator with interval {self.interval}s")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snap7-generator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread.
+        """
+        logger.info("stopping data generator")
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,299 @@
+"""
+Instrumentation of the native calls of snap7 objects.
+
+The library of a Client, ClientAsync, Logo or Partner is replaced by a proxy
+which counts every native call, its duration, the bytes transferred and the
+error codes::
+
+    instrumentation = snap7.instrumentation.instrument(client, labels={'plc': '10.0.0.1'})
+    client.db_read(1, 0, 4)
+    instrumentation.snapshot()['Cli_DBRead']['calls']
+    1
+    print(snap7.instrumentation.prometheus_text(instrumentation))
+
+:func:`uninstrument` puts the library back, objects which are not
+instrumented pay nothing.
+"""
+import ctypes
+import logging
+import threading
+import time
+
+import snap7.types
+from snap7.common import _prototypes
+
+logger = logging.getLogger(__name__)
+
+# function name -> position of the size argument, in bytes
+_size_args = {
+    'Cli_DBRead': 3,
+    'Cli_DBWrite': 3,
+    'Cli_AsDBRead': 3,
+    'Cli_AsDBWrite': 3,
+    'Cli_ABRead': 2,
+    'Cli_ABWrite': 2,
+    'Cli_AsABRead': 2,
+    'Cli_AsABWrite': 2,
+    'Cli_Download': 3,
+    'Cli_AsDownload': 3,
+    'Par_BSend': 3,
+    'Par_AsBSend': 3,
+}
+
+# function name -> (position of the amount, position of the wordlen)
+_amount_args = {
+    'Cli_ReadArea': (4, 5),
+    'Cli_WriteArea': (4, 5),
+}
+
+# function name -> position of the pointer to the size, set by the library
+_size_pointer_args = {
+    'Cli_DBGet': 3,
+    'Cli_AsDBGet': 3,
+    'Cli_Upload': 4,
+    'Cli_FullUpload': 4,
+    'Par_BRecv': 3,
+}
+
+_wordlen_sizes = {
+    snap7.types.S7WLBit: 1,
+    snap7.types.S7WLByte: 1,
+    snap7.types.S7WLWord: 2,
+    snap7.types.S7WLDWord: 4,
+    snap7.types.S7WLReal: 4,
+    snap7.types.S7WLCounter: 2,
+    snap7.types.S7WLTimer: 2,
+}
+
+# client functions without a job, the execution time isn't updated by them
+_no_job = frozenset((
+    'Cli_Create', 'Cli_Destroy', 'Cli_ErrorText', 'Cli_GetExecTime', 'Cli_GetConnected', 'Cli_GetParam',
+    'Cli_SetParam', 'Cli_SetConnectionParams', 'Cli_SetConnectionType', 'Cli_CheckAsCompletion',
+    'Cli_GetLastError', 'Cli_GetPduLength',
+))
+
+# layout of the counters of a function
+CALLS, ERRORS, BYTES, DURATION, MAX_DURATION, EXEC_TIME = range(6)
+
+
+def _value(argument):
+    # arguments are python ints or ctypes instances
+    return getattr(argument, 'value', argument)
+
+
+class Instrumentation:
+    """
+    Counters of the native calls of a single snap7 object.
+    """
+
+    def __init__(self, exec_time=False, labels=None):
+        """
+        :param exec_time: also ask the library for the execution time of
+            every client job (Cli_GetExecTime), costs an extra native call
+        :param labels: dict of labels added to the Prometheus metrics, e.g.
+            to tell PLCs apart
+        """
+        self.exec_time = exec_time
+        self.labels = dict(labels or {})
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all counters.
+        """
+        with self._lock:
+            self._functions = {}
+            # (function name, error code) -> count
+            self._errors = {}
+
+    def record(self, name, duration, result=0, size=0, exec_time=0):
+        """
+        Counts a native call.
+
+        :param name: name of the library function
+        :param duration: seconds spent in the call
+        :param result: error code returned by the call
+        :param size: bytes transferred
+        :param exec_time: execution time of the job in milliseconds
+        """
+        with self._lock:
+            counters = self._functions.get(name)
+            if counters is None:
+                counters = self._functions[name] = [0, 0, 0, 0.0, 0.0, 0]
+            counters[CALLS] += 1
+            counters[DURATION] += duration
+            if duration > counters[MAX_DURATION]:
+                counters[MAX_DURATION] = duration
+            counters[EXEC_TIME] += exec_time
+            if result:
+                counters[ERRORS] += 1
+                key = (name, result)
+                self._errors[key] = self._errors.get(key, 0) + 1
+            else:
+                counters[BYTES] += size
+
+    def snapshot(self):
+        """
+        Returns a copy of the counters as a dict of plain Python types.
+
+        :returns: a dict keyed by library function name, with calls, errors,
+            bytes, duration and max_duration in seconds, exec_time in
+            milliseconds and error_codes, a dict of error code to count
+        """
+        with self._lock:
+            functions = {name: list(counters) for name, counters in self._functions.items()}
+            errors = dict(self._errors)
+        result = {}
+        for name, counters in functions.items():
+            result[name] = {
+                'calls': counters[CALLS],
+                'errors': counters[ERRORS],
+                'bytes': counters[BYTES],
+                'duration': counters[DURATION],
+                'max_duration': counters[MAX_DURATION],
+                'exec_time': counters[EXEC_TIME],
+                'error_codes': {code: count for (function, code), count in errors.items() if function == name},
+            }
+        return result
+
+    def prometheus(self):
+        """
+        Returns the counters in the Prometheus text format.
+        """
+        return prometheus_text(self)
+
+
+class InstrumentedLibrary:
+    """
+    Proxy of the snap7 library which reports every call to an Instrumentation.
+    """
+
+    def __init__(self, library, instrumentation):
+        self._library = library
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        function = getattr(self._library, name)
+        if not name.startswith(('Cli_', 'Srv_', 'Par_')):
+            return function
+        wrapper = self._wrap(name, function)
+        # the next lookups don't go through __getattr__
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def _wrap(self, name, function):
+        record = self._instrumentation.record
+        size_arg = _size_args.get(name)
+        amount_args = _amount_args.get(name)
+        size_pointer_arg = _size_pointer_args.get(name)
+        # e.g. Cli_Create returns a handle, not an error code
+        returns_code = _prototypes.get(name, (ctypes.c_int,))[0] is ctypes.c_int
+        get_exec_time = None
+        if self._instrumentation.exec_time and name.startswith('Cli_') and name not in _no_job:
+            get_exec_time = self._library.Cli_GetExecTime
+
+        def wrapper(*args):
+            started = time.perf_counter()
+            result = function(*args)
+            duration = time.perf_counter() - started
+            size = 0
+            if size_arg is not None:
+                size = _value(args[size_arg])
+            elif amount_args is not None:
+                size = _value(args[amount_args[0]]) * _wordlen_sizes.get(_value(args[amount_args[1]]), 1)
+            elif size_pointer_arg is not None:
+                size = getattr(args[size_pointer_arg], '_obj', 0)
+                size = _value(size)
+            exec_time = 0
+            if get_exec_time is not None:
+                value = ctypes.c_int()
+                if not get_exec_time(args[0], ctypes.byref(value)):
+                    exec_time = value.value
+            record(name, duration, result if returns_code else 0, size, exec_time)
+            return result
+
+        return wrapper
+
+
+def _library_attribute(obj):
+    # Client, ClientAsync and Logo keep the library in _library, Partner in library
+    return '_library' if hasattr(obj, '_library') else 'library'
+
+
+def instrument(obj, exec_time=False, labels=None):
+    """
+    Starts counting the native calls of a Client, ClientAsync, Logo or Partner.
+
+    :param obj: the snap7 object
+    :param exec_time: also ask the library for the execution time of every
+        client job (Cli_GetExecTime)
+    :param labels: dict of labels added to the Prometheus metrics
+    :returns: the Instrumentation
+    """
+    attribute = _library_attribute(obj)
+    library = getattr(obj, attribute)
+    if isinstance(library, InstrumentedLibrary):
+        return library._instrumentation
+    instrumentation = Instrumentation(exec_time, labels)
+    logger.info("instrumenting native calls")
+    setattr(obj, attribute, InstrumentedLibrary(library, instrumentation))
+    return instrumentation
+
+
+def uninstrument(obj):
+    """
+    Stops counting the native calls of an object.
+    """
+    attribute = _library_attribute(obj)
+    library = getattr(obj, attribute)
+    if isinstance(library, InstrumentedLibrary):
+        setattr(obj, attribute, library._library)
+
+
+_metrics = (
+    ('calls_total', 'counter', 'Number of native calls.', 'calls'),
+    ('errors_total', 'counter', 'Number of native calls which returned an error.', 'errors'),
+    ('bytes_total', 'counter', 'Bytes transferred by successful native calls.', 'bytes'),
+    ('call_duration_seconds_total', 'counter', 'Time spent in native calls.', 'duration'),
+    ('call_duration_seconds_max', 'gauge', 'Longest native call.', 'max_duration'),
+    ('exec_time_seconds_total', 'counter', 'Job execution time reported by the library.', 'exec_time'),
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def prometheus_text(*instrumentations, prefix='snap7'):
+    """
+    Returns the counters of one or more Instrumentation objects in the
+    Prometheus text exposition format.
+
+    :param instrumentations: Instrumentation objects, use labels to tell
+        them apart
+    :param prefix: prefix of the metric names
+    """
+    snapshots = [(instrumentation.labels, instrumentation.snapshot()) for instrumentation in instrumentations]
+    lines = []
+    for metric, kind, description, key in _metrics:
+        lines.append(f"# HELP {prefix}_{metric} {description}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for labels, snapshot in snapshots:
+            for function, counters in sorted(snapshot.items()):
+                value = counters[key]
+                if key == 'exec_time':
+                    value /= 1000
+                lines.append(f"{prefix}_{metric}{_labels({**labels, 'function': function})} {value}")
+    metric = f"{prefix}_errors_by_code_total"
+    lines.append(f"# HELP {metric} Number of native calls per error code.")
+    lines.append(f"# TYPE {metric} counter")
+    for labels, snapshot in snapshots:
+        for function, counters in sorted(snapshot.items()):
+            for code, count in sorted(counters['error_codes'].items()):
+                lines.append(f"{metric}{_labels({**labels, 'function': function, 'code': hex(code)})} {count}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,231 @@
+"""
+Latencies of client calls and scan statistics of cyclic polling.
+"""
+import contextlib
+import threading
+import time
+
+from snap7.stats import Histogram
+
+
+class LatencyRecorder:
+    """
+    Latency distributions of client calls, per PLC and per operation.
+
+    Every PLC/operation pair gets its own :class:`Histogram`, so the memory
+    used doesn't grow with the number of calls. The recorder is fed by the
+    trace hook of a :class:`snap7.client.Client`, a
+    :class:`snap7.client_async.ClientAsync` or a :class:`snap7.logo.Logo`,
+    several clients can share one recorder::
+
+        recorder = LatencyRecorder()
+        recorder.attach(client)
+        client.db_read(1, 0, 4)
+        recorder.percentile(99.9, operation='db_read')
+    """
+
+    def __init__(self, sub_buckets=8, max_value=60.0):
+        """
+        :param sub_buckets: buckets per power of two of the histograms
+        :param max_value: largest latency in seconds
+        """
+        self.sub_buckets = sub_buckets
+        self.max_value = max_value
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all histograms.
+        """
+        with self._lock:
+            # (plc, operation) -> Histogram
+            self._histograms = {}
+            # (plc, operation) -> number of calls which returned an error
+            self._errors = {}
+
+    def record(self, plc, operation, seconds, result=0):
+        """
+        Counts the latency of a call.
+
+        :param plc: address of the PLC
+        :param operation: name of the client method, e.g. db_read
+        :param seconds: duration of the call
+        :param result: error code returned by the call
+        """
+        key = (plc, operation)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.sub_buckets, self.max_value)
+            histogram.record(seconds)
+            if result:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def trace(self, event):
+        """
+        Trace hook of a client, see :meth:`snap7.client.Client.set_trace_hook`.
+        """
+        self.record(event['address'], event['operation'], event['duration'], event['result'])
+
+    def attach(self, client, sample_every=1):
+        """
+        Records the calls of a client, replacing its trace hook.
+
+        :param sample_every: only record one of sample_every calls
+        """
+        client.set_trace_hook(self.trace, sample_every)
+
+    def detach(self, client):
+        """
+        Stops recording the calls of a client.
+        """
+        client.set_trace_hook(None)
+
+    def histogram(self, plc=None, operation=None):
+        """
+        Returns a histogram of the calls to a PLC and/or of an operation.
+
+        :param plc: only count the calls to this PLC, None for all PLCs
+        :param operation: only count this operation, None for all operations
+        """
+        merged = Histogram(self.sub_buckets, self.max_value)
+        with self._lock:
+            for (key_plc, key_operation), histogram in self._histograms.items():
+                if plc in (None, key_plc) and operation in (None, key_operation):
+                    merged.merge(histogram)
+        return merged
+
+    def percentile(self, p, plc=None, operation=None):
+        """
+        Returns a latency percentile in seconds, None without calls.
+
+        :param p: percentile, between 0 and 100
+        :param plc: only count the calls to this PLC, None for all PLCs
+        :param operation: only count this operation, None for all operations
+        """
+        return self.histogram(plc, operation).percentile(p)
+
+    def snapshot(self, percentiles=(50, 95, 99, 99.9)):
+        """
+        Returns the latencies in milliseconds as a dict of plain Python types.
+
+        :param percentiles: the percentiles returned
+        :returns: a dict of PLC address to a dict of operation to the count,
+            errors, percentiles and max of the calls
+        """
+        with self._lock:
+            items = [(key, histogram.as_dict(percentiles), self._errors.get(key, 0))
+                     for key, histogram in self._histograms.items()]
+        result = {}
+        for (plc, operation), values, errors in items:
+            values['errors'] = errors
+            result.setdefault(plc, {})[operation] = values
+        return result
+
+
+class CycleTracker:
+    """
+    Scan durations and jitter of a cyclic poll loop.
+
+    A scan is the work done in one cycle, e.g. all reads of a 100 ms poll.
+    The tracker counts the scans which didn't complete within the cycle and
+    how far the start of every scan is from its expected start::
+
+        tracker = CycleTracker(0.1)
+        while running:
+            with tracker.scan():
+                client.db_read(1, 0, 64)
+            time.sleep(...)
+        tracker.within_cycle()
+        0.999...
+
+    The tracker is meant to be used by the poll loop only, it isn't thread
+    safe.
+    """
+
+    def __init__(self, cycle, sub_buckets=8, max_value=60.0):
+        """
+        :param cycle: the cycle time in seconds
+        :param sub_buckets: buckets per power of two of the histograms
+        :param max_value: largest scan duration in seconds
+        """
+        self.cycle = cycle
+        self.durations = Histogram(sub_buckets, max_value)
+        self.jitter = Histogram(sub_buckets, max_value)
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the statistics.
+        """
+        self.durations.reset()
+        self.jitter.reset()
+        self.scans = 0
+        self.overruns = 0
+        self._last_start = None
+
+    def start(self, now=None):
+        """
+        Marks the start of a scan.
+
+        :param now: the start time from time.monotonic(), default is now
+        :returns: the start time, to be passed to :meth:`stop`
+        """
+        if now is None:
+            now = time.monotonic()
+        if self._last_start is not None:
+            self.jitter.record(abs(now - self._last_start - self.cycle))
+        self._last_start = now
+        return now
+
+    def stop(self, started, now=None):
+        """
+        Marks the end of a scan.
+
+        :param started: the value returned by :meth:`start`
+        :param now: the end time from time.monotonic(), default is now
+        :returns: the duration of the scan in seconds
+        """
+        if now is None:
+            now = time.monotonic()
+        duration = now - started
+        self.durations.record(duration)
+        self.scans += 1
+        if duration > self.cycle:
+            self.overruns += 1
+        return duration
+
+    @contextlib.contextmanager
+    def scan(self):
+        """
+        Context manager which times a scan.
+        """
+        started = self.start()
+        try:
+            yield
+        finally:
+            self.stop(started)
+
+    def within_cycle(self):
+        """
+        Returns the fraction of the scans which completed within the cycle,
+        or None before the first scan.
+        """
+        if not self.scans:
+            return None
+        return (self.scans - self.overruns) / self.scans
+
+    def as_dict(self, percentiles=(50, 95, 99, 99.9)):
+        """
+        Returns the statistics as a dict of plain Python types, times in
+        milliseconds.
+        """
+        return {
+            'cycle': self.cycle * 1e3,
+            'scans': self.scans,
+            'overruns': self.overruns,
+            'within_cycle': self.within_cycle(),
+            'duration': self.durations.as_dict(percentiles),
+            'jitter': self.jitter.as_dict(percentiles),
+        }
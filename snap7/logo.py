@@ -1,23 +1,133 @@
 """
 Snap7 client used for connection to a siemens LOGO 7/8 server.
 """
+import functools
 import logging
 import re
 import struct
-from ctypes import c_int, byref, c_uint16, c_int32
-from ctypes import c_void_p
+import threading
+import time
+from ctypes import byref, c_ubyte
 
 import snap7
 from snap7 import types
-from snap7.common import check_error, load_library, ipv4
-from snap7.exceptions import Snap7Exception
-from snap7.types import S7Object
-from snap7.types import param_types
+from snap7.client import Client
+from snap7.client_async import ClientAsync
+from snap7.common import check_error
+from snap7.exceptions import AddressException, Snap7Exception
 
 logger = logging.getLogger(__name__)
 
+# size in bytes of the VM area (DB1)
+vm_size_logo7 = 952
+vm_size_logo8 = 1470
 
-class Logo:
+_vm_address_pattern = re.compile(r"V([WD]?)([0-9]+)(?:\.([0-7]))?")
+_vm_wordlens = {"": types.S7WLByte, "W": types.S7WLWord, "D": types.S7WLDWord}
+
+
+class VMAddress:
+    """
+    A parsed VM address of a Siemens Logo, e.g. V10.3, V10, VW12 or VD20.
+
+    Use :func:`parse_vm_address` to get one, parsing the same address again
+    returns the cached object.
+    """
+    __slots__ = ('vm_address', 'byte', 'bit', 'wordlen', 'size', 'start', '_struct')
+
+    _structs = {
+        types.S7WLByte: struct.Struct(">B"),
+        types.S7WLWord: struct.Struct(">h"),
+        types.S7WLDWord: struct.Struct(">l"),
+    }
+
+    def __init__(self, vm_address, byte, bit, wordlen):
+        self.vm_address = vm_address
+        self.byte = byte
+        self.bit = bit
+        self.wordlen = wordlen
+        self._struct = self._structs.get(wordlen)
+        self.size = self._struct.size if self._struct else 1
+        # bit addresses are counted in bits by Cli_ReadArea / Cli_WriteArea
+        self.start = byte * 8 + bit if wordlen == types.S7WLBit else byte
+
+    def __repr__(self):
+        return f"<VMAddress {self.vm_address}>"
+
+    def get(self, data, offset=0):
+        """
+        Decodes the value from a buffer containing the bytes of DB1.
+
+        :param data: bytes-like object
+        :param offset: offset in data of the address byte
+        :returns: integer
+        """
+        if self._struct is None:
+            return data[offset] >> self.bit & 1
+        return self._struct.unpack_from(data, offset)[0]
+
+    def set(self, data, value, offset=0):
+        """
+        Encodes the value into a writeable buffer containing the bytes of DB1.
+
+        :param data: bytearray or ctypes array
+        :param value: integer
+        :param offset: offset in data of the address byte
+        """
+        if self._struct is None:
+            if value:
+                data[offset] |= 1 << self.bit
+            else:
+                data[offset] &= ~(1 << self.bit) & 0xff
+        else:
+            self._struct.pack_into(data, offset, value)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_vm_address(vm_address):
+    """
+    Parses a VM address like V10.3, V10, VW12 or VD20.
+
+    :raises ValueError: if the address is invalid
+    :returns: a VMAddress
+    """
+    match = _vm_address_pattern.fullmatch(vm_address)
+    if not match or (match.group(3) is not None and match.group(1)):
+        raise ValueError(f"{vm_address} is not a valid VM address")
+    kind, byte, bit = match.groups()
+    if bit is not None:
+        return VMAddress(vm_address, int(byte), int(bit), types.S7WLBit)
+    return VMAddress(vm_address, int(byte), 0, _vm_wordlens[kind])
+
+
+def _merge_spans(addresses, max_gap):
+    """
+    Merges the byte ranges of VMAddress objects into covering spans.
+
+    :returns: a list of [start, end] byte ranges
+    """
+    spans = []
+    for start, end in sorted((address.byte, address.byte + address.size) for address in addresses):
+        if spans and start <= spans[-1][1] + max_gap:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return spans
+
+
+def _parse(vm_address):
+    """
+    Parses a VM address for the Logo client methods.
+
+    :raises AddressException: if the address is invalid
+    """
+    try:
+        return parse_vm_address(vm_address)
+    except ValueError as e:
+        raise AddressException(str(e)) from e
+
+
+class Logo(Client):
     """
     A snap7 Siemens Logo client:
     There are two main comfort functions available :func:`Logo.read` and :func:`Logo.write`.
@@ -28,39 +138,35 @@ class Logo:
     * VW12 for a word (used for analog values)
 
     For more information see examples for Siemens Logo 7 and 8
+
+    Logo is a :class:`snap7.client.Client` which connects with TSAPs instead
+    of rack and slot, everything else, like db_read and db_write, is shared.
+    For Logo7 DB1 ranges from 0 to 951, for Logo8 from 0 to 1469.
+
+    The shared methods behave as those of a Client: db_write, set_param,
+    set_connection_params and the like raise a :class:`Snap7Exception` on an
+    error and return None, where the former Logo methods returned the error
+    code. An invalid VM address raises an :class:`AddressException`.
     """
 
     def __init__(self):
-        self.pointer = None
-        self.library = load_library()
-        self.create()
-
-    def __del__(self):
-        self.destroy()
+        # transfer buffer of read and write, large enough for a VD address
+        self._buffer = (c_ubyte * 4)()
+        super().__init__()
 
-    def create(self):
+    @property
+    def pointer(self):
         """
-        create a SNAP7 client.
+        The native client handle, the same as ``_pointer`` of a Client.
         """
-        logger.info("creating snap7 client")
-        self.library.Cli_Create.restype = c_void_p
-        self.pointer = S7Object(self.library.Cli_Create())
+        return self._pointer
 
-    def destroy(self):
+    @property
+    def library(self):
         """
-        destroy a client.
+        The snap7 library, the same as ``_library`` of a Client.
         """
-        logger.info("destroying snap7 client")
-        return self.library.Cli_Destroy(byref(self.pointer))
-
-    def disconnect(self):
-        """
-        disconnect a client.
-        """
-        logger.info("disconnecting snap7 client")
-        result = self.library.Cli_Disconnect(self.pointer)
-        check_error(result, context="client")
-        return result
+        return self._library
 
     def connect(self, ip_address, tsap_snap7, tsap_logo, tcpport=102):
         """
@@ -77,7 +183,7 @@ class Logo:
         # 2nd connect without any parameters
         self.set_param(snap7.types.RemotePort, tcpport)
         self.set_connection_params(ip_address, tsap_snap7, tsap_logo)
-        result = self.library.Cli_Connect(self.pointer)
+        result = self._library.Cli_Connect(self._pointer)
         check_error(result, context="client")
         return result
 
@@ -86,59 +192,18 @@ class Logo:
         Reads from VM addresses of Siemens Logo. Examples: read("V40") / read("VW64") / read("V10.2")
 
         :param vm_address: of Logo memory (e.g. V30.1, VW32, V24)
+        :raises AddressException: if the address is invalid
         :returns: integer
         """
-        area = types.S7AreaDB
-        db_number = 1
-        size = 1
-        start = 0
-        wordlen = 0
-        logger.debug(f"read, vm_address:{vm_address}")
-        if re.match(r"V[0-9]{1,4}\.[0-7]", vm_address):
-            # bit value
-            logger.info(f"read, Bit address: {vm_address}")
-            address = vm_address[1:].split(".")
-            # transform string to int
-            address_byte = int(address[0])
-            address_bit = int(address[1])
-            start = (address_byte * 8) + address_bit
-            wordlen = types.S7WLBit
-        elif re.match("V[0-9]+", vm_address):
-            # byte value
-            logger.info(f"Byte address: {vm_address}")
-            start = int(vm_address[1:])
-            wordlen = types.S7WLByte
-        elif re.match("VW[0-9]+", vm_address):
-            # byte value
-            logger.info(f"Word address: {vm_address}")
-            start = int(vm_address[2:])
-            wordlen = types.S7WLWord
-        elif re.match("VD[0-9]+", vm_address):
-            # byte value
-            logger.info(f"DWord address: {vm_address}")
-            start = int(vm_address[2:])
-            wordlen = types.S7WLDWord
-        else:
-            logger.info("Unknown address format")
-            return 0
-
-        type_ = snap7.types.wordlen_to_ctypes[wordlen]
-        data = (type_ * size)()
-
-        logger.debug(f"start:{start}, wordlen:{wordlen}, data-length:{len(data)}")
-
-        result = self.library.Cli_ReadArea(self.pointer, area, db_number, start,
-                                           size, wordlen, byref(data))
+        address = _parse(vm_address)
+        data = self._buffer
+        result = self._library.Cli_ReadArea(self._pointer, types.S7AreaDB, 1, address.start,
+                                            1, address.wordlen, byref(data))
         check_error(result, context="client")
-        # transform result to int value
-        if wordlen == types.S7WLBit:
+        if address.wordlen == types.S7WLBit:
+            # a bit is read as a byte with the value 0 or 1
             return data[0]
-        if wordlen == types.S7WLByte:
-            return struct.unpack_from(">B", data)[0]
-        if wordlen == types.S7WLWord:
-            return struct.unpack_from(">h", data)[0]
-        if wordlen == types.S7WLDWord:
-            return struct.unpack_from(">l", data)[0]
+        return address.get(data)
 
     def write(self, vm_address, value):
         """
@@ -147,159 +212,233 @@ class Logo:
 
         :param vm_address: write offset
         :param value: integer
+        :raises AddressException: if the address is invalid
         """
-        area = types.S7AreaDB
-        db_number = 1
-        start = 0
-        amount = 1
-        wordlen = 0
-        data = bytearray(0)
-        logger.debug(f"write, vm_address:{vm_address}, value:{value}")
-        if re.match(r"^V[0-9]{1,4}\.[0-7]$", vm_address):
-            # bit value
-            logger.info(f"read, Bit address: {vm_address}")
-            address = vm_address[1:].split(".")
-            # transform string to int
-            address_byte = int(address[0])
-            address_bit = int(address[1])
-            start = (address_byte * 8) + address_bit
-            wordlen = types.S7WLBit
-            if value > 0:
-                data = bytearray([1])
-            else:
-                data = bytearray([0])
-        elif re.match("^V[0-9]+$", vm_address):
-            # byte value
-            logger.info(f"Byte address: {vm_address}")
-            start = int(vm_address[1:])
-            wordlen = types.S7WLByte
-            data = bytearray(struct.pack(">B", value))
-        elif re.match("^VW[0-9]+$", vm_address):
-            # byte value
-            logger.info(f"Word address: {vm_address}")
-            start = int(vm_address[2:])
-            wordlen = types.S7WLWord
-            data = bytearray(struct.pack(">h", value))
-        elif re.match("^VD[0-9]+$", vm_address):
-            # byte value
-            logger.info(f"DWord address: {vm_address}")
-            start = int(vm_address[2:])
-            wordlen = types.S7WLDWord
-            data = bytearray(struct.pack(">l", value))
+        address = _parse(vm_address)
+        data = self._buffer
+        if address.wordlen == types.S7WLBit:
+            data[0] = 1 if value > 0 else 0
         else:
-            logger.info(f"write, Unknown address format: {vm_address}")
-            return 1
+            address.set(data, value)
+        result = self._library.Cli_WriteArea(self._pointer, types.S7AreaDB, 1, address.start,
+                                             1, address.wordlen, byref(data))
+        check_error(result, context="client")
+        return result
 
-        if wordlen == types.S7WLBit:
-            type_ = snap7.types.wordlen_to_ctypes[types.S7WLByte]
-        else:
-            type_ = snap7.types.wordlen_to_ctypes[wordlen]
+    def read_many(self, vm_addresses, max_gap=64):
+        """
+        Reads many VM addresses with as few requests as possible. The byte
+        ranges of the addresses are merged into covering spans of DB1, which
+        are read with :func:`db_read` and decoded locally.
+        Example: read_many(["V10.3", "VW12", "VD20"])
+
+        :param vm_addresses: list of VM addresses (e.g. V30.1, VW32, V24)
+        :param max_gap: unused bytes allowed between two addresses read in
+            the same request
+        :raises AddressException: if an address is invalid
+        :returns: list of integers, in the order of vm_addresses
+        """
+        addresses = [_parse(vm_address) for vm_address in vm_addresses]
+        spans = _merge_spans(addresses, max_gap)
+        logger.debug(f"read_many, {len(addresses)} addresses in {len(spans)} requests")
+        buffers = [(start, self.db_read(1, start, end - start)) for start, end in spans]
+
+        values = []
+        for address in addresses:
+            for start, data in buffers:
+                if start <= address.byte < start + len(data):
+                    break
+            values.append(address.get(data, address.byte - start))
+        return values
+
+    def write_many(self, values, max_gap=0):
+        """
+        Writes many VM addresses with as few requests as possible. The byte
+        ranges of the addresses are merged into spans of DB1, which are read,
+        modified and written back.
+        Example: write_many({"V10.3": 1, "VW12": 200})
+
+        The read-modify-write isn't atomic, bytes in a span which are changed
+        by the LOGO between the read and the write are overwritten. Keep
+        max_gap at 0 to rewrite only bytes that contain written addresses.
+
+        :param values: dict or list of (VM address, integer) pairs
+        :param max_gap: unused bytes allowed between two addresses written in
+            the same request
+        :raises AddressException: if an address is invalid
+        """
+        if isinstance(values, dict):
+            values = values.items()
+        items = [(_parse(vm_address), value) for vm_address, value in values]
+        spans = _merge_spans([address for address, _ in items], max_gap)
+        logger.debug(f"write_many, {len(items)} addresses in {len(spans)} requests")
+        buffers = [(start, self.db_read(1, start, end - start)) for start, end in spans]
 
-        cdata = (type_ * amount).from_buffer_copy(data)
+        for address, value in items:
+            for start, data in buffers:
+                if start <= address.byte < start + len(data):
+                    break
+            address.set(data, value, address.byte - start)
 
-        logger.debug(f"write, vm_address:{vm_address} value:{value}")
+        for start, data in buffers:
+            self.db_write(1, start, data)
 
-        result = self.library.Cli_WriteArea(self.pointer, area, db_number, start, amount, wordlen, byref(cdata))
-        check_error(result, context="client")
-        return result
 
-    def db_read(self, db_number, start, size):
-        """
-        This is a lean function of Cli_ReadArea() to read PLC DB.
+class LogoMirror:
+    """
+    A local copy of the VM area of a Siemens Logo.
 
-        :param db_number: for Logo only DB=1
-        :param start: start address for Logo7 0..951 / Logo8 0..1469
-        :param size: in bytes
-        :returns: array of bytes
-        """
-        logger.debug(f"db_read, db_number:{db_number}, start:{start}, size:{size}")
+    The whole VM range is read with :func:`Logo.db_read` at a fixed rate, the
+    addresses are read from memory without network traffic::
 
-        type_ = snap7.types.wordlen_to_ctypes[snap7.types.S7WLByte]
-        data = (type_ * size)()
-        result = (self.library.Cli_DBRead(
-            self.pointer, db_number, start, size,
-            byref(data)))
-        check_error(result, context="client")
-        return bytearray(data)
+        mirror = LogoMirror(logo, interval=0.5)
+        mirror.subscribe(["V10.3", "VW12"], on_change)
+        mirror.start()
+        mirror.read("VW12")
 
-    def db_write(self, db_number, start, data):
-        """
-        Writes to a DB object.
+    Subscribed callbacks are called as ``call_back(vm_address, value)`` from
+    the refreshing thread when the value of the address changed, including
+    the first refresh. A Logo isn't thread safe, don't use it from other
+    threads while the mirror is started.
+    """
 
-        :param db_number: for Logo only DB=1
-        :param start: start address for Logo7 0..951 / Logo8 0..1469
-        :param data: bytearray
+    def __init__(self, logo, size=vm_size_logo8, interval=1.0):
         """
-        wordlen = snap7.types.S7WLByte
-        type_ = snap7.types.wordlen_to_ctypes[wordlen]
-        size = len(data)
-        cdata = (type_ * size).from_buffer_copy(data)
-        logger.debug(f"db_write db_number:{db_number} start:{start} size:{size} data:{data}")
-        result = self.library.Cli_DBWrite(self.pointer, db_number, start, size, byref(cdata))
-        check_error(result, context="client")
-        return result
-
-    def set_connection_params(self, ip_address, tsap_snap7, tsap_logo):
+        :param logo: a connected Logo
+        :param size: size of the VM area, vm_size_logo7 or vm_size_logo8
+        :param interval: seconds between two refreshes
         """
-        Sets internally (IP, LocalTSAP, RemoteTSAP) Coordinates.
-        This function must be called just before Cli_Connect().
-
-        :param ip_address: IP ip_address of server
-        :param tsap_snap7: TSAP SNAP7 Client (e.g. 10.00 = 0x1000)
-        :param tsap_logo: TSAP Logo Server (e.g. 20.00 = 0x2000)
+        self.logo = logo
+        self.size = size
+        self.interval = interval
+        self.data = None
+        self.last_update = None
+        self.errors = 0
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
         """
-        assert re.match(ipv4, ip_address), f'{ip_address} is invalid ipv4'
-        result = self.library.Cli_SetConnectionParams(self.pointer, ip_address.encode(),
-                                                      c_uint16(tsap_snap7),
-                                                      c_uint16(tsap_logo))
-        if result != 0:
-            raise Snap7Exception("The parameter was invalid")
-
-    def set_connection_type(self, connection_type):
+        Reads the VM area and notifies the subscribers of the changes.
         """
-        Sets the connection resource type, i.e the way in which the Clients
-        connects to a PLC.
-
-        :param connection_type: 1 for PG, 2 for OP, 3 to 10 for S7 Basic
+        data = self.logo.db_read(1, 0, self.size)
+        previous, self.data = self.data, data
+        self.last_update = time.monotonic()
+        if data == previous:
+            return
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for addresses, call_back in subscriptions:
+            for address in addresses:
+                value = address.get(data, address.byte)
+                if previous is None or value != address.get(previous, address.byte):
+                    call_back(address.vm_address, value)
+
+    @property
+    def age(self):
         """
-        result = self.library.Cli_SetConnectionType(self.pointer,
-                                                    c_uint16(connection_type))
-        if result != 0:
-            raise Snap7Exception("The parameter was invalid")
+        Seconds since the last refresh, None if never refreshed.
+        """
+        if self.last_update is None:
+            return None
+        return time.monotonic() - self.last_update
 
-    def get_connected(self):
+    def read(self, vm_address):
         """
-        Returns the connection status
+        Reads a VM address from the mirror. Example: read("VW12")
 
-        :returns: a boolean that indicates if connected.
+        :param vm_address: of Logo memory (e.g. V30.1, VW32, V24)
+        :returns: integer
         """
-        connected = c_int32()
-        result = self.library.Cli_GetConnected(self.pointer, byref(connected))
-        check_error(result, context="client")
-        return bool(connected)
+        data = self.data
+        if data is None:
+            raise Snap7Exception("The mirror has not been refreshed yet")
+        address = parse_vm_address(vm_address)
+        if address.byte + address.size > self.size:
+            raise ValueError(f"{vm_address} is outside of the mirrored VM area")
+        return address.get(data, address.byte)
+
+    def read_many(self, vm_addresses):
+        """
+        Reads many VM addresses from the same refresh of the mirror.
 
-    def set_param(self, number, value):
-        """Sets an internal Server object parameter.
+        :param vm_addresses: list of VM addresses
+        :returns: list of integers, in the order of vm_addresses
+        """
+        data = self.data
+        if data is None:
+            raise Snap7Exception("The mirror has not been refreshed yet")
+        values = []
+        for vm_address in vm_addresses:
+            address = parse_vm_address(vm_address)
+            if address.byte + address.size > self.size:
+                raise ValueError(f"{vm_address} is outside of the mirrored VM area")
+            values.append(address.get(data, address.byte))
+        return values
+
+    def subscribe(self, vm_addresses, call_back):
+        """
+        Calls call_back(vm_address, value) when one of the addresses changes.
 
-        :param number: Parameter type number
-        :param value: Parameter value
+        :param vm_addresses: list of VM addresses to watch
+        :param call_back: a callable
         """
-        logger.debug(f"setting param number {number} to {value}")
-        type_ = param_types[number]
-        result = self.library.Cli_SetParam(self.pointer, number, byref(type_(value)))
-        check_error(result, context="client")
-        return result
+        addresses = [parse_vm_address(vm_address) for vm_address in vm_addresses]
+        for address in addresses:
+            if address.byte + address.size > self.size:
+                raise ValueError(f"{address.vm_address} is outside of the mirrored VM area")
+        with self._lock:
+            self._subscriptions.append((addresses, call_back))
+
+    def unsubscribe(self, call_back):
+        """
+        Removes all subscriptions of call_back.
+        """
+        with self._lock:
+            self._subscriptions = [item for item in self._subscriptions if item[1] is not call_back]
+
+    def _run(self):
+        next_refresh = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                self.errors += 1
+                logger.exception("logo mirror refresh failed")
+            next_refresh += self.interval
+            delay = next_refresh - time.monotonic()
+            if delay < 0:
+                # we are behind, skip the missed refreshes
+                next_refresh = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self):
+        """
+        Starts refreshing the mirror in a background thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        logger.info(f"starting logo mirror with interval {self.interval}s")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snap7-logo-mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread.
+        """
+        logger.info("stopping logo mirror")
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
 
-    def get_param(self, number):
-        """Reads an internal Logo object parameter.
 
-        :param number: Parameter type number
-        :returns: Parameter value
-        """
-        logger.debug(f"retreiving param number {number}")
-        type_ = param_types[number]
-        value = type_()
-        code = self.library.Cli_GetParam(self.pointer, c_int(number),
-                                         byref(value))
-        check_error(code)
-        return value.value
+class LogoAsync(Logo, ClientAsync):
+    """
+    A Logo with the asyncio features of :class:`snap7.client_async.ClientAsync`,
+    e.g. ``await logo.as_db_read(1, 0, vm_size_logo8)``.
+    """
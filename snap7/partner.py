@@ -9,7 +9,9 @@ is requesting the connection.
 """
 import ctypes
 import logging
+import queue
 import re
+import time
 
 import snap7.types
 from snap7.common import load_library, check_error, ipv4
@@ -17,6 +19,10 @@ from snap7.exceptions import Snap7Exception
 
 logger = logging.getLogger(__name__)
 
+recv_callback_type = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_int, ctypes.c_uint32,
+                                      ctypes.c_void_p, ctypes.c_int)
+send_callback_type = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_int)
+
 
 def error_wrap(func):
     """Parses a s7 error code returned the decorated function."""
@@ -36,40 +42,106 @@ class Partner:
     library = None
 
     def __init__(self, active=False):
+        self._recv_callback = None
+        self._send_callback = None
+        self._send_buffer = None
+        self._addresses = None
+        self._monitor = None
+        self._send_started = None
         self.library = load_library()
         self.create(active)
 
     def __del__(self):
         self.destroy()
 
-    def as_b_send(self):
+    @error_wrap
+    def as_b_send(self, data, r_id=0):
         """
         Sends a data packet to the partner. This function is asynchronous, i.e.
         it terminates immediately, a completion method is needed to know when
         the transfer is complete.
+
+        :param data: bytes-like payload, at most 64 KB
+        :param r_id: routing parameter, the partner receives it with the data
         """
-        return self.library.Par_AsBSend(self.pointer)
+        size = len(data)
+        # the library reads the buffer while sending, keep it alive
+        self._send_buffer = (ctypes.c_ubyte * size).from_buffer_copy(data)
+        self._send_started = time.perf_counter()
+        result = self.library.Par_AsBSend(self.pointer, ctypes.c_uint32(r_id),
+                                          ctypes.byref(self._send_buffer), size)
+        if result:
+            self._send_done(result)
+        return result
 
-    def b_recv(self):
+    def _send_done(self, op_result):
+        """
+        Reports the end of the pending asynchronous send job to the monitor.
+        """
+        started, self._send_started = self._send_started, None
+        if self._monitor is not None and started is not None:
+            self._monitor.sent(len(self._send_buffer), time.perf_counter() - started, op_result)
+
+    def b_recv(self, timeout=0):
         """
         Receives a data packet from the partner. This function is
         synchronous, it waits until a packet is received or the timeout
         supplied expires.
+
+        :param timeout: timeout in milliseconds
+        :returns: a tuple of the routing parameter and the data
         """
-        return self.library.Par_BRecv(self.pointer)
+        r_id = ctypes.c_uint32()
+        _buffer = snap7.types.buffer_type()
+        size = ctypes.c_int()
+        result = self.library.Par_BRecv(self.pointer, ctypes.byref(r_id), ctypes.byref(_buffer),
+                                        ctypes.byref(size), ctypes.c_uint32(timeout))
+        check_error(result, context="partner")
+        if self._monitor is not None:
+            self._monitor.received(size.value)
+        return r_id.value, bytearray(_buffer)[:size.value]
 
-    def b_send(self):
+    @error_wrap
+    def b_send(self, data, r_id=0):
         """
         Sends a data packet to the partner. This function is synchronous, i.e.
         it terminates when the transfer job (send+ack) is complete.
+
+        :param data: bytes-like payload, at most 64 KB
+        :param r_id: routing parameter, the partner receives it with the data
         """
-        return self.library.Par_BSend(self.pointer)
+        size = len(data)
+        cdata = (ctypes.c_ubyte * size).from_buffer_copy(data)
+        started = time.perf_counter()
+        result = self.library.Par_BSend(self.pointer, ctypes.c_uint32(r_id),
+                                        ctypes.byref(cdata), size)
+        if self._monitor is not None:
+            self._monitor.sent(size, time.perf_counter() - started, result)
+        return result
 
     def check_as_b_recv_completion(self):
         """
         Checks if a packed received was received.
-        """
-        return self.library.Par_CheckAsBRecvCompletion(self.pointer)
+
+        :returns: None if the receive job is still pending, otherwise a tuple
+            of the routing parameter and the data
+        """
+        op_result = ctypes.c_int()
+        r_id = ctypes.c_uint32()
+        _buffer = snap7.types.buffer_type()
+        size = ctypes.c_int()
+        received = self.library.Par_CheckAsBRecvCompletion(self.pointer, ctypes.byref(op_result),
+                                                           ctypes.byref(r_id), ctypes.byref(_buffer),
+                                                           ctypes.byref(size))
+        if received == 1:
+            # job pending
+            return None
+        if received == -2:
+            raise Snap7Exception("The Partner parameter was invalid")
+        if self._monitor is not None:
+            self._monitor.received(size.value, op_result=op_result.value)
+        check_error(op_result.value, context="partner")
+        return r_id.value, bytearray(_buffer)[:size.value]
 
     def check_as_b_send_completion(self):
         """
@@ -86,6 +158,8 @@ class Partner:
 
         if result == -2:
             raise Snap7Exception("The Client parameter was invalid")
+        if result == 0:
+            self._send_done(op_result.value)
 
         return return_values[result], op_result
 
@@ -97,7 +171,6 @@ class Partner:
         :param active: 0
         :returns: a pointer to the partner object
         """
-        self.library.Par_Create.restype = snap7.types.S7Object
         self.pointer = snap7.types.S7Object(self.library.Par_Create(int(active)))
 
     def destroy(self):
@@ -174,19 +247,75 @@ class Partner:
         return self.library.Par_SetParam(self.pointer, number,
                                          ctypes.byref(ctypes.c_int(value)))
 
-    def set_recv_callback(self):
+    @error_wrap
+    def set_recv_callback(self, call_back):
         """
         Sets the user callback that the Partner object has to call when a data
         packet is incoming.
+
+        The callback is called from the partner thread as
+        ``call_back(op_result, r_id, data)``. data is a memoryview on the
+        library buffer, it is only valid during the call.
+
+        :param call_back: a callable, or None to remove the callback
         """
-        return self.library.Par_SetRecvCallback(self.pointer)
+        logger.info("setting recv callback")
+        if call_back is None:
+            self._recv_callback = None
+            return self.library.Par_SetRecvCallback(self.pointer, None, None)
 
-    def set_send_callback(self):
+        def wrapper(usrptr, op_result, r_id, pdata, size):
+            if size:
+                data = memoryview((ctypes.c_ubyte * size).from_address(pdata)).cast('B')
+            else:
+                data = memoryview(b'')
+            if self._monitor is None:
+                call_back(op_result, r_id, data)
+                return
+            started = time.perf_counter()
+            call_back(op_result, r_id, data)
+            self._monitor.received(size, time.perf_counter() - started, op_result)
+
+        self._recv_callback = recv_callback_type(wrapper)
+        return self.library.Par_SetRecvCallback(self.pointer, self._recv_callback, None)
+
+    @error_wrap
+    def set_send_callback(self, call_back):
         """
         Sets the user callback that the Partner object has to call when the
         asynchronous data sent is complete.
+
+        The callback is called from the partner thread as
+        ``call_back(op_result)``.
+
+        :param call_back: a callable, or None to remove the callback
+        """
+        logger.info("setting send callback")
+        if call_back is None:
+            self._send_callback = None
+            return self.library.Par_SetSendCallback(self.pointer, None, None)
+
+        def wrapper(usrptr, op_result):
+            self._send_done(op_result)
+            call_back(op_result)
+
+        self._send_callback = send_callback_type(wrapper)
+        return self.library.Par_SetSendCallback(self.pointer, self._send_callback, None)
+
+    def create_recv_queue(self, slots=16, slot_size=snap7.types.buffer_size, timeout=1.0):
+        """
+        Receives the incoming packets in a :class:`RecvQueue`. This replaces
+        the recv callback.
+
+        :param slots: number of receive buffers
+        :param slot_size: size of a receive buffer, the largest packet
+        :param timeout: seconds to wait for a free buffer before dropping a
+            packet, None to wait forever
+        :returns: the RecvQueue
         """
-        return self.library.Par_SetSendCallback(self.pointer)
+        recv_queue = RecvQueue(slots, slot_size, timeout)
+        self.set_recv_callback(recv_queue.put)
+        return recv_queue
 
     @error_wrap
     def start(self):
@@ -210,7 +339,9 @@ class Partner:
         assert re.match(ipv4, local_ip), f'{local_ip} is invalid ipv4'
         assert re.match(ipv4, remote_ip), f'{remote_ip} is invalid ipv4'
         logger.info(f"starting partnering from {local_ip} to {remote_ip}")
-        return self.library.Par_StartTo(self.pointer, local_ip, remote_ip,
+        # the library keeps using the address strings, keep them alive
+        self._addresses = (local_ip.encode(), remote_ip.encode())
+        return self.library.Par_StartTo(self.pointer, self._addresses[0], self._addresses[1],
                                         ctypes.c_uint16(local_tsap),
                                         ctypes.c_uint16(remote_tsap))
 
@@ -226,4 +357,118 @@ class Partner:
         Waits until the current asynchronous send job is done or the timeout
         expires.
         """
-        return self.library.Par_WaitAsBSendCompletion(self.pointer, timeout)
+        result = self.library.Par_WaitAsBSendCompletion(self.pointer, timeout)
+        if self._monitor is not None and self._send_started is not None:
+            # reports the job to the monitor if it is complete
+            self.check_as_b_send_completion()
+        return result
+
+
+class Packet:
+    """
+    A packet received by a :class:`RecvQueue`.
+
+    The data is a memoryview on one of the receive buffers of the queue,
+    release the packet when done with it so the buffer can be reused::
+
+        with recv_queue.get() as packet:
+            process(packet.r_id, packet.data)
+    """
+    __slots__ = ('r_id', 'data', '_free', '_slot')
+
+    def __init__(self, r_id, data, free, slot):
+        self.r_id = r_id
+        self.data = data
+        self._free = free
+        self._slot = slot
+
+    def release(self):
+        """
+        Gives the receive buffer back to the queue, data is invalid afterwards.
+        """
+        if self._slot is not None:
+            self.data.release()
+            self._free.put(self._slot)
+            self._slot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class RecvQueue:
+    """
+    A bounded queue of packets received by a partner, backed by a fixed ring
+    of preallocated receive buffers.
+
+    Every incoming packet is copied once from the library buffer into a free
+    receive buffer, consumers get it as a memoryview without further copies.
+    When all buffers are in use the partner thread waits for one to be
+    released, which delays the acknowledge of the packet and so slows down
+    the sending PLC. Packets that can't get a buffer within the timeout are
+    dropped and counted.
+    """
+
+    def __init__(self, slots=16, slot_size=snap7.types.buffer_size, timeout=1.0):
+        """
+        :param slots: number of receive buffers
+        :param slot_size: size of a receive buffer, the largest packet
+        :param timeout: seconds to wait for a free buffer, None to wait forever
+        """
+        self.slot_size = slot_size
+        self.timeout = timeout
+        self.dropped = 0
+        self.errors = 0
+        self._buffer = (ctypes.c_ubyte * (slots * slot_size))()
+        self._view = memoryview(self._buffer).cast('B')
+        self._free = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._ready = queue.Queue(maxsize=slots)
+
+    def put(self, op_result, r_id, data):
+        """
+        Stores an incoming packet, this is the partner recv callback.
+        """
+        if op_result:
+            self.errors += 1
+            logger.warning(f"packet received with error {hex(op_result)}")
+            return
+        size = len(data)
+        if size > self.slot_size:
+            self.dropped += 1
+            logger.warning(f"dropping packet of {size} bytes, larger than the receive buffers")
+            return
+        try:
+            slot = self._free.get(timeout=self.timeout)
+        except queue.Empty:
+            self.dropped += 1
+            logger.warning("dropping packet, no free receive buffer")
+            return
+        start = slot * self.slot_size
+        self._view[start:start + size] = data
+        self._ready.put(Packet(r_id, self._view[start:start + size], self._free, slot))
+
+    def get(self, block=True, timeout=None):
+        """
+        Returns the next received packet.
+
+        :raises queue.Empty: if no packet is available within timeout
+        :returns: a Packet
+        """
+        return self._ready.get(block, timeout)
+
+    def qsize(self):
+        """
+        Returns the number of packets waiting to be consumed.
+        """
+        return self._ready.qsize()
+
+    def __iter__(self):
+        while True:
+            yield self.get()
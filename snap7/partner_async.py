@@ -0,0 +1,140 @@
+"""
+Snap7 partner with asyncio features.
+"""
+import asyncio
+import concurrent.futures
+import logging
+
+from snap7.common import check_error
+from .partner import Partner
+
+logger = logging.getLogger(__name__)
+
+
+class PartnerAsync(Partner):
+    """
+    This class expands the Partner class with asyncio features.
+
+    The native send and recv callbacks run in the partner thread, they are
+    handed over to the event loop so sending and receiving never blocks it::
+
+        partner = PartnerAsync(active=True)
+        partner.start_to('0.0.0.0', '192.168.0.1', 0x1002, 0x1002)
+        await partner.send(b'data', r_id=1)
+        async for r_id, data in partner:
+            ...
+
+    The event loop is bound on the first :func:`send` or :func:`recv`.
+    """
+
+    def __init__(self, active=False, max_queue=16, recv_timeout=1.0):
+        """
+        :param active: create an active partner
+        :param max_queue: maximum number of received packets waiting to be
+            consumed, when the queue is full the partner thread waits, which
+            delays the acknowledge of the packet to the sender
+        :param recv_timeout: seconds the partner thread waits for room in the
+            queue before dropping a packet
+        """
+        super().__init__(active)
+        self.max_queue = max_queue
+        self.recv_timeout = recv_timeout
+        self.dropped = 0
+        self.errors = 0
+        self._loop = None
+        self._queue = None
+        self._send_lock = None
+        self._send_future = None
+
+    def _bind_loop(self):
+        """
+        Binds the partner to the running event loop and installs the callbacks.
+        """
+        loop = asyncio.get_event_loop()
+        if self._loop is loop:
+            return
+        logger.debug("binding partner to event loop")
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._send_lock = asyncio.Lock()
+        self.set_recv_callback(self._on_recv)
+        self.set_send_callback(self._on_send)
+
+    def _on_recv(self, op_result, r_id, data):
+        """
+        Native recv callback, called in the partner thread.
+        """
+        if op_result:
+            self.errors += 1
+            logger.warning(f"packet received with error {hex(op_result)}")
+            return
+        try:
+            # the data is only valid during the callback
+            future = asyncio.run_coroutine_threadsafe(self._queue.put((r_id, bytes(data))), self._loop)
+            future.result(self.recv_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.dropped += 1
+            logger.warning("dropping packet, the receive queue is full")
+        except Exception:
+            self.errors += 1
+            logger.exception("handing a received packet to the event loop failed")
+
+    def _on_send(self, op_result):
+        """
+        Native send callback, called in the partner thread.
+        """
+        self._loop.call_soon_threadsafe(self._send_completed, op_result)
+
+    def _send_completed(self, op_result):
+        if self._send_future is not None and not self._send_future.done():
+            self._send_future.set_result(op_result)
+
+    async def send(self, data, r_id=0, timeout=None):
+        """
+        Sends a data packet to the partner and waits until the partner
+        acknowledged it. Concurrent sends are done one after the other.
+
+        When the timeout expires the native send job goes on until the
+        acknowledge or the library timeout, the next send waits for it.
+
+        :param data: bytes-like payload, at most 64 KB
+        :param r_id: routing parameter, the partner receives it with the data
+        :param timeout: seconds to wait for the acknowledge, None to wait for
+            the library timeout (BSendTimeout)
+        """
+        self._bind_loop()
+        deadline = None if timeout is None else self._loop.time() + timeout
+        async with self._send_lock:
+            if self._send_future is not None and not self._send_future.done():
+                # the job of a send which timed out is still pending in the library
+                await self._wait_send(deadline)
+            self._send_future = self._loop.create_future()
+            try:
+                self.as_b_send(data, r_id)
+            except Exception:
+                self._send_future = None
+                raise
+            op_result = await self._wait_send(deadline)
+            check_error(op_result, context="partner")
+
+    async def _wait_send(self, deadline):
+        # shielded, the future stays pending on a timeout until the native job completes
+        timeout = None if deadline is None else max(deadline - self._loop.time(), 0)
+        return await asyncio.wait_for(asyncio.shield(self._send_future), timeout)
+
+    async def recv(self, timeout=None):
+        """
+        Waits for the next packet of the partner.
+
+        :param timeout: seconds to wait, None to wait forever
+        :returns: a tuple of the routing parameter and the data
+        """
+        self._bind_loop()
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.recv()
@@ -0,0 +1,205 @@
+"""
+Throughput, error and latency statistics of a snap7 partner.
+"""
+import logging
+import threading
+import time
+from array import array
+
+import snap7.types
+from snap7.stats import Histogram
+
+logger = logging.getLogger(__name__)
+
+# layout of the counters of a single second of the throughput window
+SENT_PACKETS, SENT_BYTES, SEND_ERRORS, RECV_PACKETS, RECV_BYTES, RECV_ERRORS = range(6)
+
+
+class PartnerMonitor:
+    """
+    Throughput, error and latency statistics of a :class:`snap7.partner.Partner`.
+
+    Every send and receive is timestamped on the Python side. The counters
+    of the last window seconds are kept in a fixed ring of one second slots,
+    the latencies in fixed size :class:`Histogram` objects::
+
+        monitor = snap7.partner_monitor.PartnerMonitor(window=10)
+        monitor.attach(partner)
+        monitor.start(interval=5)
+        ...
+        monitor.snapshot()['send']['bytes_per_second']
+
+    The send latency is the time from the start of a send until the partner
+    acknowledged it. The receive latency is the time spent in the recv
+    callback, during which the library holds back the acknowledge.
+
+    The native statistics (get_stats, get_times and get_status) are sampled
+    by :func:`sample`, periodically when started.
+    """
+
+    def __init__(self, window=60):
+        """
+        :param window: seconds over which the throughput is computed
+        """
+        self.window = window
+        self.partner = None
+        self.native = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all counters and histograms.
+        """
+        with self._lock:
+            self._slots = array('Q', bytes(8 * 6 * self.window))
+            self._slot_times = array('q', [-1] * self.window)
+            self._totals = array('Q', bytes(8 * 6))
+            self.send_latency = Histogram()
+            self.recv_latency = Histogram()
+
+    def attach(self, partner):
+        """
+        Starts monitoring a partner.
+        """
+        logger.info("attaching partner monitor")
+        self.partner = partner
+        partner._monitor = self
+
+    def detach(self):
+        """
+        Stops monitoring the partner.
+        """
+        self.stop()
+        if self.partner is not None:
+            self.partner._monitor = None
+            self.partner = None
+
+    def _count(self, packets, size, errors, failed, nbytes, latency=None, histogram=None):
+        now = time.monotonic()
+        second = int(now)
+        slot = second % self.window
+        offset = slot * 6
+        with self._lock:
+            if self._slot_times[slot] != second:
+                self._slot_times[slot] = second
+                for i in range(offset, offset + 6):
+                    self._slots[i] = 0
+            if failed:
+                self._slots[offset + errors] += 1
+                self._totals[errors] += 1
+                return
+            self._slots[offset + packets] += 1
+            self._slots[offset + size] += nbytes
+            self._totals[packets] += 1
+            self._totals[size] += nbytes
+            if latency is not None:
+                histogram.record(latency)
+
+    def sent(self, nbytes, latency=None, op_result=0):
+        """
+        Counts a sent packet, called by the partner.
+
+        :param nbytes: size of the packet
+        :param latency: seconds until the packet was acknowledged
+        :param op_result: result of the send job
+        """
+        self._count(SENT_PACKETS, SENT_BYTES, SEND_ERRORS, op_result, nbytes, latency, self.send_latency)
+
+    def received(self, nbytes, latency=None, op_result=0):
+        """
+        Counts a received packet, called by the partner.
+
+        :param nbytes: size of the packet
+        :param latency: seconds spent handling the packet
+        :param op_result: result of the receive
+        """
+        self._count(RECV_PACKETS, RECV_BYTES, RECV_ERRORS, op_result, nbytes, latency, self.recv_latency)
+
+    def sample(self):
+        """
+        Reads the native statistics of the partner.
+        """
+        if self.partner is None:
+            return
+        sent, recv, send_errors, recv_errors = self.partner.get_stats()
+        send_time, recv_time = self.partner.get_times()
+        status = self.partner.get_status().value
+        native = {
+            'bytes_sent': sent.value,
+            'bytes_recv': recv.value,
+            'send_errors': send_errors.value,
+            'recv_errors': recv_errors.value,
+            'last_send_time': send_time.value,
+            'last_recv_time': recv_time.value,
+            'status': snap7.types.partner_statuses.get(status, status),
+        }
+        with self._lock:
+            self.native = native
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("partner monitor sample failed")
+
+    def start(self, interval=1.0):
+        """
+        Samples the native statistics in a background thread.
+
+        :param interval: seconds between two samples
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        logger.info(f"starting partner monitor with interval {interval}s")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,),
+                                        name="snap7-partner-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def snapshot(self):
+        """
+        Returns the statistics as a dict of plain Python types.
+
+        :returns: a dict with 'send' and 'recv' entries, containing the totals,
+            the rates over the window and the latency percentiles in
+            milliseconds, and a 'native' entry with the last sample
+        """
+        second = int(time.monotonic())
+        window = array('Q', bytes(8 * 6))
+        with self._lock:
+            for slot, slot_time in enumerate(self._slot_times):
+                if second - self.window < slot_time <= second:
+                    for i in range(6):
+                        window[i] += self._slots[slot * 6 + i]
+            totals = self._totals[:]
+            latencies = self.send_latency.as_dict(), self.recv_latency.as_dict()
+            native = dict(self.native)
+
+        result = {'native': native}
+        for name, first, latency in (('send', SENT_PACKETS, latencies[0]),
+                                     ('recv', RECV_PACKETS, latencies[1])):
+            packets, size, errors = window[first:first + 3]
+            jobs = packets + errors
+            result[name] = {
+                'packets': totals[first],
+                'bytes': totals[first + 1],
+                'errors': totals[first + 2],
+                'packets_per_second': packets / self.window,
+                'bytes_per_second': size / self.window,
+                'error_rate': errors / jobs if jobs else 0.0,
+                'latency': latency,
+            }
+        return result
@@ -0,0 +1,317 @@
+"""
+Polling of tag groups at a rate adapted to the load of the PLC.
+
+Every request of a client takes communication time from the CPU, which
+lengthens its scan cycle. The :class:`AdaptivePoller` reads groups of DB
+ranges at their configured interval and backs all groups off when the PLC
+shows signs of load, then speeds them up again gradually::
+
+    poller = AdaptivePoller(client, max_cycle_time=50)
+    poller.add_group('motors', [(1, 0, 64), (2, 0, 16)], on_motors, interval=0.1)
+    poller.add_group('energy', [(10, 0, 200)], on_energy, interval=5)
+    poller.start()
+
+The load is measured from:
+
+- the cycle time of OB1, SZL 0x0222 index 1, which must stay below
+  max_cycle_time
+- the communication load configured in the CPU, SZL 0x0132 index 1, which
+  the estimated load of the poller must not exceed
+- the round trip time of the reads, which grows when the CPU is busy
+
+PLCs which don't provide these SZL lists are controlled on the round trip
+time only.
+"""
+import logging
+import threading
+import time
+
+import snap7.szl
+from snap7.exceptions import ConnectionException, Snap7Exception, TimeoutException
+
+logger = logging.getLogger(__name__)
+
+
+class PollGroup:
+    """
+    A group of DB ranges read together and passed to a callback.
+    """
+
+    def __init__(self, name, reads, call_back, interval, max_interval):
+        """
+        :param name: name of the group
+        :param reads: list of (db_number, start, size) tuples
+        :param call_back: called as ``call_back(name, data)`` with a list of
+            bytearrays, one per read
+        :param interval: seconds between two polls when the PLC isn't loaded
+        :param max_interval: longest interval when the poller backs off
+        """
+        self.name = name
+        self.reads = list(reads)
+        self.call_back = call_back
+        self.min_interval = interval
+        self.max_interval = max_interval
+        self.interval = interval
+        self.next_poll = 0.0
+        self.polls = 0
+        self.errors = 0
+
+    def scale(self, factor):
+        """
+        Sets the interval to the configured interval times factor, within
+        the limits of the group.
+        """
+        self.interval = min(max(self.min_interval * factor, self.min_interval), self.max_interval)
+
+
+class AdaptivePoller:
+    """
+    Polls tag groups and adapts their rate to the load of the PLC.
+
+    Every check_interval seconds the load is measured. When the cycle time
+    exceeds max_cycle_time, the estimated communication load exceeds the
+    load configured in the CPU or the round trip time exceeds rtt_factor
+    times the baseline round trip time, all intervals are multiplied by
+    backoff. The baseline follows the fastest round trip times and drifts
+    up towards the current one, so a lasting change of the network becomes
+    the new baseline. When the cycle time is below headroom times max_cycle_time and
+    the other signals are fine, the intervals are multiplied by speedup,
+    down to the configured intervals.
+
+    The client isn't thread safe, don't use it from other threads while the
+    poller is started. The SZL reads go through a
+    :class:`snap7.szl.SZLCache`, pass the one of your diagnostics to share it.
+    """
+
+    def __init__(self, client, max_cycle_time, check_interval=5.0, backoff=2.0, speedup=0.9, headroom=0.8,
+                 rtt_factor=3.0, max_factor=16.0, szl_cache=None, rtt_drift=0.01):
+        """
+        :param client: a connected :class:`snap7.client.Client`
+        :param max_cycle_time: the cycle time limit of the PLC in milliseconds
+        :param check_interval: seconds between two load measurements
+        :param backoff: factor applied to the intervals when the PLC is loaded
+        :param speedup: factor applied to the intervals when the PLC has
+            headroom, below 1
+        :param headroom: fraction of max_cycle_time below which the poller
+            speeds up
+        :param rtt_factor: round trip times above rtt_factor times the
+            baseline mean a loaded PLC
+        :param max_factor: default limit of the intervals, as a factor of the
+            configured interval of a group
+        :param szl_cache: the SZL cache to use, by default one with a time to
+            live of check_interval
+        :param rtt_drift: fraction of the difference to the current round
+            trip time the baseline moves up by per read
+        """
+        self.client = client
+        self.max_cycle_time = max_cycle_time
+        self.check_interval = check_interval
+        self.backoff = backoff
+        self.speedup = speedup
+        self.headroom = headroom
+        self.rtt_factor = rtt_factor
+        self.max_factor = max_factor
+        self.rtt_drift = rtt_drift
+        self.szl_cache = szl_cache or snap7.szl.SZLCache(client, ttl=check_interval)
+        self.factor = 1.0
+        self.cycle_time = None
+        self.communication_load = None
+        self.rtt = None
+        self.best_rtt = None
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        # SZL lists the PLC doesn't provide
+        self._unavailable = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_group(self, name, reads, call_back, interval, max_interval=None):
+        """
+        Adds a group of DB ranges to poll.
+
+        :param name: name of the group
+        :param reads: list of (db_number, start, size) tuples
+        :param call_back: called as ``call_back(name, data)`` with a list of
+            bytearrays, from the polling thread
+        :param interval: seconds between two polls when the PLC isn't loaded
+        :param max_interval: longest interval, by default max_factor times
+            interval
+        """
+        if max_interval is None:
+            max_interval = interval * self.max_factor
+        group = PollGroup(name, reads, call_back, interval, max_interval)
+        group.scale(self.factor)
+        with self._lock:
+            self._groups[name] = group
+
+    def remove_group(self, name):
+        """
+        Stops polling a group.
+        """
+        with self._lock:
+            self._groups.pop(name, None)
+
+    def _record_rtt(self, rtt):
+        # exponentially weighted moving average of the round trip time per read
+        self.rtt = rtt if self.rtt is None else self.rtt * 0.8 + rtt * 0.2
+        if self.best_rtt is None or self.rtt < self.best_rtt:
+            self.best_rtt = self.rtt
+        else:
+            # a single fast outlier or a slower route doesn't hold the poller back forever
+            self.best_rtt += (self.rtt - self.best_rtt) * self.rtt_drift
+
+    def _read_szl(self, ssl_id, index):
+        if (ssl_id, index) in self._unavailable:
+            return None
+        try:
+            records = self.szl_cache.read(ssl_id, index).records
+        except (ConnectionException, TimeoutException):
+            logger.warning("SZL 0x%04X index %s not read, the PLC isn't reachable", ssl_id, index)
+            return None
+        except Snap7Exception as e:
+            logger.warning("SZL 0x%04X index %s not available, not used to adapt the polling: %s", ssl_id, index, e)
+            self._unavailable.add((ssl_id, index))
+            return None
+        return records[0] if records and not isinstance(records[0], bytes) else None
+
+    def poll(self, now=None):
+        """
+        Polls the groups which are due and measures the load when it is
+        time to.
+
+        :param now: the time from time.monotonic(), default is now
+        :returns: the time from time.monotonic() of the next poll
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            due = [group for group in self._groups.values() if group.next_poll <= now]
+        for group in due:
+            self._poll_group(group, now)
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.measure()
+        with self._lock:
+            next_poll = min((group.next_poll for group in self._groups.values()), default=now + self.check_interval)
+        return min(next_poll, self._next_check)
+
+    def _poll_group(self, group, now):
+        group.next_poll = now + group.interval
+        group.polls += 1
+        data = []
+        try:
+            for db_number, start, size in group.reads:
+                started = time.perf_counter()
+                data.append(self.client.db_read(db_number, start, size))
+                self._record_rtt(time.perf_counter() - started)
+        except Snap7Exception:
+            group.errors += 1
+            logger.exception("polling group %s failed", group.name)
+            return
+        try:
+            group.call_back(group.name, data)
+        except Exception:
+            logger.exception("callback of polling group %s failed", group.name)
+
+    def estimated_load(self):
+        """
+        Returns the share of the time the PLC spends answering the poller in
+        percent, estimated from the round trip time and the read rate.
+        """
+        if self.rtt is None:
+            return None
+        with self._lock:
+            reads_per_second = sum(len(group.reads) / group.interval for group in self._groups.values())
+        return self.rtt * reads_per_second * 100
+
+    def measure(self):
+        """
+        Reads the cycle time and the configured communication load of the
+        PLC and adjusts the polling rate.
+        """
+        cycle_time = self._read_szl(0x0222, 0x0001)
+        if cycle_time is not None:
+            self.cycle_time = cycle_time.previous
+        status = self._read_szl(0x0132, 0x0001)
+        if status is not None:
+            self.communication_load = status.max_communication_load
+        return self.adjust(self.cycle_time, self.rtt)
+
+    def adjust(self, cycle_time=None, rtt=None):
+        """
+        Adjusts the polling rate to a measurement of the load.
+
+        :param cycle_time: cycle time of the PLC in milliseconds, None if
+            unknown
+        :param rtt: round trip time of a read in seconds, None if unknown
+        :returns: the factor applied to the configured intervals
+        """
+        loaded = False
+        if cycle_time is not None and cycle_time > self.max_cycle_time:
+            loaded = True
+        load = self.estimated_load()
+        if self.communication_load and load is not None and load > self.communication_load:
+            loaded = True
+        if rtt is not None and self.best_rtt and rtt > self.best_rtt * self.rtt_factor:
+            loaded = True
+        if loaded:
+            factor = self.factor * self.backoff
+        elif cycle_time is None or cycle_time < self.max_cycle_time * self.headroom:
+            factor = self.factor * self.speedup
+        else:
+            factor = self.factor
+        factor = min(max(factor, 1.0), self.max_factor)
+        if factor != self.factor:
+            logger.info("polling intervals scaled by %.2f (cycle time %s ms, rtt %s s)", factor, cycle_time, rtt)
+        self.factor = factor
+        with self._lock:
+            for group in self._groups.values():
+                group.scale(factor)
+        return factor
+
+    def status(self):
+        """
+        Returns the measurements and the current interval of every group.
+        """
+        with self._lock:
+            groups = {name: {'interval': group.interval, 'polls': group.polls, 'errors': group.errors}
+                      for name, group in self._groups.items()}
+        return {
+            'factor': self.factor,
+            'cycle_time': self.cycle_time,
+            'communication_load': self.communication_load,
+            'estimated_load': self.estimated_load(),
+            'rtt': self.rtt,
+            'groups': groups,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delay = self.poll() - time.monotonic()
+            except Exception:
+                logger.exception("polling failed")
+                delay = self.check_interval
+            self._stop.wait(max(delay, 0))
+
+    def start(self):
+        """
+        Starts polling in a background thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        logger.info("starting adaptive poller")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snap7-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread.
+        """
+        logger.info("stopping adaptive poller")
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
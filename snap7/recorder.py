@@ -0,0 +1,353 @@
+"""
+Capture and replay of client traffic.
+
+A :class:`Recorder` is the trace hook of one or more clients and appends
+every data call with its payload to a binary log::
+
+    with Recorder('line1.s7rec') as recorder:
+        recorder.attach(client)
+        ...
+
+A :class:`ReplayClient` stands in for a :class:`snap7.client.Client` and
+answers data calls with the recorded responses, at the recorded pace or
+faster, to reproduce an issue or benchmark decoders offline::
+
+    client = ReplayClient('line1.s7rec', speed=10)
+    client.db_read(1, 0, 4)
+
+The log starts with a magic string, followed by the records: a fixed size
+header (timestamp, operation, area, DB number, start, size, result and
+payload length) and the payload, the data read or written. The index,
+path.idx, holds the timestamp and offset of every record. Both are written
+in batches and read through mmap.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+import snap7.types
+from snap7.common import check_error
+
+logger = logging.getLogger(__name__)
+
+log_magic = b'S7REC\x00\x01\x00'
+index_magic = b'S7IDX\x00\x01\x00'
+
+# timestamp, operation, area, db_number, start, size, result, payload length
+_header = struct.Struct('<dBBHiiII')
+# timestamp, offset of the record in the log
+_entry = struct.Struct('<dQ')
+
+operations = ('db_read', 'db_write', 'read_area', 'write_area', 'ab_read', 'ab_write',
+              'as_db_read', 'as_db_write', 'as_ab_read', 'as_ab_write')
+_operation_codes = {operation: code for code, operation in enumerate(operations)}
+
+Record = namedtuple('Record', 'timestamp operation area db_number start size result data')
+
+
+def index_path(path):
+    """
+    Returns the path of the index of a log.
+    """
+    return f"{path}.idx"
+
+
+class Recorder:
+    """
+    Appends client calls to a log, see :meth:`snap7.client.Client.set_trace_hook`.
+
+    The records are packed to a buffer, which is written when it holds
+    buffer_size bytes and when the recorder is flushed or closed. Several
+    clients, in different threads, can share a recorder. An existing log is
+    overwritten.
+    """
+
+    def __init__(self, path, buffer_size=1 << 20):
+        """
+        :param path: path of the log
+        :param buffer_size: bytes buffered before they are written
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.records = 0
+        self._lock = threading.Lock()
+        self._log = open(path, 'wb')
+        self._index = open(index_path(path), 'wb')
+        self._offset = len(log_magic)
+        self._log_buffer = bytearray(log_magic)
+        self._index_buffer = bytearray(index_magic)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, operation, area, db_number, start, size, result, data=b'', timestamp=None):
+        """
+        Appends a call to the log.
+
+        :param operation: name of the client method, e.g. db_read
+        :param area: the area, e.g. :data:`snap7.types.S7AreaDB`
+        :param result: error code returned by the call
+        :param data: the data read or written
+        :param timestamp: time of the call in seconds since 1970, default is
+            now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        header = _header.pack(timestamp, _operation_codes[operation], area, db_number, start, size, result,
+                              len(data))
+        with self._lock:
+            self._index_buffer += _entry.pack(timestamp, self._offset)
+            self._log_buffer += header
+            self._log_buffer += data
+            self._offset += len(header) + len(data)
+            self.records += 1
+            if len(self._log_buffer) >= self.buffer_size:
+                self._flush()
+
+    def trace(self, event):
+        """
+        Trace hook of a client, see :meth:`snap7.client.Client.set_trace_hook`.
+        """
+        operation = event['operation']
+        data = event['data']
+        if data is None or (event['result'] and operation.endswith('read')):
+            data = b''
+        self.record(operation, event['area'], event['db_number'], event['start'], event['size'],
+                    event['result'], bytes(data))
+
+    def attach(self, client):
+        """
+        Records the calls of a client, replacing its trace hook.
+        """
+        client.set_trace_hook(self.trace)
+
+    def detach(self, client):
+        """
+        Stops recording the calls of a client.
+        """
+        client.set_trace_hook(None)
+
+    def _flush(self):
+        # the log is written first, the index never refers to missing records
+        self._log.write(self._log_buffer)
+        self._log.flush()
+        self._index.write(self._index_buffer)
+        self._index.flush()
+        del self._log_buffer[:]
+        del self._index_buffer[:]
+
+    def flush(self):
+        """
+        Writes the buffered records.
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """
+        Writes the buffered records and closes the log.
+        """
+        with self._lock:
+            if self._log.closed:
+                return
+            self._flush()
+            self._log.close()
+            self._index.close()
+        logger.info("recorded %s calls to %s", self.records, self.path)
+
+
+class Recording:
+    """
+    A log written by a :class:`Recorder`, a sequence of :class:`Record`.
+
+    Without an index, the log is scanned to build one in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._log = self._map(path, log_magic)
+        if os.path.exists(index_path(path)):
+            self._index = self._map(index_path(path), index_magic)
+        else:
+            logger.warning("%s has no index, scanning it", path)
+            self._index = self._scan()
+        self._count = (len(self._index) - len(index_magic)) // _entry.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _map(path, magic):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < len(magic):
+                raise ValueError(f"{path} is empty")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(magic)] != magic:
+            mapped.close()
+            raise ValueError(f"{path} isn't a recording")
+        return mapped
+
+    def _scan(self):
+        index = bytearray(index_magic)
+        offset = len(log_magic)
+        while offset + _header.size <= len(self._log):
+            header = _header.unpack_from(self._log, offset)
+            index += _entry.pack(header[0], offset)
+            offset += _header.size + header[-1]
+        return index
+
+    def __len__(self):
+        return self._count
+
+    def timestamp(self, number):
+        """
+        Returns the timestamp of a record.
+        """
+        return _entry.unpack_from(self._index, len(index_magic) + number * _entry.size)[0]
+
+    def header(self, number):
+        """
+        Returns the fields of a record without its data.
+        """
+        offset = _entry.unpack_from(self._index, len(index_magic) + number * _entry.size)[1]
+        timestamp, operation, area, db_number, start, size, result, _ = _header.unpack_from(self._log, offset)
+        return Record(timestamp, operations[operation], area, db_number, start, size, result, None)
+
+    def __getitem__(self, number):
+        if number < 0:
+            number += self._count
+        if not 0 <= number < self._count:
+            raise IndexError("record number out of range")
+        offset = _entry.unpack_from(self._index, len(index_magic) + number * _entry.size)[1]
+        timestamp, operation, area, db_number, start, size, result, length = _header.unpack_from(self._log, offset)
+        offset += _header.size
+        return Record(timestamp, operations[operation], area, db_number, start, size, result,
+                      self._log[offset:offset + length])
+
+    def __iter__(self):
+        for number in range(self._count):
+            yield self[number]
+
+    def find(self, timestamp):
+        """
+        Returns the number of the first record at or after a timestamp.
+        """
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def close(self):
+        """
+        Unmaps the log and the index.
+        """
+        self._log.close()
+        if isinstance(self._index, mmap.mmap):
+            self._index.close()
+
+
+class ReplayClient:
+    """
+    Stands in for a :class:`snap7.client.Client`, answering the data calls
+    with the responses of a recording.
+
+    A call gets the next recorded response to the same operation, area, DB,
+    start and size; the calls of :class:`snap7.client_async.ClientAsync`
+    answer their synchronous counterparts. Recorded errors are handled as
+    the client does: raised, except by ab_write which returns the error
+    code.
+    """
+
+    def __init__(self, path, speed=None, loop=False):
+        """
+        :param path: path of the log
+        :param speed: None to answer at once, 1 to answer at the recorded
+            pace, 10 for ten times faster
+        :param loop: start over with the first response when the responses
+            to a call are used up
+        """
+        self.recording = Recording(path)
+        self.speed = speed
+        self.loop = loop
+        self.replayed = 0
+        self._lock = threading.Lock()
+        # (operation, area, db_number, start, size) -> record numbers
+        self._responses = {}
+        for number in range(len(self.recording)):
+            header = self.recording.header(number)
+            operation = header.operation[3:] if header.operation.startswith('as_') else header.operation
+            key = (operation, header.area, header.db_number, header.start, header.size)
+            self._responses.setdefault(key, []).append(number)
+        self._next = {}
+        # time.monotonic() and timestamp of the first response
+        self._started = None
+
+    def _respond(self, operation, area, db_number, start, size, check=True):
+        key = (operation, area, db_number, start, size)
+        with self._lock:
+            numbers = self._responses.get(key)
+            if not numbers:
+                raise ValueError(f"no recorded {operation} of area {area} DB {db_number} start {start} size {size}")
+            position = self._next.get(key, 0)
+            if position == len(numbers):
+                if not self.loop:
+                    raise ValueError(f"the recorded responses to {operation} of area {area} DB {db_number} "
+                                     f"start {start} size {size} are used up")
+                position = 0
+            self._next[key] = position + 1
+            self.replayed += 1
+        record = self.recording[numbers[position]]
+        if self.speed:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = (now, record.timestamp)
+            delay = self._started[0] + (record.timestamp - self._started[1]) / self.speed - now
+            if delay > 0:
+                time.sleep(delay)
+        if check:
+            check_error(record.result, context="client")
+        return record
+
+    def connect(self, address, rack, slot, tcpport=102):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def get_connected(self):
+        return True
+
+    def destroy(self):
+        self.recording.close()
+
+    def db_read(self, db_number, start, size):
+        return bytearray(self._respond('db_read', snap7.types.S7AreaDB, db_number, start, size).data)
+
+    def db_write(self, db_number, start, data):
+        self._respond('db_write', snap7.types.S7AreaDB, db_number, start, len(data))
+
+    def read_area(self, area, dbnumber, start, size):
+        return bytearray(self._respond('read_area', area, dbnumber, start, size).data)
+
+    def write_area(self, area, dbnumber, start, data):
+        self._respond('write_area', area, dbnumber, start, len(data))
+
+    def ab_read(self, start, size):
+        return bytearray(self._respond('ab_read', snap7.types.S7AreaPA, 0, start, size).data)
+
+    def ab_write(self, start, data):
+        return self._respond('ab_write', snap7.types.S7AreaPA, 0, start, len(data), check=False).result
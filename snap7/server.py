@@ -1,17 +1,39 @@
 """
 Snap7 server used for mimicking a siemens 7 server.
 """
+import asyncio
 import ctypes
 import logging
+import mmap
+import os
 import re
+import threading
 import time
 
 import snap7
 import snap7.types
 from snap7.common import check_error, load_library, ipv4
+from snap7.exceptions import Snap7Exception
 
 logger = logging.getLogger(__name__)
 
+# S7 area code to area name, e.g. 0x84 -> 'DB'
+_area_names = {code: name for name, code in snap7.types.areas.items()}
+
+# server area code to area name, e.g. 5 -> 'DB'
+_server_area_names = {code: name for name, code in snap7.types.server_areas.items()}
+
+# size in bytes of an element of each word length
+_wordlen_sizes = {
+    snap7.types.S7WLBit: 1,
+    snap7.types.S7WLByte: 1,
+    snap7.types.S7WLWord: 2,
+    snap7.types.S7WLDWord: 4,
+    snap7.types.S7WLReal: 4,
+    snap7.types.S7WLCounter: 2,
+    snap7.types.S7WLTimer: 2,
+}
+
 
 def error_wrap(func):
     """Parses a s7 error code returned the decorated function."""
@@ -35,6 +57,15 @@ class Server:
         """
         self._read_callback = None
         self._callback = None
+        self._areas = {}
+        self._mapped = {}
+        self._read_hooks = {}
+        self._read_hook_cache = {}
+        self._read_hook_lock = threading.Lock()
+        self._rw_area_callback = None
+        self._events = None
+        self._event_refs = []
+        self._event_ready = ctypes.c_int32()
         self.pointer = None
 
         self.library = load_library()
@@ -65,7 +96,6 @@ class Server:
         create the server.
         """
         logger.info("creating server")
-        self.library.Srv_Create.restype = snap7.types.S7Object
         self.pointer = snap7.types.S7Object(self.library.Srv_Create())
 
     @error_wrap
@@ -76,8 +106,103 @@ class Server:
         size = ctypes.sizeof(userdata)
         logger.info(f"registering area {area_code}, index {index}, size {size}")
         size = ctypes.sizeof(userdata)
-        return self.library.Srv_RegisterArea(self.pointer, area_code, index,
-                                             ctypes.byref(userdata), size)
+        result = self.library.Srv_RegisterArea(self.pointer, area_code, index,
+                                               ctypes.byref(userdata), size)
+        if not result:
+            # keep a reference, the server only holds a pointer to the memory
+            self._areas[(area_code, index)] = userdata
+        return result
+
+    def get_area(self, area_code, index):
+        """Returns the memory block registered for an area.
+
+        :param area_code: server area code (e.g. snap7.types.srvAreaDB)
+        :param index: area index, the DB number for DB areas
+        :returns: the ctypes object passed to :func:`register_area`
+        """
+        try:
+            return self._areas[(area_code, index)]
+        except KeyError:
+            raise Snap7Exception(f"area {area_code} index {index} is not registered")
+
+    def register_mapped_area(self, area_code, index, path, size=None):
+        """Shares a memory area backed by a memory mapped file.
+
+        Client writes land in the page cache and are written to the file by
+        the operating system, registering an existing file again doesn't
+        need to read it. The file is created or extended if needed.
+
+        :param area_code: server area code (e.g. snap7.types.srvAreaDB)
+        :param index: area index, the DB number for DB areas
+        :param path: file backing the area
+        :param size: area size in bytes, defaults to the size of the file
+        :returns: the ctypes array registered with the server
+        """
+        with open(path, 'a+b') as f:
+            current = os.fstat(f.fileno()).st_size
+            if size is None:
+                size = current
+            if not size:
+                raise Snap7Exception(f"can't map empty area file {path}")
+            if current < size:
+                f.truncate(size)
+            mapping = mmap.mmap(f.fileno(), size)
+        logger.info(f"mapping area {area_code}, index {index} to {path}")
+        userdata = (ctypes.c_ubyte * size).from_buffer(mapping)
+        self.register_area(area_code, index, userdata)
+        self._mapped[(area_code, index)] = (mapping, os.path.abspath(path))
+        return userdata
+
+    @staticmethod
+    def _area_filename(area_code, index):
+        name = _server_area_names[area_code]
+        return f"{name}_{index}.bin"
+
+    def snapshot(self, directory):
+        """Saves the content of all registered areas in a directory.
+
+        Every area is written to a file named after its area and index, e.g.
+        DB_1.bin. Areas mapped to that same file are only flushed.
+
+        :param directory: the directory to save the areas in
+        """
+        os.makedirs(directory, exist_ok=True)
+        for (area_code, index), data in list(self._areas.items()):
+            path = os.path.abspath(os.path.join(directory, self._area_filename(area_code, index)))
+            mapped = self._mapped.get((area_code, index))
+            if mapped and mapped[1] == path:
+                mapped[0].flush()
+                continue
+            logger.debug(f"saving area {area_code}, index {index} to {path}")
+            self.lock_area(area_code, index)
+            try:
+                content = bytes(data)
+            finally:
+                self.unlock_area(area_code, index)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(content)
+            os.replace(path + '.tmp', path)
+
+    def restore(self, directory):
+        """Registers all the areas saved in a directory by :func:`snapshot`.
+
+        The files are memory mapped, so restoring doesn't depend on the amount
+        of data and later changes are saved to the same files.
+
+        :param directory: the directory with the saved areas
+        :returns: a list of (area_code, index) tuples of the restored areas
+        """
+        restored = []
+        for filename in sorted(os.listdir(directory)):
+            match = re.match(r"^([A-Z]{2})_(\d+)\.bin$", filename)
+            if not match or match.group(1) not in snap7.types.server_areas:
+                continue
+            area_code = snap7.types.server_areas[match.group(1)]
+            index = int(match.group(2))
+            self.register_mapped_area(area_code, index, os.path.join(directory, filename))
+            restored.append((area_code, index))
+        logger.info(f"restored {len(restored)} areas from {directory}")
+        return restored
 
     @error_wrap
     def set_events_callback(self, call_back):
@@ -98,7 +223,6 @@ class Server:
             :param size:
             :returns: should return an int
             """
-            logger.info(f"callback event: {self.event_text(pevent.contents)}")
             call_back(pevent.contents)
             return 0
 
@@ -128,13 +252,161 @@ class Server:
             :param size:
             :returns: should return an int
             """
-            logger.info(f"callback event: {self.event_text(pevent.contents)}")
             call_back(pevent.contents)
             return 0
 
         self._read_callback = callback_wrapper(wrapper)
         return self.library.Srv_SetReadEventsCallback(self.pointer,
-                                                      self._read_callback)
+                                                      self._read_callback, None)
+
+    def set_read_hook(self, area_code, index, hook, ttl=0.0):
+        """Sets a function that computes the content of an area when it is read.
+
+        The hook is called as ``hook(start, size)`` with the requested byte
+        range just before the response is built, and has to return ``size``
+        bytes. These are stored in the registered area and sent to the client.
+        Reads of the same range within ttl seconds are served from the area
+        without calling the hook again.
+
+        Setting the first hook installs a read/write area callback, from then
+        on all client reads and writes are handled in Python, addressed as the
+        native server does. Areas without a hook are served from their
+        registered memory as before. Client writes to an area invalidate its
+        cached ranges. Removing the last hook uninstalls the callback.
+
+        :param area_code: server area code (e.g. snap7.types.srvAreaDB)
+        :param index: area index, the DB number for DB areas
+        :param hook: a callable accepting a start offset and a size in bytes
+        :param ttl: seconds a computed range stays valid
+        """
+        self.get_area(area_code, index)
+        logger.info(f"setting read hook for area {area_code} index {index} ttl {ttl}")
+        self._read_hooks[(area_code, index)] = (hook, ttl)
+        self._clear_read_hook_cache((area_code, index))
+        if self._rw_area_callback is None:
+            self._set_rw_area_callback()
+
+    def remove_read_hook(self, area_code, index):
+        """Removes the read hook of an area.
+        """
+        self._read_hooks.pop((area_code, index), None)
+        self._clear_read_hook_cache((area_code, index))
+        if not self._read_hooks and self._rw_area_callback is not None:
+            logger.info("removing read/write area callback")
+            self.library.Srv_SetRWAreaCallback(self.pointer, None, None)
+            self._rw_area_callback = None
+
+    def _clear_read_hook_cache(self, key):
+        with self._read_hook_lock:
+            for cached in [cached for cached in self._read_hook_cache if cached[0] == key]:
+                del self._read_hook_cache[cached]
+
+    def _find_area(self, tag):
+        """Returns the key of the registered area a tag refers to, or None.
+        """
+        if tag.Area == snap7.types.S7AreaDB:
+            key = (snap7.types.srvAreaDB, tag.DBNumber)
+            return key if key in self._areas else None
+        name = _area_names.get(tag.Area)
+        if name is None:
+            return None
+        area_code = snap7.types.server_areas[name]
+        # the server registers a single area of the other kinds and ignores
+        # the index of their tags, registering a second one fails
+        for key in self._areas:
+            if key[0] == area_code:
+                return key
+        return None
+
+    @error_wrap
+    def _set_rw_area_callback(self):
+        """Routes all the client reads and writes through _rw_area.
+        """
+        logger.info("setting read/write area callback")
+        callback_wrapper = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_int,
+                                            ctypes.POINTER(snap7.types.S7Tag), ctypes.c_void_p)
+
+        def wrapper(usrptr, sender, operation, ptag, pdata):
+            try:
+                return self._rw_area(operation, ptag.contents, pdata)
+            except Exception:
+                logger.exception("read/write area callback failed")
+                return snap7.types.evrErrException
+
+        self._rw_area_callback = callback_wrapper(wrapper)
+        return self.library.Srv_SetRWAreaCallback(self.pointer, self._rw_area_callback, None)
+
+    def _rw_area(self, operation, tag, pdata):
+        """Serves a client read or write from the registered areas.
+
+        :returns: 0 or a server event result code (evrErr*)
+        """
+        key = self._find_area(tag)
+        if key is None:
+            return snap7.types.evrErrAreaNotFound
+        data = self._areas[key]
+        is_bit = tag.WordLen == snap7.types.S7WLBit
+        if is_bit:
+            start, size = tag.Start // 8, 1
+        elif tag.WordLen in (snap7.types.S7WLCounter, snap7.types.S7WLTimer):
+            # the native server serves counter and timer n from byte n // 2
+            start, size = tag.Start // 2, tag.Size * 2
+        else:
+            start, size = tag.Start, tag.Size * _wordlen_sizes.get(tag.WordLen, 1)
+        if start < 0 or start + size > ctypes.sizeof(data):
+            return snap7.types.evrErrOutOfRange
+        address = ctypes.addressof(data) + start
+
+        if operation == snap7.types.OperationRead:
+            computed = self._call_read_hook(key, start, size)
+            self.library.Srv_LockArea(self.pointer, key[0], key[1])
+            try:
+                if computed is not None:
+                    ctypes.memmove(address, bytes(computed), size)
+                # for bits the server picks the bit from the whole byte
+                ctypes.memmove(pdata, address, size)
+            finally:
+                self.library.Srv_UnlockArea(self.pointer, key[0], key[1])
+        else:
+            self._clear_read_hook_cache(key)
+            self.library.Srv_LockArea(self.pointer, key[0], key[1])
+            try:
+                if is_bit:
+                    byte = ctypes.c_ubyte.from_address(address)
+                    if ctypes.c_ubyte.from_address(pdata).value:
+                        byte.value |= 1 << (tag.Start % 8)
+                    else:
+                        byte.value &= ~(1 << (tag.Start % 8)) & 0xff
+                else:
+                    ctypes.memmove(address, pdata, size)
+            finally:
+                self.library.Srv_UnlockArea(self.pointer, key[0], key[1])
+        return snap7.types.evrNoError
+
+    def _call_read_hook(self, key, start, size):
+        """Calls the read hook of an area unless the range is still cached.
+
+        :returns: the computed bytes, or None if the area should be served as is
+        """
+        read_hook = self._read_hooks.get(key)
+        if read_hook is None:
+            return None
+        hook, ttl = read_hook
+        now = time.monotonic()
+        with self._read_hook_lock:
+            expires = self._read_hook_cache.get((key, start, size))
+        if expires is not None and now < expires:
+            return None
+        computed = hook(start, size)
+        if len(computed) != size:
+            raise ValueError(f"read hook returned {len(computed)} bytes instead of {size}")
+        if ttl > 0:
+            with self._read_hook_lock:
+                # expired ranges are dropped, a client scanning offsets doesn't grow the cache
+                for cached in [cached for cached, expires in self._read_hook_cache.items() if expires <= now]:
+                    del self._read_hook_cache[cached]
+                self._read_hook_cache[(key, start, size)] = now + ttl
+        return computed
 
     def _set_log_callback(self):
         """Sets a callback that logs the events
@@ -142,7 +414,10 @@ class Server:
         logger.debug("setting up event logger")
 
         def log_callback(event):
-            logger.info(f"callback event: {self.event_text(event)}")
+            # the event text costs a buffer and a library call, only
+            # compute it when it will actually be logged
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"callback event: {self.event_text(event)}")
 
         self.set_events_callback(log_callback)
 
@@ -172,6 +447,8 @@ class Server:
         logger.info("destroying server")
         if self.library:
             self.library.Srv_Destroy(ctypes.byref(self.pointer))
+        for mapping, path in self._mapped.values():
+            mapping.flush()
 
     def get_status(self):
         """Reads the server status, the Virtual CPU status and the number of
@@ -199,6 +476,8 @@ class Server:
         """'Unshares' a memory area previously shared with Srv_RegisterArea().
         That memory block will be no longer visible by the clients.
         """
+        self._areas.pop((area_code, index), None)
+        self._mapped.pop((area_code, index), None)
         return self.library.Srv_UnregisterArea(self.pointer, area_code, index)
 
     @error_wrap
@@ -225,7 +504,7 @@ class Server:
             self.set_param(snap7.types.LocalPort, tcpport)
         assert re.match(ipv4, ip), f'{ip} is invalid ipv4'
         logger.info(f"starting server to {ip}:102")
-        return self.library.Srv_StartTo(self.pointer, ip)
+        return self.library.Srv_StartTo(self.pointer, ip.encode())
 
     @error_wrap
     def set_param(self, number, value):
@@ -260,10 +539,62 @@ class Server:
                                           ctypes.byref(ready))
         check_error(code)
         if ready:
-            logger.debug(f"one event ready: {event}")
+            logger.debug("one event ready: %s", event)
             return event
         logger.debug("no events ready")
 
+    def drain_events(self, max_n=64):
+        """Extracts up to max_n events from the Events queue.
+
+        The events are picked into a preallocated array, the returned events
+        share its memory and are overwritten by the next call. Copy an event
+        (e.g. with ``SrvEvent.from_buffer_copy(event)``) to keep it around.
+
+        :param max_n: maximum number of events to extract
+        :returns: a list of SrvEvent objects, empty if no events are ready
+        """
+        if self._events is None or len(self._events) < max_n:
+            self._events = (snap7.types.SrvEvent * max_n)()
+            event_size = ctypes.sizeof(snap7.types.SrvEvent)
+            self._event_refs = [ctypes.byref(self._events, i * event_size)
+                                for i in range(max_n)]
+        pick_event = self.library.Srv_PickEvent
+        pointer = self.pointer
+        refs = self._event_refs
+        ready = self._event_ready
+        ready_ref = ctypes.byref(ready)
+        count = 0
+        while count < max_n:
+            code = pick_event(pointer, refs[count], ready_ref)
+            if code:
+                check_error(code, context="server")
+            if not ready.value:
+                break
+            count += 1
+        return self._events[:count]
+
+    async def events(self, interval=0.1, max_n=64):
+        """Asynchronous iterator over the server events.
+
+        The Events queue is drained in batches, when it is empty the
+        iterator sleeps for interval seconds before polling again. The events
+        are copies, unlike the ones of :func:`drain_events` they stay valid.
+
+        example::
+
+            async for event in server.events():
+                print(server.event_text(event))
+
+        :param interval: seconds to wait when no events are ready
+        :param max_n: maximum number of events extracted per batch
+        """
+        while True:
+            events = self.drain_events(max_n)
+            for event in events:
+                yield snap7.types.SrvEvent.from_buffer_copy(event)
+            if len(events) < max_n:
+                await asyncio.sleep(interval)
+
     def get_param(self, number):
         """Reads an internal Server object parameter.
         """
@@ -304,10 +635,6 @@ def mainloop(tcpport: int = 1102):
     server.register_area(snap7.types.srvAreaCT, 1, CTdata)
     server.start(tcpport=tcpport)
     while True:
-        while True:
-            event = server.pick_event()
-            if event:
-                logger.info(server.event_text(event))
-            else:
-                break
+        for event in server.drain_events():
+            logger.info(server.event_text(event))
         time.sleep(1)
@@ -0,0 +1,175 @@
+"""
+Read and write statistics of a snap7 server.
+"""
+import logging
+import socket
+import struct
+import threading
+from array import array
+
+import snap7.types
+
+logger = logging.getLogger(__name__)
+
+# S7 area code to area name, e.g. 0x84 -> 'DB'
+area_names = {code: name for name, code in snap7.types.areas.items()}
+
+# layout of the counters of a single offset bucket
+READS, WRITES, READ_BYTES, WRITE_BYTES = range(4)
+_bucket_fields = ('reads', 'writes', 'read_bytes', 'write_bytes')
+
+
+class AccessStatistics:
+    """
+    Read and write statistics of a :class:`snap7.server.Server`.
+
+    The accesses are counted per area, per DB and per offset bucket. Every
+    area/DB pair uses a single flat array of unsigned counters, so the
+    memory used doesn't grow with the number of requests::
+
+        stats = snap7.server_stats.AccessStatistics(bucket_size=16)
+        stats.attach(server)
+        ...
+        stats.snapshot()['areas']['DB1']['buckets'][0]
+        {'offset': 0, 'reads': 12, 'writes': 1, 'read_bytes': 48, 'write_bytes': 4}
+
+    The requests are also counted per client, together with the number of
+    requests smaller than small_request bytes, to find clients that poll
+    with a lot of tiny requests.
+    """
+
+    def __init__(self, bucket_size=64, n_buckets=1024, small_request=4):
+        """
+        :param bucket_size: size in bytes of an offset bucket
+        :param n_buckets: number of buckets per area, accesses after the last
+            bucket are counted in the last bucket
+        :param small_request: requests up to this size in bytes are counted
+            as small requests
+        """
+        self.bucket_size = bucket_size
+        self.n_buckets = n_buckets
+        self.small_request = small_request
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all counters.
+        """
+        with self._lock:
+            self._areas = {}
+            # sender -> [requests, bytes, small requests, errors]
+            self._senders = {}
+
+    def attach(self, server):
+        """
+        Starts collecting the statistics of a server. This replaces the
+        events and read events callbacks of the server.
+        """
+        logger.info("attaching access statistics")
+        server.set_events_callback(self._on_event)
+        server.set_read_events_callback(self._on_read_event)
+
+    def _on_event(self, event):
+        code = event.EvtCode
+        if code == snap7.types.evcDataWrite:
+            self.record(event)
+        elif code == snap7.types.evcDataRead and event.EvtRetCode:
+            # successful reads are reported by the read events callback
+            self.record(event)
+
+    def _on_read_event(self, event):
+        self.record(event)
+
+    def record(self, event):
+        """
+        Counts a data read or write event (a snap7.types.SrvEvent).
+        """
+        is_write = event.EvtCode == snap7.types.evcDataWrite
+        failed = bool(event.EvtRetCode)
+        area, db, start, size = event.EvtParam1, event.EvtParam2, event.EvtParam3, event.EvtParam4
+        bucket = min(start // self.bucket_size, self.n_buckets - 1) * 4
+        with self._lock:
+            sender = self._senders.get(event.EvtSender)
+            if sender is None:
+                sender = self._senders[event.EvtSender] = array('Q', [0, 0, 0, 0])
+            sender[0] += 1
+            if failed:
+                sender[3] += 1
+                return
+            sender[1] += size
+            if size <= self.small_request:
+                sender[2] += 1
+
+            counters = self._areas.get((area, db))
+            if counters is None:
+                counters = self._areas[(area, db)] = array('Q', bytes(8 * 4 * self.n_buckets))
+            if is_write:
+                counters[bucket + WRITES] += 1
+                counters[bucket + WRITE_BYTES] += size
+            else:
+                counters[bucket + READS] += 1
+                counters[bucket + READ_BYTES] += size
+
+    @staticmethod
+    def _area_key(area, db):
+        name = area_names.get(area, hex(area))
+        return f"{name}{db}" if area == snap7.types.S7AreaDB else name
+
+    @staticmethod
+    def _sender_key(sender):
+        # EvtSender is the IPv4 address in network byte order
+        return socket.inet_ntoa(struct.pack('=I', sender))
+
+    def snapshot(self):
+        """
+        Returns a copy of the statistics as a dict of plain Python types.
+
+        :returns: a dict with an 'areas' entry, keyed by area name (e.g. 'MK'
+            or 'DB1'), and a 'senders' entry keyed by client address. Only
+            the buckets which have been accessed are included.
+        """
+        with self._lock:
+            areas = {key: counters[:] for key, counters in self._areas.items()}
+            senders = {key: counters[:] for key, counters in self._senders.items()}
+
+        result = {'areas': {}, 'senders': {}}
+        for (area, db), counters in areas.items():
+            buckets = []
+            totals = dict.fromkeys(_bucket_fields, 0)
+            for i in range(0, len(counters), 4):
+                if not (counters[i + READS] or counters[i + WRITES]):
+                    continue
+                bucket = {'offset': i // 4 * self.bucket_size}
+                for j, field in enumerate(_bucket_fields):
+                    bucket[field] = counters[i + j]
+                    totals[field] += counters[i + j]
+                buckets.append(bucket)
+            totals['buckets'] = buckets
+            result['areas'][self._area_key(area, db)] = totals
+        for sender, (requests, size, small, errors) in senders.items():
+            result['senders'][self._sender_key(sender)] = {
+                'requests': requests,
+                'bytes': size,
+                'small_requests': small,
+                'errors': errors,
+            }
+        return result
+
+    def hot_buckets(self, n=10):
+        """
+        Returns the n most accessed buckets over all areas.
+
+        :returns: a list of (area, offset, accesses) tuples, most accessed first
+        """
+        with self._lock:
+            areas = {key: counters[:] for key, counters in self._areas.items()}
+        hot = []
+        for (area, db), counters in areas.items():
+            key = self._area_key(area, db)
+            for i in range(0, len(counters), 4):
+                accesses = counters[i + READS] + counters[i + WRITES]
+                if accesses:
+                    hot.append((key, i // 4 * self.bucket_size, accesses))
+        hot.sort(key=lambda item: item[2], reverse=True)
+        return hot[:n]
@@ -0,0 +1,109 @@
+"""
+Latency histograms, shared by the statistics of the snap7 objects.
+"""
+import math
+from array import array
+
+
+class Histogram:
+    """
+    A latency histogram with a fixed number of logarithmic buckets.
+
+    The values are counted in microseconds. Every power of two is split in
+    sub_buckets linear buckets, so the relative error of a percentile is at
+    most 1 / sub_buckets, whatever the number of values recorded::
+
+        histogram = Histogram()
+        histogram.record(0.0021)
+        histogram.percentile(99)
+        0.0021...
+    """
+
+    def __init__(self, sub_buckets=8, max_value=60.0):
+        """
+        :param sub_buckets: buckets per power of two, a power of two itself
+        :param max_value: largest value in seconds, larger values are
+            counted in the last bucket
+        """
+        if sub_buckets < 1 or sub_buckets & (sub_buckets - 1):
+            raise ValueError(f"sub_buckets must be a power of two, not {sub_buckets}")
+        self.sub_buckets = sub_buckets
+        self._shift = sub_buckets.bit_length() - 1
+        self._n_buckets = self._index(int(max_value * 1e6)) + 1
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the histogram.
+        """
+        self._counts = array('Q', bytes(8 * self._n_buckets))
+        self.count = 0
+        self.max = 0
+
+    def _index(self, value):
+        if value < self.sub_buckets:
+            return value
+        exponent = value.bit_length() - 1 - self._shift
+        return (exponent + 1) * self.sub_buckets + (value >> exponent) - self.sub_buckets
+
+    def _upper_bound(self, index):
+        if index < self.sub_buckets:
+            return index
+        exponent = index // self.sub_buckets - 1
+        low = (self.sub_buckets + index % self.sub_buckets) << exponent
+        return low + (1 << exponent) - 1
+
+    def record(self, seconds):
+        """
+        Counts a value.
+
+        :param seconds: the value in seconds
+        """
+        value = max(int(seconds * 1e6), 0)
+        self._counts[min(self._index(value), self._n_buckets - 1)] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """
+        Returns the value in seconds below which p percent of the values are,
+        or None if the histogram is empty.
+
+        :param p: percentile, between 0 and 100
+        """
+        if not self.count:
+            return None
+        target = max(math.ceil(p / 100 * self.count), 1)
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                return min(self._upper_bound(index), self.max) / 1e6
+        return self.max / 1e6
+
+    def merge(self, other):
+        """
+        Adds the values counted by another histogram with the same layout.
+        """
+        if other.sub_buckets != self.sub_buckets or other._n_buckets != self._n_buckets:
+            raise ValueError("histograms with a different layout can't be merged")
+        for index, count in enumerate(other._counts):
+            if count:
+                self._counts[index] += count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def as_dict(self, percentiles=(50, 95, 99)):
+        """
+        Returns the count, the percentiles and the max value in milliseconds.
+
+        :param percentiles: the percentiles returned, with keys like p99 or
+            p99.9
+        """
+        result = {'count': self.count}
+        for p in percentiles:
+            value = self.percentile(p)
+            result[f'p{p}'] = None if value is None else value * 1e3
+        result['max'] = self.max / 1e3 if self.count else None
+        return result
@@ -0,0 +1,235 @@
+"""
+Parsing and caching of the system status list (SZL, SSL in English) of a PLC.
+
+The SZL is made of partial lists, identified by an ID and an index, which
+describe the module, its communication and its state. The records of the
+partial lists below are parsed into named tuples, the records of the other
+lists are returned as bytes:
+
+====== ===== ==============================
+ID     Index Record
+====== ===== ==============================
+0x0011 any   :class:`ModuleIdentification`
+0x0111 any   :class:`ModuleIdentification`
+0x001C any   :class:`ComponentIdentification`
+0x011C any   :class:`ComponentIdentification`
+0x0131 1     :class:`CommunicationCapabilities`
+0x0132 1     :class:`CommunicationStatus`
+0x0132 4     :class:`Protection`
+0x0222 1     :class:`CycleTime`
+====== ===== ==============================
+"""
+import ctypes
+import logging
+import struct
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+SZL = namedtuple('SZL', 'ssl_id index record_length count records')
+SZL.__doc__ = """
+A partial list read from the PLC. count is the number of records in the PLC,
+records is a list of named tuples for the known lists, of bytes for the
+others. The header only lists, e.g. 0x0F11, have a count but no records.
+"""
+
+
+class ModuleIdentification(namedtuple('ModuleIdentification', 'index order_code module_type ausbg ausbe')):
+    """
+    A record of the module identification, SZL 0x0011 and 0x0111.
+
+    index 1 identifies the module, 6 the basic hardware and 7 the basic
+    firmware.
+    """
+    __slots__ = ()
+
+    @property
+    def version(self):
+        """
+        The version as a string like V3.2.6, None if the record has no version.
+        """
+        if self.ausbg >> 8 != ord('V'):
+            return None
+        return f"V{self.ausbg & 0xFF}.{self.ausbe >> 8}.{self.ausbe & 0xFF}"
+
+
+ComponentIdentification = namedtuple('ComponentIdentification', 'index value')
+ComponentIdentification.__doc__ = """
+A record of the component identification, SZL 0x001C and 0x011C. value is a
+string for the text records, e.g. index 1 the automation system name, 2 the
+module name or 5 the serial number, bytes for the others.
+"""
+
+CommunicationCapabilities = namedtuple('CommunicationCapabilities',
+                                       'index max_pdu max_connections mpi_rate bus_rate')
+CommunicationCapabilities.__doc__ = """
+General communication capabilities, SZL 0x0131 index 1. The rates are in
+bits per second.
+"""
+
+CommunicationStatus = namedtuple('CommunicationStatus',
+                                 'index reserved_pg reserved_os pg_connections os_connections '
+                                 'configured_connections sfb_connections free_connections '
+                                 'used_free_connections max_communication_load')
+CommunicationStatus.__doc__ = """
+General communication status, SZL 0x0132 index 1. max_communication_load is
+the communication load of the CPU configured in percent of the cycle.
+"""
+
+Protection = namedtuple('Protection', 'index sch_schal sch_par sch_rel bart_sch anl_sch')
+Protection.__doc__ = """
+Protection level, SZL 0x0132 index 4, with the field names of S7Protection
+in the snap7 library. bart_sch is the position of the mode selector.
+"""
+
+CycleTime = namedtuple('CycleTime', 'previous minimum maximum')
+CycleTime.__doc__ = """
+Cycle times of OB1 in milliseconds, SZL 0x0222 index 1.
+"""
+
+# component identification records which are text
+_text_components = frozenset((1, 2, 3, 4, 5, 7, 8, 0x0B))
+
+
+def _text(data):
+    return data.rstrip(b'\x00 ').decode('latin-1')
+
+
+def _module_identification(record):
+    index, order_code, module_type, ausbg, ausbe = struct.unpack_from('>H20sHHH', record)
+    return ModuleIdentification(index, _text(order_code), module_type, ausbg, ausbe)
+
+
+def _component_identification(record):
+    index, = struct.unpack_from('>H', record)
+    value = record[2:34]
+    return ComponentIdentification(index, _text(value) if index in _text_components else value)
+
+
+def _communication_capabilities(record):
+    return CommunicationCapabilities(*struct.unpack_from('>HHHII', record))
+
+
+def _communication_status(record):
+    return CommunicationStatus(*struct.unpack_from('>10H', record))
+
+
+def _protection(record):
+    return Protection(*struct.unpack_from('>6H', record))
+
+
+def _cycle_time(record):
+    # start information of OB1: event class, scan, priority, OB number, 2 reserved bytes, cycle times
+    return CycleTime(*struct.unpack_from('>6xhhh', record))
+
+
+# (ssl_id, index or None for any index) -> (minimum record length, record parser)
+_parsers = {
+    (0x0011, None): (28, _module_identification),
+    (0x0111, None): (28, _module_identification),
+    (0x001C, None): (34, _component_identification),
+    (0x011C, None): (34, _component_identification),
+    (0x0131, 0x0001): (14, _communication_capabilities),
+    (0x0132, 0x0001): (20, _communication_status),
+    (0x0132, 0x0004): (12, _protection),
+    (0x0222, 0x0001): (12, _cycle_time),
+}
+
+
+def parse(ssl_id, index, data, size):
+    """
+    Parses a partial list read by the library.
+
+    :param ssl_id: ID of the partial list
+    :param index: index of the partial list
+    :param data: the :class:`snap7.types.S7SZL` filled by the library
+    :param size: bytes written in data by the library, header included
+    :returns: a :class:`SZL`
+    """
+    record_length = data.Header.LENTHDR
+    count = data.Header.N_DR
+    records = []
+    # the header only lists (0x0Fxx) have a count but no records
+    length = min(max(size - ctypes.sizeof(data.Header), 0), record_length * count)
+    if record_length:
+        raw = bytes(data.Data[:length - length % record_length])
+        records = [raw[i:i + record_length] for i in range(0, len(raw), record_length)]
+    minimum, parser = _parsers.get((ssl_id, index)) or _parsers.get((ssl_id, None), (None, None))
+    if parser is not None and records:
+        if record_length >= minimum:
+            records = [parser(record) for record in records]
+        else:
+            logger.warning("SZL 0x%04X records of %s bytes are too short to be parsed", ssl_id, record_length)
+    return SZL(ssl_id, index, record_length, count, records)
+
+
+class SZLCache:
+    """
+    Caches the partial lists read by a client for a time to live.
+
+    Diagnostics like the cycle time or the communication status are polled
+    by many dashboards, the cache makes sure the PLC only gets one request
+    per partial list and time to live::
+
+        cache = SZLCache(client, ttl=5)
+        cache.read(0x0222, 0x0001).records[0].maximum
+
+    The lists which identify the module don't change while the PLC runs,
+    they are kept an hour unless the ttls argument says otherwise. Errors
+    are not cached. The reads of the client are serialized by the cache, so
+    several threads can share it.
+    """
+
+    # partial lists which don't change while the PLC runs
+    static_ids = frozenset((0x0011, 0x0111, 0x001C, 0x011C, 0x0131))
+
+    def __init__(self, client, ttl=10.0, ttls=None):
+        """
+        :param client: a connected :class:`snap7.client.Client`
+        :param ttl: seconds a partial list is reused
+        :param ttls: dict of partial list ID to time to live, overrides ttl
+        """
+        self.client = client
+        self.ttl = ttl
+        self.ttls = {ssl_id: 3600.0 for ssl_id in self.static_ids}
+        self.ttls.update(ttls or {})
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (ssl_id, index) -> (expiry time, SZL)
+        self._entries = {}
+
+    def read(self, ssl_id, index=0x0000):
+        """
+        Returns a partial list, read from the PLC if it isn't cached or
+        expired.
+
+        :param ssl_id: ID of the partial list
+        :param index: index of the partial list
+        :returns: a :class:`SZL`
+        """
+        key = (ssl_id, index)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            szl = self.client.read_szl(ssl_id, index)
+            self._entries[key] = (time.monotonic() + self.ttls.get(ssl_id, self.ttl), szl)
+            return szl
+
+    def invalidate(self, ssl_id=None):
+        """
+        Forgets the cached partial lists.
+
+        :param ssl_id: only forget the lists with this ID, None for all
+        """
+        with self._lock:
+            if ssl_id is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == ssl_id]:
+                    del self._entries[key]
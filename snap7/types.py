@@ -95,6 +95,29 @@ server_areas = ADict({
     'DB': 5,
 })
 
+# Server events, the TCP events are listed in snap7.error.tcp_errors
+evcPDUincoming = 0x00010000
+evcDataRead = 0x00020000
+evcDataWrite = 0x00040000
+evcNegotiatePDU = 0x00080000
+evcReadSZL = 0x00100000
+evcClock = 0x00200000
+evcUpload = 0x00400000
+evcDownload = 0x00800000
+evcDirectory = 0x01000000
+evcSecurity = 0x02000000
+evcControl = 0x04000000
+
+# Server event results
+evrNoError = 0x0000
+evrErrException = 0x0006
+evrErrAreaNotFound = 0x0007
+evrErrOutOfRange = 0x0008
+
+# Server read/write area callback operations
+OperationRead = 0
+OperationWrite = 1
+
 wordlen_to_ctypes = ADict({
     S7WLBit: ctypes.c_int16,
     S7WLByte: ctypes.c_int8,
@@ -127,6 +150,16 @@ cpu_statuses = {
     8: 'S7CpuStatusRun',
 }
 
+partner_statuses = {
+    0: 'par_stopped',
+    1: 'par_connecting',
+    2: 'par_waiting',
+    3: 'par_linked',
+    4: 'par_sending',
+    5: 'par_receiving',
+    6: 'par_binderror',
+}
+
 
 class SrvEvent(ctypes.Structure):
     _fields_ = [
@@ -213,6 +246,20 @@ class S7DataItem(ctypes.Structure):
     ]
 
 
+class S7Tag(ctypes.Structure):
+    _fields_ = [
+        ('Area', ctypes.c_int32),
+        ('DBNumber', ctypes.c_int32),
+        ('Start', ctypes.c_int32),
+        ('Size', ctypes.c_int32),
+        ('WordLen', ctypes.c_int32),
+    ]
+
+    def __str__(self):
+        return f"<tag area: {hex(self.Area)} db: {self.DBNumber} start: {self.Start} " \
+               f"size: {self.Size} wordlen: {self.WordLen}>"
+
+
 class S7CpuInfo(ctypes.Structure):
     _fields_ = [
         ('ModuleTypeName', ctypes.c_char * 33),
@@ -221,3 +268,33 @@ class S7CpuInfo(ctypes.Structure):
         ('Copyright', ctypes.c_char * 27),
         ('ModuleName', ctypes.c_char * 25)
     ]
+
+
+class SZL_HEADER(ctypes.Structure):
+    """
+    Header of a partial list of the system status list, in host byte order.
+    """
+    _fields_ = [
+        ('LENTHDR', ctypes.c_uint16),
+        ('N_DR', ctypes.c_uint16)
+    ]
+
+
+class S7SZL(ctypes.Structure):
+    """
+    A partial list of the system status list, the records are big endian.
+    """
+    _fields_ = [
+        ('Header', SZL_HEADER),
+        ('Data', ctypes.c_ubyte * (0x4000 - 4))
+    ]
+
+
+class S7SZLList(ctypes.Structure):
+    """
+    The IDs of the partial lists of the system status list.
+    """
+    _fields_ = [
+        ('Header', SZL_HEADER),
+        ('List', ctypes.c_uint16 * (0x2000 - 2))
+    ]
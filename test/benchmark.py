@@ -0,0 +1,313 @@
+"""
+Benchmarks of python-snap7 against a server in this process.
+
+Run with ``python test/benchmark.py``, this is not part of the test suite.
+The results are printed as JSON, use ``--output`` to write them to a file
+and compare them between releases::
+
+    python test/benchmark.py --output benchmark-1.0.json
+"""
+import argparse
+import asyncio
+import ctypes
+import datetime
+import json
+import logging
+import platform
+import sys
+import time
+import timeit
+
+import snap7
+import snap7.client
+import snap7.client_async
+import snap7.server
+import snap7.types
+import snap7.util
+from snap7.stats import Histogram
+
+ip = '127.0.0.1'
+tcpport = 1104
+db_number = 1
+db_size = 32768
+
+payload_sizes = (1, 16, 128, 512, 1024, 4096, 16384)
+
+logger = logging.getLogger('benchmark')
+
+# a row of 60 bytes using most of the types known by DB_Row
+row_specification = """
+0       id          INT
+2.0     enabled     BOOL
+2.1     alarm       BOOL
+4       counter     DINT
+8       setpoint    REAL
+12      value       REAL
+16      status      WORD
+18      flags       DWORD
+22      small       SINT
+23      unsigned    USINT
+24      name        STRING[20]
+46      delay       S5TIME
+48      stamp       DATE_AND_TIME
+56      total       DINT
+"""
+row_size = 60
+
+# 2021-06-15 10:30:00 as DATE_AND_TIME
+date_and_time = bytearray([0x21, 0x06, 0x15, 0x10, 0x30, 0x00, 0x00, 0x02])
+
+
+def per_call(function, number):
+    """
+    Returns the mean duration of a call in microseconds, the best of three runs.
+    """
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1e6
+
+
+def latencies(function, number):
+    """
+    Calls a function number times and returns the latency distribution.
+
+    :returns: a dict with the calls per second and the count, p50, p95, p99
+        and max latency in milliseconds
+    """
+    histogram = Histogram()
+    started = time.perf_counter()
+    for _ in range(number):
+        call_started = time.perf_counter()
+        function()
+        histogram.record(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    result = histogram.as_dict()
+    result['calls_per_second'] = number / elapsed
+    return result
+
+
+def bench_logging(number=100000):
+    """
+    Cost of a debug message with the debug level disabled.
+    """
+    logger.setLevel(logging.INFO)
+    db, start, size, data = 1, 0, 4, bytearray(64)
+    return {
+        'f-string': per_call(lambda: logger.debug(f"db_write db_number:{db} start:{start} size:{size} data:{data}"),
+                             number),
+        'lazy': per_call(lambda: logger.debug("db_write db_number:%s start:%s size:%s", db, start, size), number),
+    }
+
+
+class _StubLibrary:
+    """
+    Stands in for the snap7 library, a call returns at once without error.
+    """
+
+    @staticmethod
+    def Cli_DBRead(pointer, db_number, start, size, data):
+        return 0
+
+
+def bench_trace_hook(number=100000):
+    """
+    Python side cost of a db_read in microseconds, without a trace hook, with
+    a sampled and with a full trace hook. The library is stubbed, the round
+    trip to a server would hide the differences.
+    """
+    client = snap7.client.Client()
+    library, client._library = client._library, _StubLibrary()
+
+    def read():
+        client.db_read(db_number, 0, 4)
+
+    try:
+        results = {'disabled': per_call(read, number)}
+        client.set_trace_hook(lambda event: None, sample_every=100)
+        results['sampled'] = per_call(read, number)
+        client.set_trace_hook(lambda event: None)
+        results['enabled'] = per_call(read, number)
+    finally:
+        client._library = library
+        client.destroy()
+    return results
+
+
+def bench_payloads(client, number=500, sizes=payload_sizes):
+    """
+    Latency and throughput of db_read and db_write per payload size.
+    """
+    results = {}
+    for size in sizes:
+        data = bytearray(size)
+        read = latencies(lambda: client.db_read(db_number, 0, size), number)
+        write = latencies(lambda: client.db_write(db_number, 0, data), number)
+        read['bytes_per_second'] = read['calls_per_second'] * size
+        write['bytes_per_second'] = write['calls_per_second'] * size
+        results[str(size)] = {'db_read': read, 'db_write': write}
+    return results
+
+
+def data_items(count, size):
+    """
+    Returns count S7DataItems of size bytes each, with their buffers.
+    """
+    items = (snap7.types.S7DataItem * count)()
+    buffers = []
+    for i, item in enumerate(items):
+        item.Area = snap7.types.S7AreaDB
+        item.WordLen = snap7.types.S7WLByte
+        item.DBNumber = db_number
+        item.Start = i * size
+        item.Amount = size
+        buffer = ctypes.create_string_buffer(size)
+        buffers.append(buffer)
+        item.pData = ctypes.cast(ctypes.pointer(buffer), ctypes.POINTER(ctypes.c_uint8))
+    return items, buffers
+
+
+def bench_multi_vars(client, number=500, count=20, size=4):
+    """
+    One read_multi_vars of count variables against count single db_reads.
+    """
+    # the library accepts at most 20 items per request
+    items, buffers = data_items(count, size)
+
+    def single():
+        for i in range(count):
+            client.db_read(db_number, i * size, size)
+
+    return {
+        'variables': count,
+        'read_multi_vars': latencies(lambda: client.read_multi_vars(items), number),
+        'db_read': latencies(single, number),
+    }
+
+
+def bench_async(client, async_client, number=500, size=128):
+    """
+    db_read of the synchronous client against as_db_read of the asyncio client.
+    """
+    async def read_async():
+        for _ in range(number):
+            await async_client.as_db_read(db_number, 0, size)
+
+    results = {'sync': latencies(lambda: client.db_read(db_number, 0, size), number)}
+    durations = []
+    for _ in range(3):
+        started = time.perf_counter()
+        asyncio.run(read_async())
+        durations.append(time.perf_counter() - started)
+    results['async'] = {'calls_per_second': number / min(durations)}
+    return results
+
+
+def bench_util(number=100000):
+    """
+    Decode and encode rates of the util codecs in calls per second.
+    """
+    data = bytearray(64)
+    snap7.util.set_string(data, 20, 'benchmark', 20)
+    data[44:52] = date_and_time
+    codecs = {
+        'get_bool': lambda: snap7.util.get_bool(data, 0, 3),
+        'set_bool': lambda: snap7.util.set_bool(data, 0, 3, True),
+        'get_int': lambda: snap7.util.get_int(data, 2),
+        'set_int': lambda: snap7.util.set_int(data, 2, -1234),
+        'get_word': lambda: snap7.util.get_word(data, 2),
+        'get_dint': lambda: snap7.util.get_dint(data, 4),
+        'set_dint': lambda: snap7.util.set_dint(data, 4, -123456),
+        'get_dword': lambda: snap7.util.get_dword(data, 4),
+        'get_real': lambda: snap7.util.get_real(data, 8),
+        'set_real': lambda: snap7.util.set_real(data, 8, 3.14),
+        'get_string': lambda: snap7.util.get_string(data, 20, 20),
+        'set_string': lambda: snap7.util.set_string(data, 20, 'benchmark', 20),
+        'get_dt': lambda: snap7.util.get_dt(data, 44),
+    }
+    return {name: 1e6 / per_call(codec, number) for name, codec in codecs.items()}
+
+
+def bench_db(rows=(10, 100, 1000), number=5):
+    """
+    Construction time of DB objects in milliseconds and the time to export
+    all rows, for layouts with a growing number of rows.
+    """
+    results = {}
+    for count in rows:
+        data = bytearray(count * row_size)
+        for i in range(count):
+            snap7.util.set_int(data, i * row_size, i + 1)
+            data[i * row_size + 48:i * row_size + 56] = date_and_time
+        db = snap7.util.DB(db_number, data, row_specification, row_size, count, id_field='id')
+        results[str(count)] = {
+            'construct': per_call(lambda: snap7.util.DB(db_number, data, row_specification, row_size, count,
+                                                        id_field='id'), number) / 1e3,
+            'export': per_call(lambda: [row.export() for _, row in db], number) / 1e3,
+        }
+    return results
+
+
+def environment():
+    """
+    Describes where the benchmarks ran.
+    """
+    return {
+        'version': snap7.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def run(quick=False):
+    """
+    Runs all benchmarks against a server started in this process.
+
+    :param quick: run every benchmark a few times only, to check it works
+    :returns: a dict with the environment and the results of every benchmark
+    """
+    number = 10 if quick else 500
+    server = snap7.server.Server(log=False)
+    db = (ctypes.c_ubyte * db_size)()
+    server.register_area(snap7.types.srvAreaDB, db_number, db)
+    server.start(tcpport=tcpport)
+    client = snap7.client.Client()
+    client.connect(ip, 0, 1, tcpport)
+    async_client = snap7.client_async.ClientAsync()
+    async_client.set_as_check_mode(1)
+    async_client.connect(ip, 0, 1, tcpport)
+    try:
+        results = {
+            'db_read_write': bench_payloads(client, number),
+            'read_multi_vars': bench_multi_vars(client, number),
+            'async': bench_async(client, async_client, number),
+            'util': bench_util(number * 20),
+            'db': bench_db(number=1 if quick else 5),
+            'logging': bench_logging(number * 20),
+            'trace_hook': bench_trace_hook(number * 20),
+        }
+    finally:
+        async_client.disconnect()
+        async_client.destroy()
+        client.disconnect()
+        client.destroy()
+        server.stop()
+        server.destroy()
+    return {'environment': environment(), 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--output', help="write the results to this file instead of stdout")
+    parser.add_argument('--quick', action='store_true', help="only check that the benchmarks run")
+    args = parser.parse_args(argv)
+    report = json.dumps(run(args.quick), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        sys.stdout.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import zipfile
+
+import snap7.backup
+import snap7.types
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+
+class FakePLC:
+    """
+    The blocks of a PLC, shared by its FakeClients. The snap7 server doesn't
+    allow uploads or downloads.
+    """
+
+    def __init__(self, blocks):
+        # (block type, number) -> (checksum, data)
+        self.blocks = dict(blocks)
+        self.uploads = []
+        self.downloads = []
+        self.lock = threading.Lock()
+
+
+class FakeClient:
+
+    def __init__(self, plc):
+        self.plc = plc
+
+    def list_blocks_of_type(self, blocktype):
+        return sorted(number for block_type, number in self.plc.blocks if block_type == blocktype)
+
+    def get_block_info(self, blocktype, number):
+        info = snap7.types.TS7BlockInfo()
+        info.BlkNumber = number
+        info.CheckSum = self.plc.blocks[(blocktype, number)][0]
+        info.CodeDate = b'2021/06/15'
+        return info
+
+    def full_upload(self, _type, block_num):
+        with self.plc.lock:
+            self.plc.uploads.append((_type, block_num))
+        data = self.plc.blocks[(_type, block_num)][1]
+        return bytearray(data), len(data)
+
+    def download(self, data, block_num=-1):
+        with self.plc.lock:
+            self.plc.downloads.append((block_num, bytes(data)))
+
+
+class TestBackup(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'plc.zip')
+        self.plc = FakePLC({
+            ('DB', 1): (0x1111, b'db1' * 100),
+            ('DB', 2): (0x2222, b'db2' * 100),
+            ('FC', 5): (0x5555, b'fc5'),
+            ('OB', 1): (0x0001, b'ob1'),
+        })
+        self.clients = [FakeClient(self.plc), FakeClient(self.plc)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_backup(self):
+        manifest = snap7.backup.backup(self.clients, self.path)
+        self.assertEqual((manifest['uploaded'], manifest['reused']), (3, 0))
+        self.assertEqual([block['file'] for block in manifest['blocks']], ['DB1.mc7', 'DB2.mc7', 'FC5.mc7'])
+        self.assertEqual(manifest['blocks'][2]['checksum'], 0x5555)
+        self.assertEqual(manifest['blocks'][2]['code_date'], '2021/06/15')
+        self.assertEqual(snap7.backup.read_manifest(self.path), manifest)
+        with zipfile.ZipFile(self.path) as archive:
+            self.assertEqual(archive.read('DB2.mc7'), b'db2' * 100)
+        self.assertEqual(snap7.backup.verify(self.path), [])
+        self.assertEqual(os.listdir(self.directory), ['plc.zip'])
+
+    def test_unchanged(self):
+        snap7.backup.backup(self.clients, self.path)
+        self.plc.uploads.clear()
+        self.plc.blocks[('DB', 2)] = (0x2223, b'new')
+        manifest = snap7.backup.backup(self.clients, self.path, previous=self.path)
+        self.assertEqual(self.plc.uploads, [('DB', 2)])
+        self.assertEqual((manifest['uploaded'], manifest['reused']), (1, 2))
+        with zipfile.ZipFile(self.path) as archive:
+            self.assertEqual(archive.read('DB1.mc7'), b'db1' * 100)
+            self.assertEqual(archive.read('DB2.mc7'), b'new')
+
+    def test_corrupt_previous(self):
+        previous = os.path.join(self.directory, 'previous.zip')
+        snap7.backup.backup(self.clients[0], previous, block_types=('FC',))
+        manifest = snap7.backup.read_manifest(previous)
+        manifest['blocks'][0]['sha256'] = '0' * 64
+        with zipfile.ZipFile(previous, 'w') as archive:
+            archive.writestr('FC5.mc7', b'fc5')
+            archive.writestr('manifest.json', snap7.backup.json.dumps(manifest))
+        self.assertEqual(snap7.backup.verify(previous), ['FC5.mc7'])
+        self.plc.uploads.clear()
+        snap7.backup.backup(self.clients[0], self.path, previous=previous, block_types=('FC',))
+        self.assertEqual(self.plc.uploads, [('FC', 5)])
+
+    def test_failed_backup(self):
+        snap7.backup.backup(self.clients, self.path)
+
+        def fail(*args):
+            raise Snap7Exception("CPU : Function not authorized for current protection level")
+
+        self.clients[0].full_upload = self.clients[1].full_upload = fail
+        self.plc.blocks[('DB', 2)] = (0x2223, b'new')
+        self.assertRaises(Snap7Exception, snap7.backup.backup, self.clients, self.path, previous=self.path)
+        # the previous archive is kept
+        self.assertEqual(snap7.backup.read_manifest(self.path)['blocks'][1]['checksum'], 0x2222)
+        self.assertEqual(os.listdir(self.directory), ['plc.zip'])
+
+    def test_restore(self):
+        snap7.backup.backup(self.clients, self.path)
+        restored = snap7.backup.restore(self.clients, self.path)
+        self.assertEqual(restored, [('DB', 1), ('DB', 2), ('FC', 5)])
+        self.assertEqual(sorted(self.plc.downloads), [(1, b'db1' * 100), (2, b'db2' * 100), (5, b'fc5')])
+        self.plc.downloads.clear()
+        self.assertEqual(snap7.backup.restore(self.clients[0], self.path, block_types=('FC',)), [('FC', 5)])
+
+    def test_restore_corrupt(self):
+        snap7.backup.backup(self.clients, self.path)
+        manifest = snap7.backup.read_manifest(self.path)
+        with zipfile.ZipFile(self.path, 'w') as archive:
+            archive.writestr('DB1.mc7', b'db1' * 100)
+            archive.writestr('DB2.mc7', b'changed')
+            archive.writestr('FC5.mc7', b'fc5')
+            archive.writestr('manifest.json', snap7.backup.json.dumps(manifest))
+        self.assertRaises(ValueError, snap7.backup.restore, self.clients, self.path)
+        self.assertEqual(self.plc.downloads, [])
+
+    def test_restore_rejected(self):
+        snap7.backup.backup(self.clients, self.path)
+
+        def reject(data, block_num=-1):
+            raise Snap7Exception("CPU : Download sequence failed")
+
+        self.clients[0].download = self.clients[1].download = reject
+        self.assertRaises(Snap7Exception, snap7.backup.restore, self.clients, self.path)
+
+    def test_backup_many(self):
+        other = FakePLC({('DB', 9): (9, b'db9')})
+        other_path = os.path.join(self.directory, 'other.zip')
+        failing = FakeClient(None)
+        results = snap7.backup.backup_many([
+            {'clients': self.clients, 'path': self.path},
+            {'clients': FakeClient(other), 'path': other_path},
+            {'clients': failing, 'path': os.path.join(self.directory, 'failing.zip')},
+        ])
+        self.assertEqual(len(results[0]['blocks']), 3)
+        self.assertEqual(results[1]['blocks'][0]['file'], 'DB9.mc7')
+        self.assertIsInstance(results[2], AttributeError)
+        self.assertEqual(snap7.backup.backup_many([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
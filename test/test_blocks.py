@@ -0,0 +1,96 @@
+import ctypes
+import logging
+import unittest
+
+import snap7.blocks
+import snap7.client
+import snap7.server
+import snap7.types
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1109
+
+
+class TestBlockCache(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = []
+        self.clients = []
+        self.client = self.connect(tcpport, (1, 3))
+        self.server = self.servers[0]
+        self.cache = snap7.blocks.BlockCache(self.client)
+
+    def tearDown(self):
+        for client in self.clients:
+            client.disconnect()
+            client.destroy()
+        for server in self.servers:
+            server.stop()
+            server.destroy()
+
+    def connect(self, port, db_numbers):
+        server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * 16)()
+        for db_number in db_numbers:
+            server.register_area(snap7.types.srvAreaDB, db_number, self.db)
+        server.start(tcpport=port)
+        self.servers.append(server)
+        client = snap7.client.Client()
+        client.connect(ip, 0, 1, port)
+        self.clients.append(client)
+        return client
+
+    def test_refresh(self):
+        changes = self.cache.refresh()
+        self.assertEqual(changes, {'added': [('DB', 1), ('DB', 3)], 'changed': [], 'removed': []})
+        self.assertEqual(self.cache.infos()[('DB', 3)].BlkNumber, 3)
+        self.assertEqual(self.cache.reads, 2)
+        self.assertEqual(self.cache.refresh(), {'added': [], 'changed': [], 'removed': []})
+        self.assertEqual(self.cache.reads, 2)
+
+        self.server.register_area(snap7.types.srvAreaDB, 5, self.db)
+        self.server.unregister_area(snap7.types.srvAreaDB, 3)
+        changes = self.cache.refresh()
+        self.assertEqual(changes, {'added': [('DB', 5)], 'changed': [], 'removed': [('DB', 3)]})
+        self.assertEqual(list(self.cache.infos()), [('DB', 1), ('DB', 5)])
+        self.assertEqual(self.cache.reads, 3)
+
+    def test_changed(self):
+        self.cache.refresh()
+        self.cache.infos()[('DB', 1)].CheckSum = 0x1234
+        self.cache.max_age = 0
+        changes = self.cache.refresh()
+        self.assertEqual(changes['changed'], [('DB', 1)])
+        self.assertEqual(self.cache.reads, 4)
+
+    def test_get_block_info(self):
+        info = self.cache.get_block_info('DB', 1)
+        self.assertIs(self.cache.get_block_info('DB', 1), info)
+        self.assertEqual(self.cache.reads, 1)
+        self.cache.invalidate('DB', 1)
+        self.assertIsNot(self.cache.get_block_info('DB', 1), info)
+        self.assertRaises(Snap7Exception, self.cache.get_block_info, 'DB', 2)
+
+    def test_invalidate(self):
+        self.cache.refresh()
+        self.cache.invalidate('DB')
+        self.assertEqual(self.cache.infos(), {})
+        self.assertEqual(self.cache.refresh()['added'], [('DB', 1), ('DB', 3)])
+
+    def test_get_all_block_info(self):
+        other = self.connect(tcpport + 1, (7,))
+        disconnected = snap7.client.Client()
+        self.clients.append(disconnected)
+        caches = [self.cache, snap7.blocks.BlockCache(other), snap7.blocks.BlockCache(disconnected)]
+        first, second, failed = snap7.blocks.get_all_block_info(caches)
+        self.assertEqual(list(first), [('DB', 1), ('DB', 3)])
+        self.assertEqual(list(second), [('DB', 7)])
+        self.assertIsInstance(failed, Snap7Exception)
+        self.assertEqual(snap7.blocks.get_all_block_info([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -53,6 +53,29 @@ class TestClient(unittest.TestCase):
         result = self.client.db_read(db_number=db, start=start, size=size)
         self.assertEqual(data, result)
 
+    def test_trace_hook(self):
+        events = []
+        self.client.set_trace_hook(events.append)
+        self.client.db_write(db_number=1, start=2, data=bytearray(4))
+        self.client.db_read(db_number=1, start=2, size=4)
+        self.assertRaises(Snap7Exception, self.client.read_area, S7AreaDB, 1000, 0, 4)
+        self.client.set_trace_hook(None)
+        self.client.db_read(db_number=1, start=2, size=4)
+
+        self.assertEqual([event['operation'] for event in events], ['db_write', 'db_read', 'read_area'])
+        self.assertEqual(events[1]['area'], S7AreaDB)
+        self.assertEqual((events[1]['db_number'], events[1]['start'], events[1]['size']), (1, 2, 4))
+        self.assertEqual(events[1]['result'], 0)
+        self.assertGreater(events[1]['duration'], 0)
+        self.assertNotEqual(events[2]['result'], 0)
+
+    def test_trace_hook_sampled(self):
+        events = []
+        self.client.set_trace_hook(events.append, sample_every=3)
+        for _ in range(7):
+            self.client.db_read(db_number=1, start=0, size=1)
+        self.assertEqual(len(events), 2)
+
     def test_db_write(self):
         size = 40
         data = bytearray(size)
@@ -184,7 +207,11 @@ class TestClient(unittest.TestCase):
         blockList = self.client.list_blocks()
 
     def test_list_blocks_of_type(self):
-        self.client.list_blocks_of_type('DB', 10)
+        blocks = self.client.list_blocks_of_type('DB')
+        self.assertIsInstance(blocks, list)
+        self.assertEqual(len(blocks), self.client.list_blocks().DBCount)
+        self.assertEqual(self.client.list_blocks_of_type('DB', 1), blocks[:1])
+        self.assertEqual(self.client.list_blocks_of_type('DB', 0), [])
 
         self.assertRaises(Exception, self.client.list_blocks_of_type,
                           'NOblocktype', 10)
@@ -358,6 +385,20 @@ class TestClient(unittest.TestCase):
         for param, value in expected:
             self.assertEqual(getattr(cpuInfo, param).decode('utf-8'), value)
 
+    def test_read_szl(self):
+        szl = self.client.read_szl(0x0011, 0x0000)
+        self.assertEqual(szl.record_length, 28)
+        self.assertEqual(szl.records[0].order_code, '6ES7 315-2EH14-0AB0')
+        self.assertEqual(szl.records[2].version, 'V3.2.6')
+        cycle_time = self.client.read_szl(0x0222, 0x0001).records[0]
+        self.assertLessEqual(cycle_time.minimum, cycle_time.maximum)
+        self.assertIsInstance(self.client.read_szl(0x0037).records[0], bytes)
+
+    def test_read_szl_list(self):
+        ids = self.client.read_szl_list()
+        self.assertIn(0x0011, ids)
+        self.assertIn(0x0132, ids)
+
     def test_db_write_with_byte_literal_does_not_throw(self):
         mock_write = mock.MagicMock()
         mock_write.return_value = None
@@ -509,16 +550,6 @@ class TestClient(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             self.client.asreadarea()
 
-    def test_asreadszl(self):
-        # Cli_AsReadSZL
-        with self.assertRaises(NotImplementedError):
-            self.client.asreadszl()
-
-    def test_asreadszllist(self):
-        # Cli_AsReadSZLList
-        with self.assertRaises(NotImplementedError):
-            self.client.asreadszllist()
-
     def test_astmread(self):
         # Cli_AsTMRead
         with self.assertRaises(NotImplementedError):
@@ -589,10 +620,9 @@ class TestClient(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             self.client.getcpinfo()
 
-    def test_getexectime(self):
-        # Cli_GetExecTime
-        with self.assertRaises(NotImplementedError):
-            self.client.getexectime()
+    def test_get_exec_time(self):
+        self.client.db_read(db_number=1, start=0, size=4)
+        self.assertGreaterEqual(self.client.get_exec_time(), 0)
 
     def test_getlasterror(self):
         # Cli_GetLastError
@@ -649,16 +679,6 @@ class TestClient(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             self.client.readmultivars()
 
-    def test_readszl(self):
-        # Cli_ReadSZL
-        with self.assertRaises(NotImplementedError):
-            self.client.readszl()
-
-    def test_readszllist(self):
-        # Cli_ReadSZLList
-        with self.assertRaises(NotImplementedError):
-            self.client.readszllist()
-
     def test_setascallback(self):
         # Cli_SetAsCallback
         with self.assertRaises(NotImplementedError):
@@ -722,6 +742,11 @@ class TestClientBeforeConnect(unittest.TestCase):
         for param, value in values:
             self.client.set_param(param, value)
 
+    def test_prototypes(self):
+        self.assertEqual(len(self.client._library.Cli_DBRead.argtypes), 5)
+        # arguments are checked by ctypes, instead of being passed as is
+        self.assertRaises(ctypes.ArgumentError, self.client.db_read, "1", 0, 4)
+
 
 class TestLibraryIntegration(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,60 @@
+import logging
+import unittest
+from unittest import mock
+
+import snap7.common
+from snap7.exceptions import (Snap7Exception, AccessException, AddressException, ConnectionException,
+                              TimeoutException)
+
+logging.basicConfig(level=logging.WARNING)
+
+
+class TestCheckError(unittest.TestCase):
+
+    def test_no_error(self):
+        snap7.common.check_error(0)
+
+    def test_exception_types(self):
+        expected = (
+            (0x02000000, "client", TimeoutException),
+            (0x00900000, "client", AddressException),
+            (0x01D00000, "client", AccessException),
+            (0x000A0000, "client", ConnectionException),
+            # errIsoConnect combined with a socket error
+            (0x0001006F, "client", ConnectionException),
+            (0x00300000, "client", Snap7Exception),
+            (0x00400000, "server", AddressException),
+            (0x00400000, "client", Snap7Exception),
+        )
+        for code, context, exception in expected:
+            with self.assertRaises(Snap7Exception) as cm:
+                snap7.common.check_error(code, context=context)
+            self.assertIs(type(cm.exception), exception)
+            self.assertEqual(cm.exception.code, code)
+            self.assertEqual(cm.exception.context, context)
+
+    def test_error_text_cached(self):
+        snap7.common.error_text.cache_clear()
+        library = snap7.common.load_library()
+        with mock.patch.object(library, 'Cli_ErrorText', wraps=library.Cli_ErrorText) as error_text:
+            for _ in range(3):
+                text = snap7.common.error_text(0x02000000)
+        self.assertEqual(text, b'CLI : Job Timeout')
+        error_text.assert_called_once()
+
+    def test_log_rate_limited(self):
+        with mock.patch.object(snap7.common, 'error_log_interval', 60), \
+                mock.patch.object(snap7.common, '_error_log', {}):
+            with self.assertLogs('snap7.common', level='ERROR') as cm:
+                for _ in range(5):
+                    self.assertRaises(Snap7Exception, snap7.common.check_error, 0x02200000)
+            self.assertEqual(len(cm.output), 1)
+            # the next message tells how many errors were not logged
+            snap7.common._error_log[(0x02200000, "client")][0] -= 60
+            with self.assertLogs('snap7.common', level='ERROR') as cm:
+                self.assertRaises(Snap7Exception, snap7.common.check_error, 0x02200000)
+            self.assertIn("occurred 4 more times", cm.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
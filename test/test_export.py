@@ -0,0 +1,190 @@
+import ctypes
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import snap7.client
+import snap7.export
+import snap7.server
+import snap7.types
+import snap7.util
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1111
+
+layout = """
+0       id          INT
+2.0     running     BOOL
+2.1     fault       BOOL
+4       speed       REAL
+8       count       DWORD
+12      name        STRING[6]
+20      changed     DATE_AND_TIME
+28      delay       S5TIME
+"""
+
+row_size = 30
+
+
+def make_row(number):
+    row = bytearray(row_size)
+    snap7.util.set_int(row, 0, number)
+    snap7.util.set_bool(row, 2, 1, number % 2)
+    snap7.util.set_real(row, 4, number * 1.5)
+    snap7.util.set_dword(row, 8, 100000 + number)
+    row[12] = 6
+    snap7.util.set_string(row, 12, f'm{number}', 6)
+    # 2021-06-15 12:30:45.123, a tuesday
+    row[20:28] = bytes([0x21, 0x06, 0x15, 0x12, 0x30, 0x45, 0x12, 0x33])
+    # 2 x 10 s
+    row[28:30] = bytes([0x30, 0x02])
+    return row
+
+
+class TestRowLayout(unittest.TestCase):
+
+    def test_decode(self):
+        row_layout = snap7.export.RowLayout(layout, row_size=32)
+        self.assertEqual(row_layout.names, ['id', 'running', 'fault', 'speed', 'count', 'name', 'changed', 'delay'])
+        data = make_row(1) + bytearray(2) + make_row(2) + bytearray(2)
+        first, second = row_layout.decode(data, rows=2)
+        changed = (datetime.datetime(2021, 6, 15, 12, 30, 45, 123000) - datetime.datetime(1970, 1, 1))
+        self.assertEqual(first, (1, False, True, 1.5, 100001, b'm1', changed // datetime.timedelta(milliseconds=1), 20000))
+        self.assertEqual(second[:3], (2, False, False))
+
+    def test_matches_db_row(self):
+        row_layout = snap7.export.RowLayout(layout)
+        data = make_row(7)
+        row = snap7.util.DB_Row(data, layout)
+        for name, value in zip(row_layout.names, row_layout.decode(data)[0]):
+            if name == 'name':
+                value = value.decode()
+            if name not in ('changed', 'delay'):
+                self.assertEqual(value, row[name])
+
+    def test_invalid(self):
+        row_layout = snap7.export.RowLayout(layout)
+        self.assertEqual(row_layout.decode(bytearray(row_size))[0][6:], (snap7.export.nat, 0))
+        self.assertRaises(ValueError, row_layout.decode, bytearray(row_size), rows=2)
+        self.assertRaises(ValueError, snap7.export.RowLayout, layout, row_size=20)
+        self.assertRaises(ValueError, snap7.export.RowLayout, "0 a INT\n1 b INT")
+        self.assertRaises(ValueError, snap7.export.RowLayout, "0 a TIME")
+
+
+class TestNpyRing(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.prefix = os.path.join(self.directory, 'values')
+        self.descr = [('timestamp', '<f8'), ('value', '<i2'), ('name', '|S3')]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ring(self):
+        ring = snap7.export.NpyRing(self.prefix, self.descr, 'dh3s', chunk_rows=4, chunks=2, batch_rows=3)
+        ring.append([(0.5, 1, b'a'), (1.5, 2, b'bc')])
+        self.assertEqual(ring.files(), [])
+        ring.append([(2.5, 3, b'def')])
+        self.assertEqual(ring.files(), [f'{self.prefix}.000000.npy'])
+        self.assertEqual(snap7.export.read_npy(ring.files()[0]),
+                         (self.descr, [(0.5, 1, b'a\x00\x00'), (1.5, 2, b'bc\x00'), (2.5, 3, b'def')]))
+        ring.append([(float(i), i, b'') for i in range(4, 12)])
+        ring.close()
+        files = ring.files()
+        self.assertEqual([os.path.basename(f) for f in files], ['values.000001.npy', 'values.000002.npy'])
+        self.assertEqual([record[1] for record in snap7.export.read_npy(files[-1])[1]], [9, 10, 11])
+        self.assertEqual(ring.rows_written, 11)
+        # a new ring continues after the existing files
+        ring = snap7.export.NpyRing(self.prefix, self.descr, 'dh3s')
+        ring.append([(0.0, 0, b'')])
+        ring.close()
+        self.assertEqual(os.path.basename(ring.files()[-1]), 'values.000003.npy')
+
+    def test_header(self):
+        for rows in (0, 1, 1000):
+            header = snap7.export._header(self.descr, rows, 118)
+            self.assertEqual(len(header), 128)
+        self.assertEqual(len(snap7.export._header([(f'f{i}', '<i2') for i in range(10000)], 1)) % 64, 0)
+
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    def test_numpy(self):
+        ring = snap7.export.NpyRing(self.prefix, self.descr, 'dh3s', batch_rows=1)
+        ring.append([(0.5, -1, b'abc')])
+        ring.append([(1.5, 2, b'x')])
+        values = numpy.load(ring.files()[0])
+        self.assertEqual(values.dtype, numpy.dtype(self.descr))
+        self.assertEqual(values['value'].tolist(), [-1, 2])
+        self.assertEqual(values['name'].tolist(), [b'abc', b'x'])
+        ring.close()
+
+
+class TestDBExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * (row_size * 4))()
+        for number in range(4):
+            self.db[number * row_size:(number + 1) * row_size] = make_row(number)
+        self.server.register_area(snap7.types.srvAreaDB, 1, self.db)
+        self.server.start(tcpport=tcpport)
+        self.client = snap7.client.Client()
+        self.client.connect(ip, 0, 1, tcpport)
+        self.exporter = snap7.export.DBExporter(self.client, self.directory, interval=0.01, batch_rows=8)
+
+    def tearDown(self):
+        self.exporter.close()
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+        shutil.rmtree(self.directory)
+
+    def test_poll(self):
+        self.exporter.add(1, layout, size=4, name='motors')
+        self.exporter.add(1, layout, db_offset=row_size * 3)
+        self.exporter.add(2, layout)
+        self.exporter.poll(timestamp=10.0)
+        self.exporter.poll(timestamp=10.1)
+        self.exporter.flush()
+        descr, records = snap7.export.read_npy(os.path.join(self.directory, 'motors.000000.npy'))
+        self.assertEqual([name for name, _ in descr[:3]], ['timestamp', 'row', 'id'])
+        self.assertEqual([record[:3] for record in records[:5]],
+                         [(10.0, 0, 0), (10.0, 1, 1), (10.0, 2, 2), (10.0, 3, 3), (10.1, 0, 0)])
+        descr, records = snap7.export.read_npy(os.path.join(self.directory, 'db1.000000.npy'))
+        self.assertEqual([record[:3] for record in records], [(10.0, 0, 3), (10.1, 0, 3)])
+        status = self.exporter.status()
+        self.assertEqual(status['samples'], 2)
+        self.assertEqual(status['exports']['motors'], {'samples': 2, 'errors': 0, 'rows_written': 8})
+        self.assertEqual(status['exports']['db2']['errors'], 2)
+        self.assertRaises(ValueError, self.exporter.add, 1, layout, name='motors')
+        self.exporter.remove('db2')
+        self.assertEqual(list(self.exporter.status()['exports']), ['motors', 'db1'])
+
+    def test_thread(self):
+        self.exporter.add(1, layout, size=4)
+        self.exporter.start()
+        time.sleep(0.2)
+        self.exporter.stop()
+        samples = self.exporter.status()['exports']['db1']['samples']
+        self.assertGreater(samples, 5)
+        descr, records = snap7.export.read_npy(os.path.join(self.directory, 'db1.000000.npy'))
+        self.assertEqual(len(records), samples * 4)
+        timestamps = [record[0] for record in records[::4]]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+
+if __name__ == '__main__':
+    unittest.main()
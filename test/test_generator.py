@@ -0,0 +1,89 @@
+import ctypes
+import logging
+import time
+import unittest
+
+import snap7.generator
+import snap7.server
+import snap7.types
+from snap7 import util
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+layout = """
+0       temperature     REAL
+4.0     running         BOOL
+4.1     alarm           BOOL
+6       count           INT
+8       small           USINT
+10      name            STRING[4]
+"""
+
+
+class TestDataGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.data = (ctypes.c_ubyte * 16)()
+        self.server.register_area(snap7.types.srvAreaDB, 1, self.data)
+        self.generator = snap7.generator.DataGenerator(self.server, interval=0.01)
+
+    def tearDown(self):
+        self.generator.stop()
+        self.server.destroy()
+
+    def test_tick(self):
+        self.generator.add_area(snap7.types.srvAreaDB, 1, layout, signals={
+            'temperature': snap7.generator.Ramp(low=0, high=10, period=10),
+            'running': snap7.generator.Toggle(period=0.5),
+            'small': snap7.generator.Counter(step=200),
+        })
+        self.generator.tick(t=1.5)
+        data = bytearray(self.data)
+        self.assertAlmostEqual(util.get_real(data, 0), 1.5, places=5)
+        self.assertTrue(util.get_bool(data, 4, 0))
+        self.assertTrue(util.get_bool(data, 4, 1))
+        self.assertEqual(util.get_int(data, 6), 1)
+        self.assertEqual(util.get_usint(data, 8), 200)
+
+        self.generator.tick(t=2.5)
+        data = bytearray(self.data)
+        self.assertAlmostEqual(util.get_real(data, 0), 2.5, places=5)
+        self.assertTrue(util.get_bool(data, 4, 0))
+        self.assertFalse(util.get_bool(data, 4, 1))
+        self.assertEqual(util.get_int(data, 6), 2)
+        # counters wrap around at the type limits
+        self.assertEqual(util.get_usint(data, 8), 144)
+
+    def test_random_walk_bounds(self):
+        spec = "0 level REAL"
+        signal = snap7.generator.RandomWalk(step=10, low=0, high=5, seed=1)
+        self.generator.add_area(snap7.types.srvAreaDB, 1, spec, signals={'level': signal})
+        for t in range(20):
+            self.generator.tick(t=t)
+            self.assertTrue(0 <= util.get_real(bytearray(self.data), 0) <= 5)
+
+    def test_unregistered_area(self):
+        self.assertRaises(Snap7Exception, self.generator.add_area,
+                          snap7.types.srvAreaDB, 2, layout)
+
+    def test_out_of_range(self):
+        self.assertRaises(ValueError, self.generator.add_area,
+                          snap7.types.srvAreaDB, 1, "14 value DINT")
+
+    def test_unsupported_type(self):
+        self.assertRaises(ValueError, self.generator.add_area,
+                          snap7.types.srvAreaDB, 1, layout,
+                          signals={'name': snap7.generator.Counter()})
+
+    def test_start_stop(self):
+        self.generator.add_area(snap7.types.srvAreaDB, 1, "6 count INT")
+        self.generator.start()
+        time.sleep(0.1)
+        self.generator.stop()
+        self.assertGreater(util.get_int(bytearray(self.data), 6), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+import unittest
+
+import snap7
+
+
+def run(code):
+    return subprocess.check_output([sys.executable, '-c', code], universal_newlines=True).strip()
+
+
+class TestImport(unittest.TestCase):
+
+    def test_lazy_submodules(self):
+        loaded = run("import sys, snap7; print(sorted(m for m in sys.modules if m.startswith('snap7.')))")
+        self.assertEqual(loaded, "[]")
+
+    def test_no_pkg_resources(self):
+        loaded = run("import sys, snap7; snap7.__version__; print('pkg_resources' in sys.modules)")
+        self.assertEqual(loaded, "False")
+
+    def test_attributes(self):
+        self.assertIs(snap7.client, sys.modules['snap7.client'])
+        self.assertTrue(snap7.types.S7AreaDB)
+        self.assertIsInstance(snap7.__version__, str)
+        self.assertIn('util', dir(snap7))
+        self.assertRaises(AttributeError, getattr, snap7, 'nothing')
+
+    def test_import_time(self):
+        # cumulative import times measured by python itself, relative to the
+        # client so the test doesn't depend on the speed of the machine
+        output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import snap7; import snap7.client'],
+                                stderr=subprocess.PIPE, universal_newlines=True).stderr
+        cumulative = {line.split('|')[2].strip(): int(line.split('|')[1]) for line in output.splitlines()
+                      if line.endswith(('| snap7', '| snap7.client'))}
+        self.assertLess(cumulative['snap7'], cumulative['snap7.client'] / 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import ctypes
+import logging
+import unittest
+
+import snap7.client
+import snap7.instrumentation
+import snap7.partner
+import snap7.server
+import snap7.types
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1105
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * 100)()
+        self.server.register_area(snap7.types.srvAreaDB, 1, self.db)
+        self.server.start(tcpport=tcpport)
+        self.client = snap7.client.Client()
+        self.instrumentation = snap7.instrumentation.instrument(self.client, exec_time=True,
+                                                                labels={'plc': 'local'})
+        self.client.connect(ip, 0, 1, tcpport)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+
+    def test_snapshot(self):
+        self.client.db_read(1, 0, 10)
+        self.client.db_read(1, 10, 20)
+        self.client.db_write(1, 0, bytearray(4))
+        self.client.read_area(snap7.types.S7AreaDB, 1, 0, 6)
+        self.assertRaises(Snap7Exception, self.client.db_read, 2, 0, 4)
+
+        snapshot = self.instrumentation.snapshot()
+        db_read = snapshot['Cli_DBRead']
+        self.assertEqual(db_read['calls'], 3)
+        self.assertEqual(db_read['errors'], 1)
+        self.assertEqual(db_read['bytes'], 30)
+        self.assertEqual(db_read['error_codes'], {0x00C00000: 1})
+        self.assertGreater(db_read['duration'], 0)
+        self.assertGreaterEqual(db_read['exec_time'], 0)
+        self.assertEqual(snapshot['Cli_DBWrite']['bytes'], 4)
+        self.assertEqual(snapshot['Cli_ReadArea']['bytes'], 6)
+        self.assertEqual(snapshot['Cli_ConnectTo']['errors'], 0)
+
+    def test_prometheus(self):
+        self.assertRaises(Snap7Exception, self.client.db_read, 2, 0, 4)
+        text = snap7.instrumentation.prometheus_text(self.instrumentation)
+        self.assertIn('# TYPE snap7_calls_total counter\n', text)
+        self.assertIn('snap7_calls_total{plc="local",function="Cli_DBRead"} 1\n', text)
+        self.assertIn('snap7_errors_by_code_total{plc="local",function="Cli_DBRead",code="0xc00000"} 1\n', text)
+        self.assertEqual(text, self.instrumentation.prometheus())
+
+    def test_uninstrument(self):
+        self.assertIs(snap7.instrumentation.instrument(self.client), self.instrumentation)
+        snap7.instrumentation.uninstrument(self.client)
+        self.assertIs(self.client._library, snap7.common.load_library())
+        self.client.db_read(1, 0, 10)
+        self.assertNotIn('Cli_DBRead', self.instrumentation.snapshot())
+
+    def test_get_exec_time(self):
+        self.client.db_read(1, 0, 10)
+        self.assertGreaterEqual(self.client.get_exec_time(), 0)
+
+
+class TestPartnerInstrumentation(unittest.TestCase):
+
+    def test_partner(self):
+        partner = snap7.partner.Partner()
+        instrumentation = snap7.instrumentation.instrument(partner)
+        partner.get_stats()
+        snap7.instrumentation.uninstrument(partner)
+        partner.destroy()
+        self.assertEqual(instrumentation.snapshot()['Par_GetStats']['calls'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import ctypes
+import logging
+import unittest
+
+import snap7.client
+import snap7.client_async
+import snap7.error
+import snap7.latency
+import snap7.server
+import snap7.types
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1102
+
+
+class TestLatencyRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * 256)()
+        self.server.register_area(snap7.types.srvAreaDB, 1, self.db)
+        self.server.start(tcpport=tcpport)
+        self.recorder = snap7.latency.LatencyRecorder()
+
+    def tearDown(self):
+        self.server.stop()
+        self.server.destroy()
+
+    def test_record(self):
+        for i in range(1, 1001):
+            self.recorder.record('10.0.0.1', 'db_read', i / 1e4)
+        self.recorder.record('10.0.0.2', 'db_read', 1.0, result=snap7.error.errCliJobTimeout)
+        self.recorder.record('10.0.0.2', 'db_write', 0.5)
+        self.assertAlmostEqual(self.recorder.percentile(99.9, plc='10.0.0.1'), 0.0999, delta=0.0999 / 8)
+        self.assertEqual(self.recorder.percentile(100, operation='db_read'), 1.0)
+        self.assertEqual(self.recorder.histogram().count, 1002)
+        self.assertIsNone(self.recorder.percentile(50, operation='ab_read'))
+        snapshot = self.recorder.snapshot()
+        self.assertEqual(snapshot['10.0.0.1']['db_read']['count'], 1000)
+        self.assertEqual(snapshot['10.0.0.2']['db_read']['errors'], 1)
+        self.assertEqual(snapshot['10.0.0.2']['db_write']['p99.9'], 500)
+        self.recorder.reset()
+        self.assertEqual(self.recorder.snapshot(), {})
+
+    def test_client(self):
+        client = snap7.client.Client()
+        self.recorder.attach(client)
+        client.connect(ip, 0, 1, tcpport)
+        try:
+            client.db_read(1, 0, 4)
+            client.db_write(1, 0, bytearray(4))
+            self.assertRaises(Snap7Exception, client.db_read, 2, 0, 4)
+        finally:
+            client.disconnect()
+            client.destroy()
+        snapshot = self.recorder.snapshot()[ip]
+        self.assertEqual(snapshot['db_read']['count'], 2)
+        self.assertEqual(snapshot['db_read']['errors'], 1)
+        self.assertEqual(snapshot['db_write']['count'], 1)
+
+    def test_async_client(self):
+        client = snap7.client_async.ClientAsync()
+        client.set_as_check_mode(1)
+        self.recorder.attach(client)
+        client.connect(ip, 0, 1, tcpport)
+        try:
+            asyncio.run(client.as_db_read(1, 0, 4))
+        finally:
+            client.disconnect()
+            client.destroy()
+        self.assertEqual(self.recorder.snapshot()[ip]['as_db_read']['count'], 1)
+
+
+class TestCycleTracker(unittest.TestCase):
+
+    def test_scans(self):
+        tracker = snap7.latency.CycleTracker(0.1)
+        self.assertIsNone(tracker.within_cycle())
+        for i in range(10):
+            # the 10th scan starts 5 ms late and takes 150 ms
+            start = i * 0.1 + (0.005 if i == 9 else 0)
+            started = tracker.start(now=start)
+            tracker.stop(started, now=start + (0.15 if i == 9 else 0.02))
+        self.assertEqual(tracker.scans, 10)
+        self.assertEqual(tracker.overruns, 1)
+        self.assertEqual(tracker.within_cycle(), 0.9)
+        self.assertEqual(tracker.jitter.count, 9)
+        self.assertAlmostEqual(tracker.jitter.percentile(100), 0.005, delta=0.005 / 8)
+        result = tracker.as_dict()
+        self.assertEqual(result['cycle'], 100)
+        self.assertAlmostEqual(result['duration']['max'], 150, delta=1)
+
+    def test_scan(self):
+        tracker = snap7.latency.CycleTracker(1)
+        with tracker.scan():
+            pass
+        self.assertEqual(tracker.scans, 1)
+        self.assertEqual(tracker.within_cycle(), 1)
+        tracker.reset()
+        self.assertEqual(tracker.scans, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import asyncio
+import ctypes
+import logging
+import time
+import unittest
+from unittest import mock
+
+import snap7
+import snap7.server
+from snap7 import util
+from snap7.exceptions import AddressException, Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1103
+db_number = 1
+rack = 0x1000
+slot = 0x2000
+
+
+class TestLogoServer(unittest.TestCase):
+    """
+    Test suite against a server in this process.
+    """
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * 1470)()
+        self.server.register_area(snap7.types.srvAreaDB, db_number, self.db)
+        self.server.start(tcpport=tcpport)
+        self.client = snap7.logo.Logo()
+        self.client.connect(ip, rack, slot, tcpport)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+
+    def test_read_many(self):
+        data = bytearray(self.db)
+        util.set_bool(data, 10, 3, True)
+        util.set_int(data, 12, -200)
+        util.set_dint(data, 1000, 100000)
+        data[20] = 7
+        ctypes.memmove(self.db, bytes(data), len(data))
+        with mock.patch.object(self.client, 'db_read', wraps=self.client.db_read) as db_read:
+            values = self.client.read_many(["V10.3", "V10.2", "VW12", "VD1000", "V20"])
+        self.assertEqual(values, [1, 0, -200, 100000, 7])
+        # V10 to V20 in one request, VD1000 in another
+        self.assertEqual(db_read.call_count, 2)
+
+    def test_write_many(self):
+        self.db[10] = 0x01
+        self.db[14] = 0xff
+        self.client.write_many({"V10.3": 1, "VW12": 300, "V20": 5, "VD1000": -1})
+        self.client.write_many([("V10.0", 0)])
+        data = bytearray(self.db)
+        self.assertEqual(data[10], 0x08)
+        self.assertEqual(util.get_int(data, 12), 300)
+        # untouched bytes are written back as read
+        self.assertEqual(data[14], 0xff)
+        self.assertEqual(data[20], 5)
+        self.assertEqual(util.get_dint(data, 1000), -1)
+        self.assertEqual(self.client.read_many(["V10.3", "VW12", "V20", "VD1000"]), [1, 300, 5, -1])
+
+    def test_invalid_address(self):
+        self.assertRaises(AddressException, self.client.read_many, ["VW10.1"])
+        self.assertRaises(AddressException, self.client.write_many, {"X10": 1})
+        self.assertRaises(AddressException, self.client.read, "VW10.1")
+        self.assertRaises(AddressException, self.client.write, "X10", 1)
+
+    def test_read_write(self):
+        for vm_address, value in (("V10.3", 1), ("V11", 200), ("VW12", -300), ("VD16", 70000)):
+            self.client.write(vm_address, value)
+            self.assertEqual(self.client.read(vm_address), value)
+        self.client.write("V10.3", 0)
+        self.assertEqual(self.client.read("V10.3"), 0)
+        self.assertEqual(util.get_dint(bytearray(self.db), 16), 70000)
+
+    def test_client_features(self):
+        self.assertIsInstance(self.client, snap7.client.Client)
+        self.client.db_write(db_number, 100, bytearray(b'logo'))
+        self.assertEqual(self.client.db_read(db_number, 100, 4), bytearray(b'logo'))
+        self.assertTrue(self.client.get_connected())
+
+    def test_async(self):
+        client = snap7.logo.LogoAsync()
+        client.set_as_check_mode(1)
+        client.connect(ip, rack, slot, tcpport)
+        self.db[30] = 42
+        loop = asyncio.new_event_loop()
+        try:
+            data = loop.run_until_complete(client.as_db_read(db_number, 30, 1))
+        finally:
+            loop.close()
+            client.disconnect()
+            client.destroy()
+        self.assertEqual(data, bytearray([42]))
+
+
+class TestLogoMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * snap7.logo.vm_size_logo8)()
+        self.server.register_area(snap7.types.srvAreaDB, db_number, self.db)
+        self.server.start(tcpport=tcpport)
+        self.client = snap7.logo.Logo()
+        self.client.connect(ip, rack, slot, tcpport)
+        self.mirror = snap7.logo.LogoMirror(self.client, interval=0.01)
+
+    def tearDown(self):
+        self.mirror.stop()
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+
+    def test_read(self):
+        self.assertRaises(Snap7Exception, self.mirror.read, "VW12")
+        self.db[12] = 1
+        self.db[1469] = 1
+        self.mirror.refresh()
+        self.assertEqual(self.mirror.read("VW12"), 256)
+        self.assertEqual(self.mirror.read_many(["VW12", "V1469.0", "V0"]), [256, 1, 0])
+        self.assertLess(self.mirror.age, 1)
+        self.assertRaises(ValueError, self.mirror.read, "VW1469")
+
+    def test_subscribe(self):
+        changes = []
+        self.mirror.subscribe(["V10.3", "VW12"], lambda *change: changes.append(change))
+        self.mirror.refresh()
+        self.assertEqual(changes, [("V10.3", 0), ("VW12", 0)])
+        self.client.write("VW12", 5)
+        self.mirror.refresh()
+        self.mirror.refresh()
+        self.assertEqual(changes[2:], [("VW12", 5)])
+
+    def test_start_stop(self):
+        self.db[20] = 3
+        self.mirror.start()
+        for _ in range(100):
+            if self.mirror.data and self.mirror.read("V20") == 3:
+                break
+            time.sleep(0.01)
+        self.mirror.stop()
+        self.assertEqual(self.mirror.read("V20"), 3)
+
+
+class TestParseVMAddress(unittest.TestCase):
+
+    def test_parse(self):
+        address = snap7.logo.parse_vm_address("V10.3")
+        self.assertEqual((address.byte, address.bit, address.start), (10, 3, 83))
+        self.assertEqual(address.wordlen, snap7.types.S7WLBit)
+        address = snap7.logo.parse_vm_address("VW12")
+        self.assertEqual((address.byte, address.size, address.start), (12, 2, 12))
+        self.assertEqual(snap7.logo.parse_vm_address("VD20").size, 4)
+        self.assertEqual(snap7.logo.parse_vm_address("V7").wordlen, snap7.types.S7WLByte)
+
+    def test_cached(self):
+        self.assertIs(snap7.logo.parse_vm_address("VW12"), snap7.logo.parse_vm_address("VW12"))
+
+    def test_invalid(self):
+        for vm_address in ("VW10.1", "V10.8", "X10", "V", "V10.3 ", "vw10"):
+            self.assertRaises(ValueError, snap7.logo.parse_vm_address, vm_address)
+
+    def test_get_set(self):
+        # offset is the position of the address byte in data
+        data = bytearray(4)
+        snap7.logo.parse_vm_address("V1.2").set(data, 1, 1)
+        snap7.logo.parse_vm_address("VW2").set(data, -2, 2)
+        self.assertEqual(data, bytearray([0, 4, 0xff, 0xfe]))
+        self.assertEqual(snap7.logo.parse_vm_address("V1.2").get(data), 0)
+        self.assertEqual(snap7.logo.parse_vm_address("V1.2").get(data, 1), 1)
+        self.assertEqual(snap7.logo.parse_vm_address("VW2").get(data, 2), -2)
+
+
+if __name__ == '__main__':
+    unittest.main()
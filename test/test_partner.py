@@ -1,4 +1,6 @@
+import ctypes
 import logging
+import queue
 import unittest as unittest
 
 from unittest import mock
@@ -15,14 +17,13 @@ class TestPartner(unittest.TestCase):
         self.partner.start()
 
     def test_as_b_send(self):
-        self.partner.as_b_send()
+        self.assertRaises(Snap7Exception, self.partner.as_b_send, bytearray(10))
 
-    @unittest.skip("we don't recv something yet")
     def test_b_recv(self):
-        self.partner.b_recv()
+        self.assertRaises(Snap7Exception, self.partner.b_recv, 10)
 
     def test_b_send(self):
-        self.partner.b_send()
+        self.assertRaises(Snap7Exception, self.partner.b_send, bytearray(10))
 
     def test_check_as_b_recv_completion(self):
         self.partner.check_as_b_recv_completion()
@@ -96,10 +97,12 @@ class TestPartner(unittest.TestCase):
                           snap7.types.RemotePort, 1)
 
     def test_set_recv_callback(self):
-        self.partner.set_recv_callback()
+        self.partner.set_recv_callback(lambda op_result, r_id, data: None)
+        self.partner.set_recv_callback(None)
 
     def test_set_send_callback(self):
-        self.partner.set_send_callback()
+        self.partner.set_send_callback(lambda op_result: None)
+        self.partner.set_send_callback(None)
 
     def test_start(self):
         self.partner.start()
@@ -114,6 +117,52 @@ class TestPartner(unittest.TestCase):
         self.assertRaises(Snap7Exception, self.partner.wait_as_b_send_completion)
 
 
+class TestRecvQueue(unittest.TestCase):
+    """
+    Tests for the receive pipeline, the packets are fed to the native
+    callback wrapper directly.
+    """
+
+    def setUp(self):
+        self.partner = snap7.partner.Partner()
+
+    def receive(self, r_id, data, op_result=0):
+        cdata = (ctypes.c_ubyte * len(data)).from_buffer_copy(data)
+        self.partner._recv_callback(None, op_result, r_id, ctypes.addressof(cdata), len(data))
+
+    def test_recv_callback(self):
+        received = []
+        self.partner.set_recv_callback(lambda op_result, r_id, data: received.append((op_result, r_id, bytes(data))))
+        self.receive(3, b'test')
+        self.receive(4, b'', op_result=1)
+        self.assertEqual(received, [(0, 3, b'test'), (1, 4, b'')])
+
+    def test_recv_queue(self):
+        recv_queue = self.partner.create_recv_queue(slots=2, slot_size=16, timeout=0.01)
+        self.receive(1, b'first')
+        self.receive(2, b'second')
+        self.assertEqual(recv_queue.qsize(), 2)
+        # no free buffers left, the packet is dropped after the timeout
+        self.receive(3, b'third')
+        self.assertEqual(recv_queue.dropped, 1)
+
+        with recv_queue.get(timeout=1) as packet:
+            self.assertEqual(packet.r_id, 1)
+            self.assertEqual(bytes(packet.data), b'first')
+        packet = recv_queue.get(timeout=1)
+        self.assertEqual((packet.r_id, bytes(packet.data)), (2, b'second'))
+        packet.release()
+
+        # too large for the receive buffers
+        self.receive(4, bytearray(17))
+        self.assertEqual(recv_queue.dropped, 2)
+        self.receive(5, b'', op_result=1)
+        self.assertEqual(recv_queue.errors, 1)
+        self.receive(6, b'fourth')
+        self.assertEqual(bytes(recv_queue.get(timeout=1).data), b'fourth')
+        self.assertRaises(queue.Empty, recv_queue.get, timeout=0.01)
+
+
 class TestLibraryIntegration(unittest.TestCase):
     def setUp(self):
         # replace the function load_library with a mock
@@ -0,0 +1,139 @@
+import asyncio
+import ctypes
+import logging
+import threading
+import unittest
+from unittest import mock
+
+import snap7.partner_async
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+
+class TestPartnerAsync(unittest.TestCase):
+    """
+    The native callbacks are called from another thread, like the partner
+    thread of the library does.
+    """
+
+    def setUp(self):
+        self.partner = snap7.partner_async.PartnerAsync(max_queue=1, recv_timeout=0.1)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        self.partner.destroy()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def receive(self, r_id, data):
+        def callback():
+            cdata = (ctypes.c_ubyte * len(data)).from_buffer_copy(data)
+            self.partner._recv_callback(None, 0, r_id, ctypes.addressof(cdata), len(data))
+
+        thread = threading.Thread(target=callback)
+        thread.start()
+        return thread
+
+    def test_recv(self):
+        async def recv():
+            self.partner._bind_loop()
+            thread = self.receive(3, b'test')
+            result = await self.partner.recv(timeout=1)
+            thread.join()
+            return result
+
+        self.assertEqual(self.run_async(recv()), (3, b'test'))
+
+    def test_recv_iterator(self):
+        async def recv():
+            self.partner._bind_loop()
+            thread = self.receive(1, b'first')
+            packets = []
+            async for packet in self.partner:
+                packets.append(packet)
+                if len(packets) == 2:
+                    break
+                thread.join()
+                thread = self.receive(2, b'second')
+            thread.join()
+            return packets
+
+        self.assertEqual(self.run_async(recv()), [(1, b'first'), (2, b'second')])
+
+    def test_recv_queue_full(self):
+        async def recv():
+            self.partner._bind_loop()
+            thread = self.receive(1, b'first')
+            await asyncio.sleep(0.05)
+            # no room in the queue, the loop keeps running while the partner thread waits
+            second = self.receive(2, b'second')
+            await asyncio.sleep(0.2)
+            thread.join()
+            second.join()
+            return await self.partner.recv(timeout=1)
+
+        self.assertEqual(self.run_async(recv()), (1, b'first'))
+        self.assertEqual(self.partner.dropped, 1)
+
+    def test_recv_timeout(self):
+        self.assertRaises(asyncio.TimeoutError, self.run_async, self.partner.recv(timeout=0.01))
+
+    def test_send(self):
+        def as_b_send(*args):
+            threading.Timer(0.01, self.partner._send_callback, (None, 0)).start()
+            return 0
+
+        with mock.patch.object(self.partner.library, 'Par_AsBSend', side_effect=as_b_send) as native:
+            self.run_async(self.partner.send(b'data', r_id=5, timeout=1))
+            native.assert_called_once()
+
+    def test_send_error(self):
+        def as_b_send(*args):
+            threading.Timer(0.01, self.partner._send_callback, (None, 0x00100000)).start()
+            return 0
+
+        with mock.patch.object(self.partner.library, 'Par_AsBSend', side_effect=as_b_send):
+            self.assertRaises(Snap7Exception, self.run_async, self.partner.send(b'data', timeout=1))
+
+    def test_send_timeout(self):
+        calls = []
+
+        def as_b_send(*args):
+            calls.append(self.loop.time())
+            # the first job completes after the timeout of its send
+            delay = 0.2 if len(calls) == 1 else 0.01
+            threading.Timer(delay, self.partner._send_callback, (None, 0)).start()
+            return 0
+
+        async def send():
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.partner.send(b'first', timeout=0.05)
+            await self.partner.send(b'second', timeout=1)
+
+        with mock.patch.object(self.partner.library, 'Par_AsBSend', side_effect=as_b_send):
+            self.run_async(send())
+        # the second job is only started when the first one completed
+        self.assertGreaterEqual(calls[1] - calls[0], 0.19)
+
+    def test_recv_errors(self):
+        async def bind():
+            self.partner._bind_loop()
+
+        self.run_async(bind())
+        with mock.patch.object(self.partner._queue, 'put', mock.Mock(side_effect=RuntimeError("failed"))):
+            self.receive(1, b'data').join()
+        self.partner._recv_callback(None, 0x00100000, 2, None, 0)
+        self.assertEqual(self.partner.errors, 2)
+        self.assertEqual(self.partner.dropped, 0)
+
+    def test_send_not_linked(self):
+        self.assertRaises(Snap7Exception, self.run_async, self.partner.send(b'data'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import ctypes
+import logging
+import time
+import unittest
+from unittest import mock
+
+import snap7.partner
+import snap7.partner_monitor
+
+logging.basicConfig(level=logging.WARNING)
+
+
+class TestPartnerMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.partner = snap7.partner.Partner()
+        self.monitor = snap7.partner_monitor.PartnerMonitor(window=10)
+        self.monitor.attach(self.partner)
+
+    def tearDown(self):
+        self.monitor.detach()
+        self.partner.destroy()
+
+    def test_send(self):
+        with mock.patch.object(self.partner.library, 'Par_BSend', return_value=0):
+            self.partner.b_send(bytearray(100))
+            self.partner.b_send(bytearray(50))
+        with mock.patch.object(self.partner.library, 'Par_BSend', return_value=0x00600000):
+            self.assertRaises(Exception, self.partner.b_send, bytearray(10))
+        send = self.monitor.snapshot()['send']
+        self.assertEqual(send['packets'], 2)
+        self.assertEqual(send['bytes'], 150)
+        self.assertEqual(send['errors'], 1)
+        self.assertEqual(send['bytes_per_second'], 15)
+        self.assertAlmostEqual(send['error_rate'], 1 / 3)
+        self.assertEqual(send['latency']['count'], 2)
+
+    def test_as_send(self):
+        with mock.patch.object(self.partner.library, 'Par_AsBSend', return_value=0):
+            self.partner.set_send_callback(lambda op_result: None)
+            self.partner.as_b_send(bytearray(20))
+            self.partner._send_callback(None, 0)
+        send = self.monitor.snapshot()['send']
+        self.assertEqual(send['packets'], 1)
+        self.assertEqual(send['bytes'], 20)
+
+    def test_recv(self):
+        data = (ctypes.c_ubyte * 8)()
+        self.partner.set_recv_callback(lambda op_result, r_id, data: time.sleep(0.01))
+        self.partner._recv_callback(None, 0, 1, ctypes.addressof(data), 8)
+        self.partner._recv_callback(None, 0x00b00000, 1, ctypes.addressof(data), 0)
+        recv = self.monitor.snapshot()['recv']
+        self.assertEqual(recv['packets'], 1)
+        self.assertEqual(recv['bytes'], 8)
+        self.assertEqual(recv['errors'], 1)
+        self.assertGreaterEqual(recv['latency']['p50'], 10 * 7 / 8)
+
+    def test_sample(self):
+        self.monitor.sample()
+        native = self.monitor.snapshot()['native']
+        self.assertEqual(native['bytes_sent'], 0)
+        self.assertEqual(native['status'], 'par_stopped')
+
+    def test_reset(self):
+        self.monitor.received(10)
+        self.monitor.reset()
+        self.assertEqual(self.monitor.snapshot()['recv']['packets'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
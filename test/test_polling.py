@@ -0,0 +1,140 @@
+import ctypes
+import logging
+import time
+import unittest
+from unittest import mock
+
+import snap7.client
+import snap7.polling
+import snap7.server
+import snap7.types
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1108
+
+
+class TestAdaptivePoller(unittest.TestCase):
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * 64)()
+        self.server.register_area(snap7.types.srvAreaDB, 1, self.db)
+        self.server.start(tcpport=tcpport)
+        self.client = snap7.client.Client()
+        self.client.connect(ip, 0, 1, tcpport)
+        self.poller = snap7.polling.AdaptivePoller(self.client, max_cycle_time=50)
+        self.polled = []
+
+    def tearDown(self):
+        self.poller.stop()
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+
+    def call_back(self, name, data):
+        self.polled.append((name, data))
+
+    def test_poll(self):
+        self.db[5] = 7
+        self.poller.add_group('fast', [(1, 0, 4), (1, 4, 2)], self.call_back, interval=0.1)
+        self.poller.add_group('slow', [(1, 8, 8)], self.call_back, interval=1)
+        self.assertEqual(self.poller.poll(now=100), 100.1)
+        self.assertEqual(self.polled[0], ('fast', [bytearray(4), bytearray([0, 7])]))
+        self.assertEqual(self.polled[1], ('slow', [bytearray(8)]))
+        self.poller.poll(now=100.05)
+        self.assertEqual(len(self.polled), 2)
+        self.poller.poll(now=100.1)
+        self.assertEqual(len(self.polled), 3)
+        status = self.poller.status()
+        self.assertEqual(status['groups']['fast']['polls'], 2)
+        self.assertGreater(status['rtt'], 0)
+        self.poller.remove_group('fast')
+        self.assertEqual(list(self.poller.status()['groups']), ['slow'])
+
+    def test_measure(self):
+        # the server has a communication load of 20% and a cycle time below 1 ms
+        self.poller.measure()
+        self.assertEqual(self.poller.communication_load, 20)
+        self.assertLess(self.poller.cycle_time, 50)
+        self.assertEqual(self.poller.factor, 1)
+
+    def test_errors(self):
+        self.poller.add_group('missing', [(2, 0, 4)], self.call_back, interval=0.1)
+        self.poller.poll(now=0)
+        self.assertEqual(self.polled, [])
+        self.assertEqual(self.poller.status()['groups']['missing']['errors'], 1)
+
+    def test_thread(self):
+        self.poller.add_group('fast', [(1, 0, 4)], self.call_back, interval=0.01)
+        self.poller.start()
+        time.sleep(0.2)
+        self.poller.stop()
+        self.assertGreater(len(self.polled), 2)
+
+
+class TestAdjust(unittest.TestCase):
+
+    def setUp(self):
+        self.client = mock.Mock()
+        self.poller = snap7.polling.AdaptivePoller(self.client, max_cycle_time=50, max_factor=4)
+        self.poller.add_group('fast', [(1, 0, 4)], None, interval=0.1)
+        self.poller.add_group('capped', [(1, 0, 4)], None, interval=1, max_interval=1.5)
+
+    def intervals(self):
+        return {name: group['interval'] for name, group in self.poller.status()['groups'].items()}
+
+    def test_cycle_time(self):
+        self.assertEqual(self.poller.adjust(cycle_time=80), 2)
+        self.assertEqual(self.intervals(), {'fast': 0.2, 'capped': 1.5})
+        self.poller.adjust(cycle_time=80)
+        self.assertEqual(self.poller.adjust(cycle_time=80), 4)
+        # between headroom and the limit the rate is kept
+        self.assertEqual(self.poller.adjust(cycle_time=45), 4)
+        self.assertAlmostEqual(self.poller.adjust(cycle_time=10), 3.6)
+        for _ in range(20):
+            self.poller.adjust(cycle_time=10)
+        self.assertEqual(self.poller.factor, 1)
+        self.assertEqual(self.intervals(), {'fast': 0.1, 'capped': 1})
+
+    def test_rtt(self):
+        self.poller._record_rtt(0.001)
+        self.assertEqual(self.poller.adjust(rtt=0.002), 1)
+        self.assertEqual(self.poller.adjust(rtt=0.01), 2)
+
+    def test_rtt_baseline_steps_up(self):
+        for _ in range(10):
+            self.poller._record_rtt(0.001)
+        self.assertEqual(self.poller.adjust(rtt=self.poller.rtt), 1)
+        # the route to the PLC changes, round trip times stay at 10 ms
+        factors = []
+        for _ in range(100):
+            self.poller._record_rtt(0.01)
+            factors.append(self.poller.adjust(rtt=self.poller.rtt))
+        self.assertEqual(max(factors), 4)
+        self.assertEqual(factors[-1], 1)
+
+    def test_communication_load(self):
+        self.poller.communication_load = 20
+        # 11 reads per second of 10 ms, 11% of the time
+        self.poller._record_rtt(0.01)
+        self.assertEqual(self.poller.adjust(), 1)
+        # the average round trip time becomes 28 ms, 31% of the time
+        self.poller._record_rtt(0.1)
+        self.assertEqual(self.poller.adjust(), 2)
+
+    def test_szl_not_available(self):
+        self.client.read_szl.side_effect = Snap7Exception("CPU : Item not available")
+        self.poller.measure()
+        self.poller.szl_cache.invalidate()
+        self.poller.measure()
+        self.assertIsNone(self.poller.cycle_time)
+        # the lists which are not available are not read again
+        self.assertEqual(self.client.read_szl.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
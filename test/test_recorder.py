@@ -0,0 +1,140 @@
+import ctypes
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import snap7.client
+import snap7.recorder
+import snap7.server
+import snap7.types
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1112
+
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'plc.s7rec')
+        self.server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * 16)(*range(16))
+        self.pa = (ctypes.c_ubyte * 4)(9, 8, 7, 6)
+        self.server.register_area(snap7.types.srvAreaDB, 1, self.db)
+        self.server.register_area(snap7.types.srvAreaPA, 0, self.pa)
+        self.server.start(tcpport=tcpport)
+        self.client = snap7.client.Client()
+        self.client.connect(ip, 0, 1, tcpport)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+        shutil.rmtree(self.directory)
+
+    def record(self):
+        with snap7.recorder.Recorder(self.path) as recorder:
+            recorder.attach(self.client)
+            self.client.db_read(1, 0, 4)
+            self.client.db_write(1, 2, bytearray([0xAA, 0xBB]))
+            self.client.db_read(1, 0, 4)
+            self.client.read_area(snap7.types.S7AreaDB, 1, 8, 2)
+            self.client.ab_read(0, 4)
+            self.assertRaises(Snap7Exception, self.client.db_read, 2, 0, 4)
+            recorder.detach(self.client)
+            self.client.db_read(1, 0, 4)
+        return recorder
+
+    def test_record(self):
+        recorder = self.record()
+        self.assertEqual(recorder.records, 6)
+        with snap7.recorder.Recording(self.path) as recording:
+            self.assertEqual(len(recording), 6)
+            records = list(recording)
+            self.assertEqual([record.operation for record in records],
+                             ['db_read', 'db_write', 'db_read', 'read_area', 'ab_read', 'db_read'])
+            self.assertEqual(records[0][2:], (snap7.types.S7AreaDB, 1, 0, 4, 0, bytes([0, 1, 2, 3])))
+            self.assertEqual(records[1].data, bytes([0xAA, 0xBB]))
+            self.assertEqual(records[2].data, bytes([0, 1, 0xAA, 0xBB]))
+            self.assertEqual(records[4].data, bytes([9, 8, 7, 6]))
+            self.assertNotEqual(records[5].result, 0)
+            self.assertEqual(records[5].data, b'')
+            timestamps = [record.timestamp for record in records]
+            self.assertEqual(timestamps, sorted(timestamps))
+            self.assertEqual(recording.find(timestamps[3]), 3)
+            self.assertEqual(recording.find(timestamps[-1] + 1), 6)
+            self.assertEqual(recording[-1].operation, 'db_read')
+            self.assertRaises(IndexError, recording.__getitem__, 6)
+
+    def test_without_index(self):
+        self.record()
+        os.remove(snap7.recorder.index_path(self.path))
+        with snap7.recorder.Recording(self.path) as recording:
+            self.assertEqual(len(recording), 6)
+            self.assertEqual(recording[2].data, bytes([0, 1, 0xAA, 0xBB]))
+
+    def test_buffer(self):
+        recorder = snap7.recorder.Recorder(self.path, buffer_size=64)
+        recorder.record('db_read', snap7.types.S7AreaDB, 1, 0, 4, 0, b'abcd')
+        self.assertRaises(ValueError, snap7.recorder.Recording, self.path)
+        recorder.record('db_read', snap7.types.S7AreaDB, 1, 0, 40, 0, b'x' * 40)
+        self.assertEqual(len(snap7.recorder.Recording(self.path)), 2)
+        recorder.record('db_read', snap7.types.S7AreaDB, 1, 0, 4, 0, b'abcd')
+        self.assertEqual(len(snap7.recorder.Recording(self.path)), 2)
+        recorder.close()
+        recorder.close()
+        self.assertEqual(len(snap7.recorder.Recording(self.path)), 3)
+
+    def test_replay(self):
+        self.record()
+        client = snap7.recorder.ReplayClient(self.path)
+        self.assertEqual(client.db_read(1, 0, 4), bytearray([0, 1, 2, 3]))
+        client.db_write(1, 2, bytearray([0xAA, 0xBB]))
+        self.assertEqual(client.db_read(1, 0, 4), bytearray([0, 1, 0xAA, 0xBB]))
+        self.assertEqual(client.read_area(snap7.types.S7AreaDB, 1, 8, 2), bytearray([8, 9]))
+        self.assertEqual(client.ab_read(0, 4), bytearray([9, 8, 7, 6]))
+        self.assertRaises(Snap7Exception, client.db_read, 2, 0, 4)
+        self.assertRaises(ValueError, client.db_read, 1, 0, 4)
+        self.assertRaises(ValueError, client.db_read, 3, 0, 4)
+        self.assertEqual(client.replayed, 6)
+        client.destroy()
+
+        client = snap7.recorder.ReplayClient(self.path, loop=True)
+        self.assertEqual([client.db_read(1, 0, 4)[2] for _ in range(3)], [2, 0xAA, 2])
+        client.destroy()
+
+    def test_failed_writes(self):
+        with snap7.recorder.Recorder(self.path) as recorder:
+            recorder.attach(self.client)
+            self.assertRaises(Snap7Exception, self.client.db_write, 2, 0, bytearray(2))
+            self.assertRaises(Snap7Exception, self.client.write_area, snap7.types.S7AreaDB, 2, 0, bytearray(2))
+            result = self.client.ab_write(0, bytearray(8))
+            self.assertNotEqual(result, 0)
+            self.assertEqual(self.client.ab_write(0, bytearray(2)), 0)
+        client = snap7.recorder.ReplayClient(self.path)
+        self.assertRaises(Snap7Exception, client.db_write, 2, 0, bytearray(2))
+        self.assertRaises(Snap7Exception, client.write_area, snap7.types.S7AreaDB, 2, 0, bytearray(2))
+        self.assertEqual(client.ab_write(0, bytearray(8)), result)
+        self.assertEqual(client.ab_write(0, bytearray(2)), 0)
+        client.destroy()
+
+    def test_speed(self):
+        with snap7.recorder.Recorder(self.path) as recorder:
+            for i in range(3):
+                recorder.record('db_read', snap7.types.S7AreaDB, 1, 0, 1, 0, bytes([i]), timestamp=100 + i * 0.5)
+        client = snap7.recorder.ReplayClient(self.path, speed=10)
+        started = time.monotonic()
+        self.assertEqual([client.db_read(1, 0, 1) for _ in range(3)], [bytearray([i]) for i in range(3)])
+        self.assertAlmostEqual(time.monotonic() - started, 0.1, delta=0.05)
+        client.destroy()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,18 @@
+import asyncio
 import ctypes
 import logging
+import os
+import tempfile
+import time
 import unittest
 
 from unittest import mock
 
+import snap7.client
 import snap7.error
 import snap7.server
 import snap7.types
+from snap7.exceptions import Snap7Exception
 
 logging.basicConfig(level=logging.WARNING)
 
@@ -110,6 +116,62 @@ class TestServer(unittest.TestCase):
         event = self.server.pick_event()
         self.assertFalse(event)
 
+    def test_drain_events(self):
+        events = self.server.drain_events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(type(events[0]), snap7.types.SrvEvent)
+        self.assertEqual(self.server.drain_events(), [])
+
+    def test_drain_events_max_n(self):
+        self.server.stop()
+        self.server.start(tcpport=1102)
+        events = self.server.drain_events(max_n=1)
+        self.assertEqual(len(events), 1)
+        self.assertTrue(self.server.drain_events(max_n=10))
+
+    def test_events_iterator(self):
+        async def first_event():
+            events = self.server.events(interval=0.01)
+            event = await events.__anext__()
+            await events.aclose()
+            return event.EvtCode
+
+        loop = asyncio.new_event_loop()
+        try:
+            code = loop.run_until_complete(first_event())
+        finally:
+            loop.close()
+        self.assertEqual(code, 0x00000001)  # evcServerStarted
+
+    def test_events_iterator_copies(self):
+        self.server.stop()
+        self.server.start(tcpport=1102)
+
+        async def three_events():
+            events = self.server.events(interval=0.01, max_n=1)
+            kept = [await events.__anext__() for _ in range(3)]
+            await events.aclose()
+            return [event.EvtCode for event in kept]
+
+        loop = asyncio.new_event_loop()
+        try:
+            codes = loop.run_until_complete(three_events())
+        finally:
+            loop.close()
+        # evcServerStarted, evcServerStopped, evcServerStarted
+        self.assertEqual(codes, [0x00000001, 0x00000002, 0x00000001])
+
+    def test_events_callback_lazy_text(self):
+        with mock.patch.object(self.server, 'event_text') as event_text:
+            self.server._set_log_callback()
+            event = snap7.types.SrvEvent()
+            with mock.patch.object(snap7.server.logger, 'isEnabledFor', return_value=False):
+                self.server._callback(None, ctypes.pointer(event), ctypes.sizeof(event))
+            event_text.assert_not_called()
+            with mock.patch.object(snap7.server.logger, 'isEnabledFor', return_value=True):
+                self.server._callback(None, ctypes.pointer(event), ctypes.sizeof(event))
+            event_text.assert_called_once()
+
     def test_clear_events(self):
         self.server.clear_events()
         self.assertFalse(self.server.clear_events())
@@ -129,6 +191,114 @@ class TestServer(unittest.TestCase):
                           snap7.types.RemotePort)
 
 
+class TestServerReadHook(unittest.TestCase):
+    """
+    Tests for computed areas, these need a connected client
+    """
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.db1 = (ctypes.c_ubyte * 16)()
+        self.db2 = (ctypes.c_ubyte * 16)(*range(16))
+        self.server.register_area(snap7.types.srvAreaDB, 1, self.db1)
+        self.server.register_area(snap7.types.srvAreaDB, 2, self.db2)
+        self.counters = (ctypes.c_ubyte * 32)(*range(32))
+        self.timers = (ctypes.c_ubyte * 32)(*range(100, 132))
+        self.markers = (ctypes.c_ubyte * 32)(*range(50, 82))
+        self.server.register_area(snap7.types.srvAreaCT, 0, self.counters)
+        self.server.register_area(snap7.types.srvAreaTM, 0, self.timers)
+        self.server.register_area(snap7.types.srvAreaMK, 0, self.markers)
+        self.server.start(tcpport=1102)
+        self.client = snap7.client.Client()
+        self.client.connect('127.0.0.1', 0, 1, 1102)
+        self.calls = []
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+
+    def hook(self, start, size):
+        self.calls.append((start, size))
+        return bytes([len(self.calls)] * size)
+
+    def test_read_hook(self):
+        self.server.set_read_hook(snap7.types.srvAreaDB, 1, self.hook)
+        self.assertEqual(self.client.db_read(1, 2, 4), bytearray([1] * 4))
+        self.assertEqual(self.client.db_read(1, 2, 4), bytearray([2] * 4))
+        self.assertEqual(self.calls, [(2, 4), (2, 4)])
+        # the computed values are stored in the area
+        self.assertEqual(bytearray(self.db1)[:8], bytearray([0, 0, 2, 2, 2, 2, 0, 0]))
+
+    def test_read_hook_ttl(self):
+        self.server.set_read_hook(snap7.types.srvAreaDB, 1, self.hook, ttl=60)
+        self.assertEqual(self.client.db_read(1, 0, 4), bytearray([1] * 4))
+        self.assertEqual(self.client.db_read(1, 0, 4), bytearray([1] * 4))
+        self.assertEqual(self.client.db_read(1, 4, 2), bytearray([2] * 2))
+        self.assertEqual(len(self.calls), 2)
+        self.server.remove_read_hook(snap7.types.srvAreaDB, 1)
+        self.assertEqual(self.client.db_read(1, 0, 4), bytearray([1] * 4))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_other_areas(self):
+        self.server.set_read_hook(snap7.types.srvAreaDB, 1, self.hook)
+        self.assertEqual(self.client.db_read(2, 4, 4), bytearray([4, 5, 6, 7]))
+        self.client.db_write(2, 0, bytearray([9, 9]))
+        self.assertEqual(self.db2[0], 9)
+        self.assertEqual(self.client.db_read(2, 0, 3), bytearray([9, 9, 2]))
+        self.assertRaises(Exception, self.client.db_read, 3, 0, 4)
+        self.assertRaises(Exception, self.client.db_read, 2, 10, 10)
+        self.assertEqual(self.calls, [])
+
+    def test_bits(self):
+        self.server.set_read_hook(snap7.types.srvAreaDB, 1, self.hook)
+        data = ctypes.c_int16()
+        for bit, expected in ((0, 1), (1, 0)):
+            result = self.client._library.Cli_ReadArea(self.client._pointer, snap7.types.S7AreaDB, 2, 8 + bit, 1,
+                                                       snap7.types.S7WLBit, ctypes.byref(data))
+            self.assertEqual(result, 0)
+            self.assertEqual(data.value, expected)
+        value = ctypes.c_int8(1)
+        self.client._library.Cli_WriteArea(self.client._pointer, snap7.types.S7AreaDB, 2, 8 + 2, 1,
+                                           snap7.types.S7WLBit, ctypes.byref(value))
+        self.assertEqual(self.db2[1], 0b101)
+
+    def test_unregistered_area(self):
+        self.assertRaises(Exception, self.server.set_read_hook, snap7.types.srvAreaDB, 3, self.hook)
+
+    def read_areas(self):
+        reads = [(area, start, amount) for area in (snap7.types.S7AreaCT, snap7.types.S7AreaTM)
+                 for start, amount in ((0, 1), (1, 1), (2, 1), (2, 2), (5, 3))]
+        reads.append((snap7.types.S7AreaMK, 3, 4))
+        return [self.client.read_area(area, 0, start, amount) for area, start, amount in reads]
+
+    def test_native_addressing(self):
+        native = self.read_areas()
+        self.server.set_read_hook(snap7.types.srvAreaDB, 1, self.hook)
+        self.assertEqual(self.read_areas(), native)
+        self.server.remove_read_hook(snap7.types.srvAreaDB, 1)
+        self.assertIsNone(self.server._rw_area_callback)
+        self.assertEqual(self.read_areas(), native)
+
+    def test_write_invalidates(self):
+        self.server.set_read_hook(snap7.types.srvAreaDB, 1, self.hook, ttl=60)
+        self.client.db_read(1, 0, 4)
+        self.client.db_read(1, 0, 4)
+        self.client.db_write(1, 0, bytearray([7]))
+        self.assertEqual(self.client.db_read(1, 0, 4), bytearray([2] * 4))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_cache_pruned(self):
+        self.server.set_read_hook(snap7.types.srvAreaDB, 1, self.hook, ttl=0.05)
+        for start in range(8):
+            self.client.db_read(1, start, 1)
+        self.assertEqual(len(self.server._read_hook_cache), 8)
+        time.sleep(0.06)
+        self.client.db_read(1, 8, 1)
+        self.assertEqual(len(self.server._read_hook_cache), 1)
+
+
 class TestServerBeforeStart(unittest.TestCase):
     """
     Tests for server before it is started
@@ -141,6 +311,63 @@ class TestServerBeforeStart(unittest.TestCase):
         self.server.set_param(snap7.types.LocalPort, 1102)
 
 
+class TestServerSnapshot(unittest.TestCase):
+    """
+    Tests for saving and restoring the server areas
+    """
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.destroy()
+        self.directory.cleanup()
+
+    def path(self, filename):
+        return os.path.join(self.directory.name, filename)
+
+    def test_register_mapped_area(self):
+        data = self.server.register_mapped_area(snap7.types.srvAreaDB, 1, self.path('db1'), size=8)
+        self.assertIs(self.server.get_area(snap7.types.srvAreaDB, 1), data)
+        data[0] = 42
+        self.server.snapshot(self.directory.name)
+        self.server.destroy()
+        with open(self.path('db1'), 'rb') as f:
+            self.assertEqual(f.read(), bytes([42, 0, 0, 0, 0, 0, 0, 0]))
+
+        # an existing file keeps its content and size
+        server = snap7.server.Server(log=False)
+        data = server.register_mapped_area(snap7.types.srvAreaDB, 1, self.path('db1'))
+        self.assertEqual(bytes(data), bytes([42, 0, 0, 0, 0, 0, 0, 0]))
+        server.destroy()
+
+    def test_register_empty_file(self):
+        self.assertRaises(Snap7Exception, self.server.register_mapped_area,
+                          snap7.types.srvAreaDB, 1, self.path('empty'))
+
+    def test_snapshot_restore(self):
+        db3 = (ctypes.c_ubyte * 4)(1, 2, 3, 4)
+        mk = (ctypes.c_ubyte * 2)(5, 6)
+        self.server.register_area(snap7.types.srvAreaDB, 3, db3)
+        self.server.register_area(snap7.types.srvAreaMK, 0, mk)
+        self.server.snapshot(self.directory.name)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['DB_3.bin', 'MK_0.bin'])
+
+        server = snap7.server.Server(log=False)
+        restored = server.restore(self.directory.name)
+        self.assertEqual(restored, [(snap7.types.srvAreaDB, 3), (snap7.types.srvAreaMK, 0)])
+        restored_db3 = server.get_area(snap7.types.srvAreaDB, 3)
+        self.assertEqual(bytes(restored_db3), bytes([1, 2, 3, 4]))
+
+        # changes of restored areas end up in the same files
+        restored_db3[0] = 9
+        server.snapshot(self.directory.name)
+        server.destroy()
+        with open(self.path('DB_3.bin'), 'rb') as f:
+            self.assertEqual(f.read(), bytes([9, 2, 3, 4]))
+
+
 class TestLibraryIntegration(unittest.TestCase):
     def setUp(self):
         # replace the function load_library with a mock
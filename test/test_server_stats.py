@@ -0,0 +1,81 @@
+import ctypes
+import logging
+import time
+import unittest
+
+import snap7.client
+import snap7.server
+import snap7.server_stats
+import snap7.types
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1102
+
+
+class TestAccessStatistics(unittest.TestCase):
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.db = (ctypes.c_ubyte * 256)()
+        self.server.register_area(snap7.types.srvAreaDB, 1, self.db)
+        self.stats = snap7.server_stats.AccessStatistics(bucket_size=16, n_buckets=8)
+        self.stats.attach(self.server)
+        self.server.start(tcpport=tcpport)
+        self.client = snap7.client.Client()
+        self.client.connect(ip, 0, 1, tcpport)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+
+    def wait_for(self, requests):
+        # the events are reported by the server threads
+        for _ in range(50):
+            senders = self.stats.snapshot()['senders']
+            if senders and senders[ip]['requests'] >= requests:
+                return
+            time.sleep(0.01)
+
+    def test_read_write(self):
+        self.client.db_read(1, 0, 4)
+        self.client.db_read(1, 2, 4)
+        self.client.db_write(1, 40, bytearray(10))
+        self.client.db_read(1, 200, 20)
+        self.wait_for(4)
+
+        snapshot = self.stats.snapshot()
+        db1 = snapshot['areas']['DB1']
+        self.assertEqual(db1['reads'], 3)
+        self.assertEqual(db1['writes'], 1)
+        self.assertEqual(db1['read_bytes'], 28)
+        self.assertEqual(db1['write_bytes'], 10)
+        self.assertEqual(db1['buckets'][0], {'offset': 0, 'reads': 2, 'writes': 0,
+                                             'read_bytes': 8, 'write_bytes': 0})
+        self.assertEqual(db1['buckets'][1]['offset'], 32)
+        # offsets after the last bucket end up in the last bucket
+        self.assertEqual(db1['buckets'][2]['offset'], 112)
+
+        sender = snapshot['senders'][ip]
+        self.assertEqual(sender, {'requests': 4, 'bytes': 38, 'small_requests': 2, 'errors': 0})
+        self.assertEqual(self.stats.hot_buckets(1), [('DB1', 0, 2)])
+
+    def test_errors(self):
+        self.assertRaises(Exception, self.client.db_read, 2, 0, 4)
+        self.wait_for(1)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot['areas'], {})
+        self.assertEqual(snapshot['senders'][ip]['errors'], 1)
+
+    def test_reset(self):
+        self.client.db_read(1, 0, 4)
+        self.wait_for(1)
+        self.stats.reset()
+        self.assertEqual(self.stats.snapshot(), {'areas': {}, 'senders': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
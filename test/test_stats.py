@@ -0,0 +1,59 @@
+import logging
+import unittest
+
+import snap7.stats
+
+logging.basicConfig(level=logging.WARNING)
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = snap7.stats.Histogram()
+        for i in range(1, 101):
+            histogram.record(i / 1000)
+        self.assertEqual(histogram.count, 100)
+        # at most 1/8 relative error
+        self.assertAlmostEqual(histogram.percentile(50), 0.050, delta=0.050 / 8)
+        self.assertAlmostEqual(histogram.percentile(99), 0.099, delta=0.099 / 8)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertEqual(histogram.as_dict()['max'], 100)
+
+    def test_small_values(self):
+        histogram = snap7.stats.Histogram()
+        histogram.record(0.000003)
+        self.assertEqual(histogram.percentile(50), 0.000003)
+
+    def test_overflow(self):
+        histogram = snap7.stats.Histogram(max_value=1)
+        histogram.record(100)
+        # values larger than max_value are counted in the last bucket
+        self.assertAlmostEqual(histogram.percentile(50), 1, delta=1 / 8)
+        self.assertEqual(histogram.as_dict()['max'], 100000)
+
+    def test_empty(self):
+        histogram = snap7.stats.Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertEqual(histogram.as_dict(), {'count': 0, 'p50': None, 'p95': None, 'p99': None, 'max': None})
+
+    def test_sub_buckets(self):
+        self.assertRaises(ValueError, snap7.stats.Histogram, sub_buckets=6)
+
+    def test_merge(self):
+        first = snap7.stats.Histogram()
+        second = snap7.stats.Histogram()
+        first.record(0.001)
+        second.record(0.003)
+        first.merge(second)
+        self.assertEqual(first.count, 2)
+        self.assertEqual(first.percentile(100), 0.003)
+        self.assertRaises(ValueError, first.merge, snap7.stats.Histogram(max_value=1))
+
+    def test_percentiles_argument(self):
+        histogram = snap7.stats.Histogram()
+        histogram.record(0.002)
+        self.assertEqual(histogram.as_dict(percentiles=(99.9,)), {'count': 1, 'p99.9': 2.0, 'max': 2.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
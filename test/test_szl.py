@@ -0,0 +1,144 @@
+import asyncio
+import ctypes
+import logging
+import unittest
+from unittest import mock
+
+import snap7.client_async
+import snap7.server
+import snap7.szl
+import snap7.types
+from snap7.exceptions import Snap7Exception
+
+logging.basicConfig(level=logging.WARNING)
+
+ip = '127.0.0.1'
+tcpport = 1107
+
+# records returned by the snap7 server
+module_identification = bytes.fromhex(
+    '000136455337203331352d32454831342d304142302000c0000400010007202020202020202020202020202020202020202000c05603'
+    '0206')
+communication_status = bytes.fromhex('0001000100010001000000000000000e00000014' + '00' * 20)
+protection = bytes.fromhex('000400010000000100020000000056561001337b' + '00' * 20)
+cycle_time = bytes.fromhex('11030101c8580004000200090000000000000000' + '00' * 8)
+
+
+def szl_data(record_length, count, records=b''):
+    # returns the S7SZL and the size filled by the library
+    data = snap7.types.S7SZL()
+    data.Header.LENTHDR = record_length
+    data.Header.N_DR = count
+    ctypes.memmove(data.Data, records, len(records))
+    return data, len(records) + 4
+
+
+class TestParse(unittest.TestCase):
+
+    def test_module_identification(self):
+        szl = snap7.szl.parse(0x0011, 0x0000, *szl_data(28, 2, module_identification))
+        self.assertEqual(szl.record_length, 28)
+        module, firmware = szl.records
+        self.assertEqual(module.index, 1)
+        self.assertEqual(module.order_code, '6ES7 315-2EH14-0AB0')
+        self.assertEqual(module.module_type, 0xC0)
+        self.assertIsNone(module.version)
+        self.assertEqual(firmware.version, 'V3.2.6')
+
+    def test_communication_status(self):
+        status, = snap7.szl.parse(0x0132, 0x0001, *szl_data(40, 1, communication_status)).records
+        self.assertEqual(status.free_connections, 14)
+        self.assertEqual(status.max_communication_load, 20)
+
+    def test_protection(self):
+        level, = snap7.szl.parse(0x0132, 0x0004, *szl_data(40, 1, protection)).records
+        self.assertEqual((level.sch_schal, level.sch_par, level.sch_rel, level.bart_sch), (1, 0, 1, 2))
+
+    def test_cycle_time(self):
+        times, = snap7.szl.parse(0x0222, 0x0001, *szl_data(28, 1, cycle_time)).records
+        self.assertEqual(times, snap7.szl.CycleTime(4, 2, 9))
+
+    def test_unknown(self):
+        szl = snap7.szl.parse(0x0132, 0x0008, *szl_data(40, 1, protection))
+        self.assertEqual(szl.records, [protection])
+
+    def test_short_records(self):
+        szl = snap7.szl.parse(0x0011, 0x0000, *szl_data(4, 2, module_identification[:8]))
+        self.assertEqual(szl.records, [module_identification[:4], module_identification[4:8]])
+
+    def test_header_only(self):
+        szl = snap7.szl.parse(0x0F11, 0x0000, *szl_data(28, 4))
+        self.assertEqual((szl.count, szl.records), (4, []))
+
+    def test_partial_records(self):
+        # the size returned by the library limits the records
+        data, size = szl_data(28, 2, module_identification)
+        self.assertEqual(len(snap7.szl.parse(0x0011, 0x0000, data, size - 1).records), 1)
+
+
+class TestSZLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.client = mock.Mock()
+        self.client.read_szl.side_effect = lambda ssl_id, index: snap7.szl.SZL(ssl_id, index, 0, 0, [])
+        self.cache = snap7.szl.SZLCache(self.client, ttl=5)
+
+    def test_ttl(self):
+        with mock.patch('snap7.szl.time.monotonic', return_value=100):
+            first = self.cache.read(0x0132, 0x0001)
+            self.assertIs(self.cache.read(0x0132, 0x0001), first)
+            self.cache.read(0x0132, 0x0004)
+        with mock.patch('snap7.szl.time.monotonic', return_value=106):
+            self.assertIsNot(self.cache.read(0x0132, 0x0001), first)
+        self.assertEqual(self.client.read_szl.call_count, 3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+
+    def test_static(self):
+        with mock.patch('snap7.szl.time.monotonic', return_value=100):
+            first = self.cache.read(0x0011)
+        with mock.patch('snap7.szl.time.monotonic', return_value=200):
+            self.assertIs(self.cache.read(0x0011), first)
+
+    def test_errors(self):
+        self.client.read_szl.side_effect = Snap7Exception("CPU : Item not available")
+        self.assertRaises(Snap7Exception, self.cache.read, 0x0132, 0x0001)
+        self.assertRaises(Snap7Exception, self.cache.read, 0x0132, 0x0001)
+        self.assertEqual(self.client.read_szl.call_count, 2)
+
+    def test_invalidate(self):
+        self.cache.read(0x0132, 0x0001)
+        self.cache.read(0x0222, 0x0001)
+        self.cache.invalidate(0x0132)
+        self.cache.read(0x0132, 0x0001)
+        self.cache.read(0x0222, 0x0001)
+        self.assertEqual(self.client.read_szl.call_count, 3)
+        self.cache.invalidate()
+        self.cache.read(0x0222, 0x0001)
+        self.assertEqual(self.client.read_szl.call_count, 4)
+
+
+class TestClientAsync(unittest.TestCase):
+
+    def setUp(self):
+        self.server = snap7.server.Server(log=False)
+        self.server.start(tcpport=tcpport)
+        self.client = snap7.client_async.ClientAsync()
+        self.client.set_as_check_mode(1)
+        self.client.connect(ip, 0, 1, tcpport)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.client.destroy()
+        self.server.stop()
+        self.server.destroy()
+
+    def test_as_read_szl(self):
+        szl = asyncio.run(self.client.as_read_szl(0x0011, 0x0000))
+        self.assertEqual(szl.records[0].order_code, '6ES7 315-2EH14-0AB0')
+
+    def test_as_read_szl_list(self):
+        self.assertIn(0x0011, asyncio.run(self.client.as_read_szl_list()))
+
+
+if __name__ == '__main__':
+    unittest.main()